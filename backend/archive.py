@@ -0,0 +1,269 @@
+# backend/archive.py
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from .audit_log import find_room_log, read_events
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError: # pyarrow es opcional: sin él los segmentos se escriben como JSON columnar comprimido
+    pyarrow = None
+    parquet = None
+
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "archive")
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH_ROOMS = int(os.environ.get("ARCHIVE_BATCH_ROOMS", "200"))
+ARCHIVE_PAGE_SIZE = int(os.environ.get("ARCHIVE_PAGE_SIZE", "1000")) # Límite de filas por respuesta de PostgREST
+
+INDEX_FILE = "index.jsonl.gz"
+PARQUET_EXT = ".parquet"
+COLUMNS_EXT = ".cols.json.gz"
+
+# Orden de borrado: hijos antes que padres (las FKs apuntan a game_rooms)
+ARCHIVED_TABLES = ("player_round_answers", "room_participants", "game_rooms")
+AUDIT_TABLE = "audit_events"
+
+ARCHIVED_ROWS = registry.counter(
+    "basta_archived_rows_total", "Rows moved from hot tables into archive segments.", ("table",)
+)
+
+
+# --- Formato columnar ---
+def _to_columns(rows: List[dict]) -> Dict[str, list]:
+    names: Dict[str, None] = {}
+    for row in rows:
+        for name in row:
+            names.setdefault(name)
+    return {name: [row.get(name) for row in rows] for name in names}
+
+
+def _from_columns(columns: Dict[str, list]) -> List[dict]:
+    if not columns:
+        return []
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
+
+
+def write_table(path_without_ext: str, rows: List[dict]) -> str:
+    """Writes rows column-major: Parquet (zstd) if pyarrow is installed, gzip JSON columns otherwise."""
+    columns = _to_columns(rows)
+    if parquet is not None:
+        # jsonb (scoring_rules, data de auditoría) se guarda como texto para no depender del esquema de cada fila
+        json_columns = [name for name, values in columns.items() if any(isinstance(v, (dict, list)) for v in values)]
+        for name in json_columns:
+            columns[name] = [json.dumps(v, ensure_ascii=False) if v is not None else None for v in columns[name]]
+        table = pyarrow.table(columns).replace_schema_metadata({"json_columns": json.dumps(json_columns)})
+        path = path_without_ext + PARQUET_EXT
+        parquet.write_table(table, path, compression="zstd")
+        return path
+    path = path_without_ext + COLUMNS_EXT
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=9) as fh:
+        json.dump({"rows": len(rows), "columns": columns}, fh, ensure_ascii=False, separators=(",", ":"), default=str)
+    return path
+
+
+def read_table(path_without_ext: str) -> List[dict]:
+    if os.path.exists(path_without_ext + PARQUET_EXT):
+        if parquet is None:
+            raise RuntimeError(f"{path_without_ext}{PARQUET_EXT} needs pyarrow to be read.")
+        table = parquet.read_table(path_without_ext + PARQUET_EXT)
+        json_columns = json.loads((table.schema.metadata or {}).get(b"json_columns", b"[]"))
+        rows = table.to_pylist()
+        for row in rows:
+            for name in json_columns:
+                if row.get(name) is not None:
+                    row[name] = json.loads(row[name])
+        return rows
+    if os.path.exists(path_without_ext + COLUMNS_EXT):
+        with gzip.open(path_without_ext + COLUMNS_EXT, "rt", encoding="utf-8") as fh:
+            return _from_columns(json.load(fh)["columns"])
+    return []
+
+
+class RoomArchiver:
+    """Moves finished rooms older than a cutoff from the hot tables into archive segments.
+
+    Trabaja por lotes de `batch_rooms` salas: lee sus filas (paginadas), escribe un
+    segmento con una tabla columnar por tabla origen más los eventos de auditoría,
+    lo publica con un rename atómico, lo registra en el índice y recién entonces
+    borra las filas calientes con un DELETE por tabla. Si el proceso se corta antes
+    del borrado, la siguiente ejecución vuelve a archivar esas salas en un segmento
+    nuevo y el índice apunta al más reciente.
+    """
+
+    def __init__(self, supabase_client, directory: str = ARCHIVE_DIR, batch_rooms: int = ARCHIVE_BATCH_ROOMS,
+                 page_size: int = ARCHIVE_PAGE_SIZE, dry_run: bool = False, audit_dir: Optional[str] = None):
+        self.supabase = supabase_client
+        self.directory = directory
+        self.batch_rooms = batch_rooms
+        self.page_size = page_size
+        self.dry_run = dry_run
+        self.audit_dir = audit_dir
+
+    def _candidates(self, cutoff: str, after: Optional[str]) -> List[dict]:
+        query = self.supabase.table("game_rooms").select("*").eq("status", "finished").lt("created_at", cutoff)
+        if after is not None:
+            # En dry-run las filas no se borran: se avanza por created_at (empates en el borde quedan para la próxima)
+            query = query.gt("created_at", after)
+        return query.order("created_at").limit(self.batch_rooms).execute().data or []
+
+    def _fetch_children(self, table: str, room_ids: List[str]) -> List[dict]:
+        rows, start = [], 0
+        while True:
+            page = self.supabase.table(table).select("*").in_("game_room_id", room_ids) \
+                .order("id").range(start, start + self.page_size - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            start += self.page_size
+
+    def _audit_rows(self, room_ids: List[str]) -> List[dict]:
+        rows = []
+        for room_id in room_ids:
+            path = find_room_log(room_id, self.audit_dir)
+            if not os.path.exists(path):
+                continue
+            for event in read_events(path):
+                rows.append({"game_room_id": room_id, "seq": event.get("seq"), "ts": event.get("ts"), "event": event.get("event"), "data": event.get("data")})
+        return rows
+
+    def _write_segment(self, rooms: List[dict], children: Dict[str, List[dict]], audit_rows: List[dict]) -> str:
+        month = str(rooms[0].get("created_at") or "")[:7] or "unknown"
+        segment = os.path.join(month, f"seg-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}")
+        final_dir = os.path.join(self.directory, segment)
+        tmp_dir = final_dir + ".tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            write_table(os.path.join(tmp_dir, "game_rooms"), rooms)
+            for table in ("room_participants", "player_round_answers"):
+                write_table(os.path.join(tmp_dir, table), children[table])
+            if audit_rows:
+                write_table(os.path.join(tmp_dir, AUDIT_TABLE), audit_rows)
+            os.replace(tmp_dir, final_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        archived_at = datetime.now(timezone.utc).isoformat()
+        lines = "".join(
+            json.dumps({"room_id": str(room["id"]), "segment": segment, "created_at": room.get("created_at"), "archived_at": archived_at}) + "\n"
+            for room in rooms
+        )
+        with open(os.path.join(self.directory, INDEX_FILE), "ab") as fh:
+            fh.write(gzip.compress(lines.encode("utf-8"))) # Un miembro gzip por lote, igual que el audit log
+        return segment
+
+    def _delete_hot_rows(self, room_ids: List[str]) -> None:
+        for table in ARCHIVED_TABLES:
+            column = "id" if table == "game_rooms" else "game_room_id"
+            self.supabase.table(table).delete().in_(column, room_ids).execute()
+
+    def run(self, older_than_days: int = ARCHIVE_AFTER_DAYS, max_batches: Optional[int] = None) -> dict:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+        started = time.perf_counter()
+        summary = {"dry_run": self.dry_run, "cutoff": cutoff, "batches": 0, "rooms": 0, "segments": [],
+                   "rows": {table: 0 for table in ARCHIVED_TABLES + (AUDIT_TABLE,)}}
+        after = None
+        while max_batches is None or summary["batches"] < max_batches:
+            rooms = self._candidates(cutoff, after)
+            if not rooms:
+                break
+            room_ids = [str(room["id"]) for room in rooms]
+            children = {table: self._fetch_children(table, room_ids) for table in ("room_participants", "player_round_answers")}
+            audit_rows = self._audit_rows(room_ids)
+
+            summary["batches"] += 1
+            summary["rooms"] += len(rooms)
+            summary["rows"]["game_rooms"] += len(rooms)
+            for table, rows in children.items():
+                summary["rows"][table] += len(rows)
+            summary["rows"][AUDIT_TABLE] += len(audit_rows)
+
+            if self.dry_run:
+                after = rooms[-1].get("created_at")
+            else:
+                segment = self._write_segment(rooms, children, audit_rows)
+                self._delete_hot_rows(room_ids)
+                summary["segments"].append(segment)
+                ARCHIVED_ROWS.inc("game_rooms", amount=len(rooms))
+                for table, rows in children.items():
+                    ARCHIVED_ROWS.inc(table, amount=len(rows))
+                logger.info("Archived %s rooms (%s participants, %s answers) into %s.", len(rooms),
+                            len(children["room_participants"]), len(children["player_round_answers"]), segment)
+            if len(rooms) < self.batch_rooms:
+                break
+        summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return summary
+
+
+class ArchiveReader:
+    """Loads archived games back for replay or offline stats."""
+
+    def __init__(self, directory: str = ARCHIVE_DIR):
+        self.directory = directory
+        self._index: Optional[Dict[str, str]] = None
+        self._index_mtime: Optional[float] = None
+
+    def _load_index(self) -> Dict[str, str]:
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        mtime = os.path.getmtime(path)
+        if self._index is None or mtime != self._index_mtime:
+            index = {}
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        index[entry["room_id"]] = entry["segment"] # La última entrada gana (re-archivados)
+            self._index, self._index_mtime = index, mtime
+        return self._index
+
+    def segment_for(self, room_id) -> Optional[str]:
+        return self._load_index().get(str(room_id))
+
+    def segments(self) -> List[str]:
+        return sorted(set(self._load_index().values()))
+
+    def load_game(self, room_id) -> Optional[dict]:
+        """Room row with its participants, answers (by round) and audit events, or None if not archived."""
+        segment = self.segment_for(room_id)
+        if segment is None:
+            return None
+        base = os.path.join(self.directory, segment)
+        room_id = str(room_id)
+
+        def rows(table: str) -> List[dict]:
+            return [row for row in read_table(os.path.join(base, table)) if str(row.get("game_room_id", row.get("id"))) == room_id]
+
+        room = next((row for row in read_table(os.path.join(base, "game_rooms")) if str(row["id"]) == room_id), None)
+        if room is None:
+            return None
+        answers_by_round: Dict[int, List[dict]] = {}
+        for answer in rows("player_round_answers"):
+            answers_by_round.setdefault(answer["round_number"], []).append(answer)
+        return {
+            "room": room,
+            "participants": rows("room_participants"),
+            "answers_by_round": dict(sorted(answers_by_round.items())),
+            "events": sorted(rows(AUDIT_TABLE), key=lambda e: e.get("seq") or 0),
+        }
+
+    def iter_table(self, table: str) -> Iterator[dict]:
+        """Streams every archived row of `table`, one segment in memory at a time (for stats jobs)."""
+        for segment in self.segments():
+            yield from read_table(os.path.join(self.directory, segment, table))
+
+
+archive_reader = ArchiveReader()
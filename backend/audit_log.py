@@ -0,0 +1,131 @@
+# backend/audit_log.py
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOG_DIR = os.environ.get("AUDIT_LOG_DIR", "audit_logs")
+AUDIT_LOG_ENABLED = os.environ.get("AUDIT_LOG_ENABLED", "true").lower() not in ("0", "false", "no")
+FLUSH_EVENT_THRESHOLD = 64
+# Una sala sin eventos durante este tiempo se da por abandonada: se escribe lo pendiente y se olvida su contador
+AUDIT_IDLE_ROOM_SECONDS = float(os.environ.get("AUDIT_IDLE_ROOM_SECONDS", "7200"))
+_IDLE_SWEEP_INTERVAL_SECONDS = 60.0
+
+# Eventos que cierran una unidad lógica: se escriben a disco de inmediato
+_FLUSH_ON_EVENTS = {"round_scored", "game_finished"}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value) # UUIDs y similares
+
+
+class AuditLog:
+    """Append-only per-room event log stored as gzip-compressed JSON lines.
+
+    Events are buffered per room and appended to `<directory>/<room_id>.jsonl.gz`
+    as one gzip member per flush; gzip readers treat the concatenated members as a
+    single stream, so a file is never rewritten once data reaches disk.
+
+    `seq` numbers a room's events within this worker's log only: each worker
+    writes its own files and counter, so across workers `ts` is the order. The
+    counter restarts after `game_finished` or once the room has been idle for
+    AUDIT_IDLE_ROOM_SECONDS.
+    """
+
+    def __init__(self, directory: str = AUDIT_LOG_DIR, enabled: bool = AUDIT_LOG_ENABLED,
+                 idle_seconds: float = AUDIT_IDLE_ROOM_SECONDS):
+        self.directory = directory
+        self.enabled = enabled
+        self.idle_seconds = idle_seconds
+        self._buffers: Dict[str, List[bytes]] = {}
+        self._sequence: Dict[str, int] = {}
+        self._last_event: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def path_for(self, room_id: str) -> str:
+        return os.path.join(self.directory, f"{room_id}.jsonl.gz")
+
+    def record(self, room_id, event: str, **data) -> None:
+        if not self.enabled:
+            return
+        room_id = str(room_id)
+        try:
+            now = time.monotonic()
+            idle_rooms = []
+            with self._lock:
+                seq = self._sequence.get(room_id, 0) + 1
+                self._sequence[room_id] = seq
+                self._last_event[room_id] = now
+                line = json.dumps(
+                    {"seq": seq, "ts": datetime.now(timezone.utc).isoformat(), "event": event, "data": data},
+                    separators=(",", ":"), ensure_ascii=False, default=_json_default
+                )
+                buffer = self._buffers.setdefault(room_id, [])
+                buffer.append(line.encode("utf-8") + b"\n")
+                should_flush = event in _FLUSH_ON_EVENTS or len(buffer) >= FLUSH_EVENT_THRESHOLD
+                if event == "game_finished":
+                    self._sequence.pop(room_id, None)
+                    self._last_event.pop(room_id, None)
+                if now - self._last_sweep >= _IDLE_SWEEP_INTERVAL_SECONDS:
+                    idle_rooms = self._evict_idle(now)
+            if should_flush:
+                self.flush(room_id)
+            for idle_room_id in idle_rooms:
+                self.flush(idle_room_id)
+        except Exception as e:
+            # La auditoría nunca debe romper una partida
+            logger.error("Failed to record audit event '%s' for room %s: %s", event, room_id, e, exc_info=True)
+
+    def _evict_idle(self, now: float) -> List[str]:
+        """Forgets rooms idle for `idle_seconds` (called with the lock held); returns those with unflushed events."""
+        self._last_sweep = now
+        idle = [room_id for room_id, seen in self._last_event.items() if now - seen >= self.idle_seconds]
+        for room_id in idle:
+            del self._last_event[room_id]
+            self._sequence.pop(room_id, None)
+        return [room_id for room_id in idle if room_id in self._buffers]
+
+    def flush(self, room_id) -> None:
+        room_id = str(room_id)
+        with self._lock:
+            lines = self._buffers.pop(room_id, None)
+            if not lines:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path_for(room_id), "ab") as fh:
+                fh.write(gzip.compress(b"".join(lines)))
+
+    def flush_all(self) -> None:
+        for room_id in list(self._buffers):
+            try:
+                self.flush(room_id)
+            except Exception as e:
+                logger.error("Failed to flush audit log for room %s: %s", room_id, e, exc_info=True)
+
+
+def read_events(path: str) -> Iterator[dict]:
+    """Yields the events of a room log in the order they were recorded."""
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def find_room_log(room_id: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or AUDIT_LOG_DIR, f"{room_id}.jsonl.gz")
+
+
+audit_log = AuditLog()
+
+
+def get_audit_log() -> AuditLog:
+    return audit_log
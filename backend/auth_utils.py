@@ -8,13 +8,14 @@ from uuid import UUID
 
 from .models.game_models import User 
 
-SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET")
-if not SUPABASE_JWT_SECRET:
-    raise ValueError("La variable de entorno SUPABASE_JWT_SECRET no está configurada.")
+def get_jwt_secret() -> Optional[str]:
+    # Se lee al usarse (no al importar): la falta de configuración la reporta /health/ready
+    return os.environ.get("SUPABASE_JWT_SECRET")
 
 ALGORITHM = "HS256" # Supabase usa HS256 para los JWTs firmados con el secret
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token") # "token" es una URL dummy aquí
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     credentials_exception = HTTPException(
@@ -22,8 +23,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    jwt_secret = get_jwt_secret()
+    if not jwt_secret:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Authentication is not configured.")
     try:
-        payload = jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=[ALGORITHM], audience="authenticated")
+        payload = jwt.decode(token, jwt_secret, algorithms=[ALGORITHM], audience="authenticated")
 
         user_id_str: Optional[str] = payload.get("sub") # "sub" es el user_id en los JWT de Supabase
         email: Optional[str] = payload.get("email")
@@ -60,4 +64,13 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     # Por ahora, simplemente devuelve el usuario si el token es válido.
     # if not current_user.is_active: # Ejemplo si tuvieras un campo is_active
     #     raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[User]:
+    """Like get_current_user but returns None for anonymous or invalid tokens (public endpoints)."""
+    if not token:
+        return None
+    try:
+        return await get_current_user(token)
+    except HTTPException:
+        return None
@@ -0,0 +1,73 @@
+# backend/catalog_cache.py
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_TTL_SECONDS = float(os.environ.get("CATALOG_CACHE_TTL_SECONDS", "300"))
+MISS_RELOAD_INTERVAL_SECONDS = 5.0 # Un theme desconocido (creado en otro worker) recarga como mucho cada 5s
+
+
+class CatalogCache:
+    """Process-wide cache of themes and categories (they change rarely, every room reads them).
+
+    `warm()` carga todo el catálogo con dos consultas; después cada lectura es
+    un acceso a dict. Las escrituras del catálogo llaman a `invalidate()`.
+    """
+
+    def __init__(self, ttl_seconds: float = CATALOG_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._themes: Optional[List[dict]] = None
+        self._categories_by_theme: Dict[str, List[dict]] = {}
+        self._loaded_at = 0.0
+        self.warmed = False
+
+    def _fresh(self) -> bool:
+        return self._themes is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def warm(self, supabase_client: Any) -> Tuple[List[dict], Dict[str, List[dict]]]:
+        """Loads the whole catalog; returns the loaded (themes, categories by theme)."""
+        started = time.perf_counter()
+        themes_resp = supabase_client.table("themes").select("*").order("created_at", desc=False).execute()
+        categories_resp = supabase_client.table("categories").select("*").order("order", desc=False).execute()
+        themes = themes_resp.data or []
+        by_theme: Dict[str, List[dict]] = {}
+        for category in categories_resp.data or []:
+            by_theme.setdefault(str(category["theme_id"]), []).append(category)
+        with self._lock:
+            self._themes = themes
+            self._categories_by_theme = by_theme
+            self._loaded_at = time.monotonic()
+            self.warmed = True
+        logger.info("Catalog cache warmed: %s themes, %s categories in %.3fs.",
+                    len(themes), sum(len(c) for c in by_theme.values()), time.perf_counter() - started)
+        return themes, by_theme
+
+    # Cada lectura toma los atributos una sola vez: un invalidate() concurrente los
+    # reemplaza (y deja _themes en None) entre la comprobación y el return
+    def themes(self, supabase_client: Any) -> List[dict]:
+        themes = self._themes
+        if themes is None or not self._fresh():
+            themes, _ = self.warm(supabase_client)
+        return list(themes)
+
+    def categories_for_theme(self, supabase_client: Any, theme_id) -> List[dict]:
+        """Categories of a theme ordered by `order`."""
+        by_theme = self._categories_by_theme
+        if not self._fresh() or (str(theme_id) not in by_theme
+                                 and time.monotonic() - self._loaded_at > MISS_RELOAD_INTERVAL_SECONDS):
+            _, by_theme = self.warm(supabase_client)
+        return list(by_theme.get(str(theme_id), []))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._themes = None
+            self._categories_by_theme = {}
+            self._loaded_at = 0.0
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,275 @@
+# backend/catalog_import.py
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+from pydantic import ValidationError
+
+from .catalog_cache import catalog_cache
+from .models.game_models import CatalogImportBatch, CatalogImportError, CatalogImportResult, CatalogImportRow
+from .resilience import DatabaseUnavailable
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.environ.get("CATALOG_IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ROWS = int(os.environ.get("CATALOG_IMPORT_MAX_ROWS", "50000"))
+MAX_REPORTED_ERRORS = 100
+
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Splits a byte stream into (line_number, text) without holding the whole upload in memory."""
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        for raw in complete:
+            line_number += 1
+            yield line_number, raw.decode("utf-8").rstrip("\r").lstrip("﻿" if line_number == 1 else "")
+    if buffer.strip():
+        line_number += 1
+        yield line_number, buffer.decode("utf-8").rstrip("\r").lstrip("﻿" if line_number == 1 else "")
+
+
+class CsvRecords:
+    """One csv.reader over the upload's lines, so a quoted field may span several of them.
+
+    Las líneas llegan de un stream asíncrono y csv.reader tira de un iterador
+    síncrono: cada línea se encola y el reader solo se avanza cuando la línea
+    cierra el registro (fuera de un campo entre comillas).
+    """
+
+    def __init__(self):
+        self._lines: Deque[str] = deque()
+        self._reader = csv.reader(self)
+        self._in_quotes = False
+        self.first_line: Optional[int] = None # Línea donde empezó el registro en curso
+
+    def __iter__(self) -> "CsvRecords":
+        return self
+
+    def __next__(self) -> str:
+        if not self._lines:
+            raise StopIteration
+        return self._lines.popleft()
+
+    def push(self, line: int, text: str) -> Optional[List[str]]:
+        """Queues a physical line; returns the record once its last line arrived, else None."""
+        if not self._in_quotes:
+            self.first_line = line
+        self._lines.append(text + "\n")
+        self._in_quotes = self._ends_in_quotes(text, self._in_quotes)
+        return None if self._in_quotes else next(self._reader, [])
+
+    @property
+    def unterminated(self) -> bool:
+        return self._in_quotes
+
+    @staticmethod
+    def _ends_in_quotes(text: str, in_quotes: bool) -> bool:
+        """Whether the record is still inside a quoted field after `text` (csv's default dialect)."""
+        at_field_start = not in_quotes
+        i = 0
+        while i < len(text):
+            char = text[i]
+            if in_quotes:
+                if char == '"':
+                    if text[i + 1:i + 2] == '"':
+                        i += 1 # Comilla escapada ("")
+                    else:
+                        in_quotes = False
+            elif char == '"' and at_field_start:
+                in_quotes = True
+            at_field_start = char == "," and not in_quotes
+            i += 1
+        return in_quotes
+
+
+class CatalogImporter:
+    """Validates catalog rows one by one and writes them in batched inserts.
+
+    Cada fila referencia un theme por nombre (se crea si no existe) o por id, y
+    opcionalmente una categoría. Los themes nuevos de un lote se insertan antes
+    que sus categorías, en un solo insert por tabla y lote. Un lote fallido se
+    reporta y la importación continúa con el siguiente.
+    """
+
+    def __init__(self, supabase_client, dry_run: bool = False, batch_size: int = IMPORT_BATCH_SIZE):
+        self.supabase = supabase_client
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.rows_read = 0
+        self.rows_invalid = 0
+        self.themes_created = 0
+        self.categories_created = 0
+        self.errors: List[CatalogImportError] = []
+        self.batches: List[CatalogImportBatch] = []
+
+        existing = catalog_cache.themes(supabase_client)
+        self._theme_ids: Dict[str, str] = {theme["name"].casefold(): str(theme["id"]) for theme in existing}
+        self._known_theme_ids = set(self._theme_ids.values())
+        self._next_order: Dict[str, int] = {} # theme (id o nombre pendiente) -> siguiente `order`
+        self._pending_themes: Dict[str, str] = {} # casefold(nombre) -> nombre
+        self._pending_categories: List[Tuple[int, str, dict]] = [] # (línea, theme key, payload)
+        self._batch_first_line: Optional[int] = None
+
+    def add_error(self, line: int, error: str) -> None:
+        self.rows_invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(CatalogImportError(line=line, error=error))
+
+    def _theme_key(self, line: int, row: CatalogImportRow) -> Optional[str]:
+        if row.theme_id is not None:
+            if str(row.theme_id) not in self._known_theme_ids:
+                self.add_error(line, f"Unknown theme_id {row.theme_id}.")
+                return None
+            return str(row.theme_id)
+        if row.theme:
+            key = row.theme.strip().casefold()
+            if key not in self._theme_ids and key not in self._pending_themes:
+                self._pending_themes[key] = row.theme.strip()
+            return self._theme_ids.get(key, key)
+        self.add_error(line, "Row needs 'theme' or 'theme_id'.")
+        return None
+
+    def _order_for(self, theme_key: str) -> int:
+        if theme_key not in self._next_order:
+            existing = catalog_cache.categories_for_theme(self.supabase, theme_key) if theme_key in self._known_theme_ids else []
+            self._next_order[theme_key] = max((c.get("order") or 0 for c in existing), default=-1) + 1
+        order = self._next_order[theme_key]
+        self._next_order[theme_key] = order + 1
+        return order
+
+    async def add_row(self, line: int, data: dict) -> None:
+        self.rows_read += 1
+        try:
+            row = CatalogImportRow(**data)
+        except ValidationError as e:
+            self.add_error(line, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            return
+        theme_key = self._theme_key(line, row)
+        if theme_key is None:
+            return
+        if self._batch_first_line is None:
+            self._batch_first_line = line
+        if row.category:
+            order = row.order if row.order is not None else self._order_for(theme_key)
+            if row.order is not None:
+                self._next_order[theme_key] = max(self._next_order.get(theme_key, 0), row.order + 1)
+            self._pending_categories.append((line, theme_key, {"name": row.category.strip(), "order": order}))
+        if len(self._pending_categories) >= self.batch_size or len(self._pending_themes) >= self.batch_size:
+            await self.flush(line)
+
+    async def flush(self, last_line: int) -> None:
+        if not self._pending_themes and not self._pending_categories:
+            return
+        themes, categories = self._pending_themes, self._pending_categories
+        self._pending_themes, self._pending_categories = {}, []
+        batch = CatalogImportBatch(
+            batch=len(self.batches) + 1, first_line=self._batch_first_line or last_line,
+            last_line=last_line, rows=len(themes) + len(categories), inserted=0
+        )
+        self._batch_first_line = None
+        self.batches.append(batch)
+
+        try:
+            if themes:
+                if self.dry_run:
+                    created = [{"id": key, "name": name} for key, name in themes.items()]
+                else:
+                    response = await asyncio.to_thread(
+                        lambda: self.supabase.table("themes").insert([{"name": name} for name in themes.values()]).execute()
+                    )
+                    created = response.data or []
+                for theme in created:
+                    theme_id = str(theme["id"])
+                    key = theme["name"].casefold()
+                    self._theme_ids[key] = theme_id
+                    self._known_theme_ids.add(theme_id)
+                    if key in self._next_order: # El orden se llevaba con el nombre mientras no había id
+                        self._next_order[theme_id] = self._next_order.pop(key)
+                self.themes_created += len(created)
+                batch.inserted += len(created)
+
+            payloads = []
+            for line, theme_key, payload in categories:
+                theme_id = theme_key if theme_key in self._known_theme_ids else self._theme_ids.get(theme_key)
+                if theme_id is None:
+                    self.add_error(line, "Theme could not be created.")
+                    continue
+                payloads.append({**payload, "theme_id": theme_id})
+            if payloads:
+                if self.dry_run:
+                    inserted = len(payloads)
+                else:
+                    response = await asyncio.to_thread(
+                        lambda: self.supabase.table("categories").insert(payloads).execute()
+                    )
+                    inserted = len(response.data or [])
+                self.categories_created += inserted
+                batch.inserted += inserted
+        except (APIError, DatabaseUnavailable) as e:
+            # DatabaseUnavailable: la base no respondió (plazo, reintentos o circuito abierto); el lote se reporta igual
+            batch.error = e.detail if isinstance(e, DatabaseUnavailable) else e.message or str(e)
+            logger.warning("Catalog import batch %s (lines %s-%s) failed: %s", batch.batch, batch.first_line, batch.last_line, batch.error)
+
+    async def run(self, lines: AsyncIterator[Tuple[int, str]], file_format: str) -> CatalogImportResult:
+        started = time.perf_counter()
+        header: Optional[List[str]] = None
+        csv_records = CsvRecords() if file_format == FORMAT_CSV else None
+        last_line = 0
+        try:
+            async for line, text in lines:
+                last_line = line
+                if csv_records is not None:
+                    values = csv_records.push(line, text)
+                    if values is None:
+                        continue # Campo entre comillas que sigue en la línea siguiente
+                    line = csv_records.first_line
+                    if not any(value.strip() for value in values):
+                        continue
+                elif not text.strip():
+                    continue
+                if self.rows_read >= IMPORT_MAX_ROWS:
+                    self.add_error(line, f"Row limit reached ({IMPORT_MAX_ROWS}); remaining rows were not read.")
+                    break
+                if csv_records is not None:
+                    if header is None:
+                        header = [value.strip().lower() for value in values]
+                        continue
+                    data = {name: (value.strip() or None) for name, value in zip(header, values)}
+                else:
+                    try:
+                        data = json.loads(text)
+                    except json.JSONDecodeError as e:
+                        self.rows_read += 1
+                        self.add_error(line, f"Invalid JSON: {e.msg}")
+                        continue
+                    if not isinstance(data, dict):
+                        self.rows_read += 1
+                        self.add_error(line, "Each line must be a JSON object.")
+                        continue
+                await self.add_row(line, data)
+            if csv_records is not None and csv_records.unterminated:
+                self.rows_read += 1
+                self.add_error(csv_records.first_line, "Unterminated quoted field.")
+            await self.flush(last_line)
+        finally:
+            # Una sola invalidación al final, haya o no errores, en lugar de una por fila
+            if not self.dry_run and (self.themes_created or self.categories_created):
+                catalog_cache.invalidate()
+
+        return CatalogImportResult(
+            dry_run=self.dry_run, rows_read=self.rows_read, rows_invalid=self.rows_invalid,
+            themes_created=self.themes_created, categories_created=self.categories_created,
+            errors=self.errors, batches=self.batches, elapsed_seconds=round(time.perf_counter() - started, 3)
+        )
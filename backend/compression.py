@@ -0,0 +1,112 @@
+# backend/compression.py
+import gzip
+import os
+from typing import List, Optional, Tuple
+
+from .metrics import registry
+
+try:
+    import brotli
+except ImportError: # Brotli es opcional: sin el paquete solo se negocia gzip
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4")) # Calidad baja: respuestas dinámicas, prima la latencia
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+COMPRESSED_BYTES = registry.counter(
+    "basta_response_bytes_total", "Response body bytes before and after compression.", ("encoding", "stage")
+)
+
+
+def _accepted_encodings(header: str) -> List[str]:
+    accepted = []
+    for part in header.split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0: # q=0 significa "no aceptado"
+            accepted.append(name.lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip for JSON responses above COMPRESSION_MIN_BYTES.
+
+    Solo comprime respuestas de un único chunk (todas las de la API); las
+    respuestas en streaming pasan sin tocar. Siempre agrega Vary: Accept-Encoding.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message # Se retiene hasta ver el body
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            pending_start, start_message = start_message, None
+            headers: List[Tuple[bytes, bytes]] = list(pending_start.get("headers", []))
+            body = message.get("body", b"")
+            header_names = {k.lower() for k, _ in headers}
+            content_type = next((v for k, v in headers if k.lower() == b"content-type"), b"")
+            compressible = (
+                not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and b"content-encoding" not in header_names
+                and content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            headers.append((b"vary", b"Accept-Encoding"))
+            if compressible:
+                compressed = compress(body, encoding)
+                COMPRESSED_BYTES.inc(encoding, "identity", amount=len(body))
+                COMPRESSED_BYTES.inc(encoding, "compressed", amount=len(compressed))
+                headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                headers += [(b"content-encoding", encoding.encode("latin-1")), (b"content-length", str(len(compressed)).encode("latin-1"))]
+                body = compressed
+            await send({**pending_start, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,425 @@
+# backend/db.py
+import copy
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from postgrest.exceptions import APIError
+
+from .metrics import DB_READ_ROUTING, DB_REQUEST_CACHE_HITS, record_db_call
+from .resilience import CircuitBreaker, DatabaseUnavailable, ResiliencePolicy, is_transient, resilience as default_resilience
+
+logger = logging.getLogger(__name__)
+
+# Tras escribir en una tabla, sus lecturas van al primario durante este tiempo (cota del lag de las réplicas)
+DB_REPLICA_MAX_LAG_SECONDS = float(os.environ.get("DB_REPLICA_MAX_LAG_SECONDS", "2"))
+# Tablas cuyas lecturas nunca van a réplica (coma separada), p. ej. las que se leen justo tras escribir desde otro worker
+DB_REPLICA_EXCLUDED_TABLES = frozenset(t.strip() for t in os.environ.get("DB_REPLICA_EXCLUDED_TABLES", "").split(",") if t.strip())
+# RPCs que solo leen (coma separada): se reintentan como una lectura y no cuentan como escritura del request
+DB_READONLY_RPCS = frozenset(f.strip() for f in os.environ.get("DB_READONLY_RPCS", "get_distinct_submitters_for_round").split(",") if f.strip())
+
+# Métodos del query builder que definen el tipo de operación
+_OPERATIONS = frozenset({"select", "insert", "upsert", "update", "delete"})
+_WRITE_OPERATIONS = frozenset({"insert", "upsert", "update", "delete"})
+_EMBEDDED_TABLE = re.compile(r"(\w+)\s*\(")
+_RECENT_KEYS_LIMIT = 50_000
+
+
+def _is_id_column(column: str) -> bool:
+    return column == "id" or column.endswith("_id")
+
+
+class CachedResponse:
+    """Response served from the request cache; same shape handlers read from supabase-py."""
+
+    __slots__ = ("data", "count", "error")
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+        self.error = None
+
+
+class RequestQueryCache:
+    """Per-request read cache (DataLoader-style).
+
+    - Lecturas idénticas dentro del mismo request se resuelven una sola vez.
+    - Las filas devueltas por insert/update/upsert quedan disponibles por id, de modo
+      que un `select().eq("id", ...).single()` posterior no vuelve a la base.
+    - Cualquier escritura a una tabla invalida las lecturas que la involucran.
+    """
+
+    def __init__(self):
+        self._responses: Dict[Tuple[str, str], Tuple[Set[str], Any]] = {}
+        self._rows: Dict[Tuple[str, str], dict] = {}
+        self.hits = 0
+        self.wrote = False # Tras la primera escritura el request lee del primario (read-your-writes)
+
+    def get(self, query: "TrackedQuery") -> Optional[CachedResponse]:
+        entry = self._responses.get(query.cache_key)
+        if entry is not None:
+            self.hits += 1
+            DB_REQUEST_CACHE_HITS.inc(query.table_name)
+            return CachedResponse(copy.deepcopy(entry[1].data), entry[1].count)
+
+        row_id = query.single_id_lookup()
+        if row_id is not None:
+            row = self._rows.get((query.table_name, row_id))
+            columns = query.plain_columns()
+            if row is not None and (columns is None or all(c in row for c in columns)):
+                self.hits += 1
+                DB_REQUEST_CACHE_HITS.inc(query.table_name)
+                data = dict(row) if columns is None else {c: row[c] for c in columns}
+                return CachedResponse(copy.deepcopy(data))
+        return None
+
+    def store(self, query: "TrackedQuery", response: Any) -> None:
+        # Copia propia: el handler puede modificar los dicts que recibe
+        snapshot = CachedResponse(copy.deepcopy(response.data), getattr(response, "count", None))
+        self._responses[query.cache_key] = (query.referenced_tables(), snapshot)
+
+    def prime(self, table: str, rows: Iterable[dict]) -> None:
+        for row in rows:
+            if isinstance(row, dict) and "id" in row:
+                self._rows[(table, str(row["id"]))] = copy.deepcopy(row)
+
+    def row(self, table: str, row_id: str) -> Optional[dict]:
+        return self._rows.get((table, str(row_id)))
+
+    def clear(self) -> None:
+        self._responses.clear()
+        self._rows.clear()
+
+    def invalidate(self, table: str) -> None:
+        self._responses = {key: entry for key, entry in self._responses.items() if table not in entry[0]}
+        self._rows = {key: row for key, row in self._rows.items() if key[0] != table}
+
+
+_request_cache: ContextVar[Optional[RequestQueryCache]] = ContextVar("request_query_cache", default=None)
+
+
+def current_request_cache() -> Optional[RequestQueryCache]:
+    return _request_cache.get()
+
+
+class RequestScopeMiddleware:
+    """Opens a fresh RequestQueryCache for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_cache.set(RequestQueryCache())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_cache.reset(token)
+
+
+class TrackedQuery:
+    """Immutable, lazily built PostgREST query.
+
+    Handlers use it exactly like the supabase-py builder (`.select().eq()...execute()`);
+    each call only records (method, args, kwargs) and the real builder is assembled
+    on `execute()`. Knowing the whole query before it runs lets the data-access
+    layer time it per table/operation.
+    """
+
+    __slots__ = ("_client", "_table", "_calls", "_operation", "_is_rpc")
+
+    def __init__(self, client: "TrackedClient", table: str, calls: Tuple = (), operation: str = "select", is_rpc: bool = False):
+        self._client = client
+        self._table = table
+        self._calls = calls
+        self._operation = operation
+        self._is_rpc = is_rpc
+
+    @property
+    def table_name(self) -> str:
+        return self._table
+
+    @property
+    def operation(self) -> str:
+        return self._operation
+
+    @property
+    def cache_key(self) -> Tuple[str, str]:
+        return (self._table, repr(self._calls))
+
+    def _select_columns(self) -> str:
+        for name, args, _ in self._calls:
+            if name == "select":
+                return ",".join(args) if args else "*"
+        return "*"
+
+    def plain_columns(self) -> Optional[List[str]]:
+        """Selected columns, or None for '*'."""
+        columns = [c.strip() for c in self._select_columns().split(",")]
+        return None if columns == ["*"] else columns
+
+    def single_id_lookup(self) -> Optional[str]:
+        """If the query is select(<plain columns>).eq("id", X).single(), returns X."""
+        if self._is_rpc or self._operation != "select" or "(" in self._select_columns() or ":" in self._select_columns():
+            return None
+        row_id, single = None, False
+        for name, args, kwargs in self._calls:
+            if name == "select" and not kwargs.get("count"):
+                continue
+            if name == "eq" and args and args[0] == "id" and row_id is None:
+                row_id = str(args[1])
+            elif name == "single":
+                single = True
+            else:
+                return None
+        return row_id if single else None
+
+    def filter_keys(self) -> Set[str]:
+        """Ids this query is scoped to: `eq`/`in_` values on id-like columns plus ids in written payloads.
+
+        Los UUID no se repiten entre tablas, así que sirven de clave de "fila escrita
+        hace poco" sin importar la tabla (p. ej. el id de una sala y el game_room_id
+        de sus participantes).
+        """
+        keys: Set[str] = set()
+        for name, args, _ in self._calls:
+            if name == "eq" and len(args) == 2 and _is_id_column(args[0]):
+                keys.add(str(args[1]))
+            elif name == "in_" and len(args) == 2 and _is_id_column(args[0]):
+                keys.update(str(value) for value in args[1])
+            elif name in ("insert", "upsert") and args:
+                for row in args[0] if isinstance(args[0], list) else [args[0]]:
+                    keys.update(str(value) for column, value in row.items() if _is_id_column(column) and value is not None)
+        return keys
+
+    def referenced_tables(self) -> Set[str]:
+        tables = {self._table}
+        tables.update(_EMBEDDED_TABLE.findall(self._select_columns()))
+        return tables
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def record_call(*args, **kwargs) -> "TrackedQuery":
+            operation = name if name in _OPERATIONS else self._operation
+            return TrackedQuery(self._client, self._table, self._calls + ((name, args, kwargs),), operation, self._is_rpc)
+
+        return record_call
+
+    def build(self, raw_client: Any):
+        """Replays the recorded calls on a raw supabase-py client."""
+        if self._is_rpc:
+            _, args, kwargs = self._calls[0]
+            builder = raw_client.rpc(*args, **kwargs)
+            calls = self._calls[1:]
+        else:
+            builder = raw_client.table(self._table)
+            calls = self._calls
+        for name, args, kwargs in calls:
+            builder = getattr(builder, name)(*args, **kwargs)
+        return builder
+
+    def execute(self):
+        return self._client.execute(self)
+
+    @property
+    def is_rpc(self) -> bool:
+        return self._is_rpc
+
+    @property
+    def is_readonly_rpc(self) -> bool:
+        return self._is_rpc and self._table in DB_READONLY_RPCS
+
+
+class TrackedClient:
+    """Wraps the Supabase client so every PostgREST call goes through one place.
+
+    Cada `.execute()` se mide (round trips y tiempo por tabla/operación, ver
+    backend/metrics.py) y corre con plazo, reintentos y circuit breaker (ver
+    backend/resilience.py); el resto del cliente (auth, storage...) se delega tal cual.
+
+    Con réplicas configuradas, los selects (no RPC) se reparten entre ellas salvo que:
+    el request ya escribió, la tabla (o una embebida) se escribió en este worker hace
+    menos de DB_REPLICA_MAX_LAG_SECONDS, o la tabla está en DB_REPLICA_EXCLUDED_TABLES.
+    Si la réplica falla o no encuentra la fila pedida con `.single()`, se repite en el primario.
+    Una RPC cuenta como escritura en cualquier tabla, salvo las de DB_READONLY_RPCS.
+    """
+
+    def __init__(self, client: Any, resilience: Optional[ResiliencePolicy] = None, replicas: Sequence[Any] = ()):
+        self._client = client
+        self._resilience = resilience or default_resilience
+        # Cada réplica tiene su propio circuit breaker (una réplica caída no abre el del primario) y no
+        # reintenta: el reintento es la misma lectura en el primario
+        self._replicas = [(replica, ResiliencePolicy(read_retries=0, breaker=CircuitBreaker(), max_workers=8)) for replica in replicas]
+        self._replica_cycle = itertools.cycle(range(len(self._replicas))) if self._replicas else None
+        self._recent_tables: Dict[str, float] = {}
+        self._recent_keys: Dict[str, float] = {} # ids (de sala, participante...) escritos hace poco
+        self._last_rpc = 0.0
+        self._routing_lock = threading.Lock()
+
+    @property
+    def raw(self) -> Any:
+        return self._client
+
+    def table(self, table_name: str) -> TrackedQuery:
+        return TrackedQuery(self, table_name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Optional[dict] = None, **kwargs) -> TrackedQuery:
+        return TrackedQuery(self, fn, (("rpc", (fn, params or {}), kwargs),), operation="rpc", is_rpc=True)
+
+    def execute(self, query: TrackedQuery):
+        cache = _request_cache.get()
+        cacheable = cache is not None and query.operation == "select" and not query.is_rpc
+        if cacheable:
+            cached = cache.get(query)
+            if cached is not None:
+                return cached
+
+        try:
+            response = self._execute_uncached(query)
+        except Exception:
+            if cache is not None and query.operation in _WRITE_OPERATIONS:
+                # Una escritura rechazada (p. ej. 23505) indica que otra petición cambió la tabla:
+                # lo cacheado ya no es fiable y un reintento debe volver a leer
+                cache.invalidate(query.table_name)
+            raise
+        if response is None:
+            # postgrest devuelve None (no una respuesta vacía) cuando `.maybe_single()` no encuentra filas
+            return None
+
+        if cache is not None:
+            if query.operation in _WRITE_OPERATIONS:
+                cache.invalidate(query.table_name)
+                if query.operation != "delete" and isinstance(getattr(response, "data", None), list):
+                    cache.prime(query.table_name, response.data)
+            elif query.is_rpc and not query.is_readonly_rpc:
+                cache.clear() # Una RPC puede escribir en cualquier tabla
+            elif cacheable:
+                cache.store(query, response)
+        return response
+
+    @property
+    def replica_count(self) -> int:
+        return len(self._replicas)
+
+    def _primary_reason(self, query: TrackedQuery) -> Optional[str]:
+        """Why a select must be served by the primary, or None if a replica may answer it."""
+        cache = _request_cache.get()
+        if cache is not None and cache.wrote:
+            return "request_wrote"
+        tables = query.referenced_tables()
+        if tables & DB_REPLICA_EXCLUDED_TABLES:
+            return "excluded"
+        horizon = time.monotonic() - DB_REPLICA_MAX_LAG_SECONDS
+        if self._last_rpc > horizon:
+            return "recent_write"
+        if any(self._recent_tables.get(table, 0.0) > horizon for table in tables):
+            keys = query.filter_keys()
+            # Sin filtros por id la lectura puede tocar cualquier fila escrita: va al primario
+            if not keys or any(self._recent_keys.get(key, 0.0) > horizon for key in keys):
+                return "recent_write"
+        return None
+
+    def _pick_replica(self) -> Optional[Tuple[Any, ResiliencePolicy]]:
+        with self._routing_lock:
+            for _ in range(len(self._replicas)):
+                replica = self._replicas[next(self._replica_cycle)]
+                if replica[1].breaker.state != CircuitBreaker.OPEN:
+                    return replica
+        return None
+
+    def _note_write(self, query: TrackedQuery) -> None:
+        now = time.monotonic()
+        with self._routing_lock:
+            if query.is_rpc:
+                self._last_rpc = now # Una RPC puede escribir en cualquier tabla
+            else:
+                self._recent_tables[query.table_name] = now
+                for key in query.filter_keys():
+                    self._recent_keys[key] = now
+            if len(self._recent_keys) > _RECENT_KEYS_LIMIT:
+                horizon = now - DB_REPLICA_MAX_LAG_SECONDS
+                self._recent_keys = {key: at for key, at in self._recent_keys.items() if at > horizon}
+        cache = _request_cache.get()
+        if cache is not None:
+            cache.wrote = True
+
+    def _execute_on_replica(self, query: TrackedQuery, replica: Any, policy: ResiliencePolicy):
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = policy.execute(query.table_name, query.operation, True, lambda: query.build(replica).execute())
+            failed = False
+            return response
+        finally:
+            record_db_call(query.table_name, query.operation, time.perf_counter() - started, failed)
+
+    def _execute_uncached(self, query: TrackedQuery):
+        select = query.operation == "select" and not query.is_rpc
+        # Una RPC de solo lectura se reintenta, pero va al primario: no se sabe qué tablas lee
+        idempotent = select or query.is_readonly_rpc
+        if select and self._replicas:
+            reason = self._primary_reason(query)
+            replica = self._pick_replica() if reason is None else None
+            if replica is not None:
+                try:
+                    response = self._execute_on_replica(query, *replica)
+                    DB_READ_ROUTING.inc("replica", "eligible")
+                    return response
+                except DatabaseUnavailable as e:
+                    reason = "replica_unavailable"
+                    logger.warning("Read replica unavailable for %s, falling back to primary: %s", query.table_name, e.detail)
+                except APIError as e:
+                    # PGRST116: `.single()` sin fila; puede ser lag de replicación, el primario decide
+                    if str(e.code) != "PGRST116" and not is_transient(e):
+                        raise
+                    reason = "replica_miss"
+            DB_READ_ROUTING.inc("primary", reason or "no_replica")
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = self._resilience.execute(
+                query.table_name, query.operation, idempotent, lambda: query.build(self._client).execute()
+            )
+            failed = False
+            return response
+        finally:
+            record_db_call(query.table_name, query.operation, time.perf_counter() - started, failed)
+            if not idempotent and self._replicas:
+                self._note_write(query) # También si falló: la escritura pudo aplicarse igual
+
+    def load_many(self, table: str, ids: Iterable[str], columns: str = "*") -> Dict[str, dict]:
+        """Fetches rows by id with a single `in_` query, reusing rows already seen in this request."""
+        wanted = [str(i) for i in dict.fromkeys(ids)]
+        cache = _request_cache.get()
+        found: Dict[str, dict] = {}
+        wanted_columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        if cache is not None:
+            for row_id in wanted:
+                row = cache.row(table, row_id)
+                if row is not None and (wanted_columns is None or all(c in row for c in wanted_columns)):
+                    found[row_id] = copy.deepcopy(row)
+
+        missing = [row_id for row_id in wanted if row_id not in found]
+        if missing:
+            select_columns = columns if wanted_columns is None or "id" in wanted_columns else f"id, {columns}"
+            response = self.table(table).select(select_columns).in_("id", missing).execute()
+            for row in response.data or []:
+                found[str(row["id"])] = row
+            if cache is not None and wanted_columns is None:
+                cache.prime(table, response.data or [])
+        return found
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
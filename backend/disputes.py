@@ -0,0 +1,287 @@
+# backend/disputes.py
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+
+from .audit_log import audit_log
+from .leaderboards import RoundScoreEntry, leaderboards
+from .metrics import registry
+from .room_state import ROOM_STATE_PREFIX, RoomStateBackend, room_state
+from .scoring_rules import compile_scoring_rules, rules_from_room, score_round_answers
+
+logger = logging.getLogger(__name__)
+
+DISPUTE_MAX_PER_ROUND = int(os.environ.get("DISPUTE_MAX_PER_ROUND", "10"))
+# Votos mínimos a favor del cambio: con 2 jugadores, quien impugna necesita que el otro esté de acuerdo
+DISPUTE_MIN_VOTES = int(os.environ.get("DISPUTE_MIN_VOTES", "2"))
+# Rondas cuyas disputas nunca se cerraron (sala abandonada) se descartan pasado este tiempo
+DISPUTE_ROUND_TTL_SECONDS = float(os.environ.get("DISPUTE_ROUND_TTL_SECONDS", "3600"))
+
+# Campos del hash de cada ronda: "answer:<answer_id>" (la respuesta impugnada) y "vote:<answer_id>:<participant_id>"
+ANSWER_FIELD_PREFIX = "answer:"
+VOTE_FIELD_PREFIX = "vote:"
+
+DISPUTES_OPENED = registry.counter(
+    "basta_disputes_opened_total", "Answers flagged for a dispute vote."
+)
+DISPUTE_VOTES = registry.counter(
+    "basta_dispute_votes_total", "Dispute votes received (kept in the room-state backend, never written to the database one by one)."
+)
+DISPUTES_RESOLVED = registry.counter(
+    "basta_disputes_resolved_total", "Disputes closed with the round results phase, by outcome.", ("outcome",)
+)
+
+class DisputeError(ValueError):
+    pass
+
+
+class Dispute:
+    """Vote counters for one flagged answer; each participant has one vote and may change it."""
+
+    __slots__ = ("answer_id", "participant_id", "category_id", "answer_text", "is_valid", "flagged_by", "votes", "valid_votes", "invalid_votes")
+
+    def __init__(self, answer_row: dict, flagged_by: str):
+        self.answer_id = str(answer_row["id"])
+        self.participant_id = str(answer_row["room_participant_id"])
+        self.category_id = str(answer_row["category_id"])
+        self.answer_text = answer_row.get("answer_text")
+        self.is_valid = bool(answer_row.get("is_valid"))
+        self.flagged_by = flagged_by
+        self.votes: Dict[str, bool] = {}
+        self.valid_votes = 0
+        self.invalid_votes = 0
+
+    def vote(self, voter_id: str, valid: bool) -> None:
+        previous = self.votes.get(voter_id)
+        if previous is not None:
+            if previous == valid:
+                return
+            if previous:
+                self.valid_votes -= 1
+            else:
+                self.invalid_votes -= 1
+        self.votes[voter_id] = valid
+        if valid:
+            self.valid_votes += 1
+        else:
+            self.invalid_votes += 1
+
+    def outcome(self, min_votes: int = DISPUTE_MIN_VOTES) -> Optional[bool]:
+        """New validity if the vote overturns the scorer, None if the answer stays as scored."""
+        flip_votes, keep_votes = (self.invalid_votes, self.valid_votes) if self.is_valid else (self.valid_votes, self.invalid_votes)
+        if flip_votes >= min_votes and flip_votes > keep_votes:
+            return not self.is_valid
+        return None
+
+    def summary(self, voter_id: Optional[str] = None) -> dict:
+        return {
+            "answer_id": self.answer_id,
+            "participant_id": self.participant_id,
+            "category_id": self.category_id,
+            "answer_text": self.answer_text,
+            "is_valid": self.is_valid,
+            "valid_votes": self.valid_votes,
+            "invalid_votes": self.invalid_votes,
+            "my_vote": self.votes.get(voter_id) if voter_id else None,
+            "overturned": self.outcome() is not None,
+        }
+
+
+class DisputeBoard:
+    """Open disputes of the rounds currently in `round_over_results`, kept in the shared room-state backend.
+
+    Cada ronda es un hash con un campo por respuesta impugnada y uno por voto, así
+    que votar o cambiar el voto es una sola escritura y cualquier worker cuenta
+    los mismos votos. Nada se escribe en la base hasta que la fase de resultados
+    se cierra (siguiente ronda o fin de la partida), y entonces las disputas que
+    cambiaron el resultado se aplican con un único re-cálculo de la ronda. Las
+    rondas cuyas disputas nunca se cerraron caducan solas.
+    """
+
+    def __init__(self, backend: RoomStateBackend, prefix: str = ROOM_STATE_PREFIX,
+                 max_per_round: int = DISPUTE_MAX_PER_ROUND, ttl_seconds: float = DISPUTE_ROUND_TTL_SECONDS):
+        self.backend = backend
+        self.prefix = prefix
+        self.max_per_round = max_per_round
+        self.ttl_seconds = ttl_seconds
+        # Índice "room_id:round" -> abierta, para no leer las salas de un torneo si no hay disputas
+        self._open_rounds_key = f"{prefix}:disputes:open_rounds"
+
+    def _key(self, room_id, round_number: int) -> str:
+        return f"{self.prefix}:room:{room_id}:disputes:{round_number}"
+
+    @staticmethod
+    def _from_fields(fields: Dict[str, Any]) -> Dict[str, Dispute]:
+        disputes = {
+            name[len(ANSWER_FIELD_PREFIX):]: Dispute(answer, answer["flagged_by"])
+            for name, answer in fields.items() if name.startswith(ANSWER_FIELD_PREFIX)
+        }
+        for name, valid in fields.items():
+            if name.startswith(VOTE_FIELD_PREFIX):
+                answer_id, voter_id = name[len(VOTE_FIELD_PREFIX):].split(":", 1)
+                if answer_id in disputes:
+                    disputes[answer_id].vote(voter_id, bool(valid))
+        return disputes
+
+    async def _round(self, room_id, round_number: int) -> Dict[str, Dispute]:
+        return self._from_fields(await self.backend.get_fields(self._key(room_id, round_number)))
+
+    async def get(self, room_id, round_number: int, answer_id) -> Optional[Dispute]:
+        return (await self._round(room_id, round_number)).get(str(answer_id))
+
+    async def disputes(self, room_id, round_number: int) -> List[Dispute]:
+        return list((await self._round(room_id, round_number)).values())
+
+    async def open_rooms(self) -> Set[str]:
+        return {name.rsplit(":", 1)[0] for name in await self.backend.get_fields(self._open_rounds_key)}
+
+    async def _save_vote(self, room_id, round_number: int, dispute: Dispute, voter_id: str, answer_fields: Optional[dict] = None) -> None:
+        values: Dict[str, Any] = {f"{VOTE_FIELD_PREFIX}{dispute.answer_id}:{voter_id}": dispute.votes[voter_id]}
+        if answer_fields is not None:
+            values[f"{ANSWER_FIELD_PREFIX}{dispute.answer_id}"] = answer_fields
+        await self.backend.update_fields(self._key(room_id, round_number), values=values, ttl_seconds=self.ttl_seconds)
+
+    async def open(self, room_id, round_number: int, answer_row: dict, flagged_by: str) -> Dispute:
+        """Flags an answer; the flag counts as the flagger's vote against the scorer's decision."""
+        disputes = await self._round(room_id, round_number)
+        dispute = disputes.get(str(answer_row["id"]))
+        answer_fields = None
+        if dispute is None:
+            if not (answer_row.get("answer_text") or "").strip():
+                raise DisputeError("Empty answers cannot be disputed.")
+            # Dos impugnaciones simultáneas en workers distintos pueden pasar el límite por una: no hace falta un lock
+            if len(disputes) >= self.max_per_round:
+                raise DisputeError(f"At most {self.max_per_round} answers can be disputed per round.")
+            dispute = Dispute(answer_row, flagged_by)
+            answer_fields = {
+                "id": dispute.answer_id, "room_participant_id": dispute.participant_id, "category_id": dispute.category_id,
+                "answer_text": dispute.answer_text, "is_valid": dispute.is_valid, "flagged_by": flagged_by,
+            }
+            await self.backend.update_fields(self._open_rounds_key, values={f"{room_id}:{round_number}": True}, ttl_seconds=self.ttl_seconds)
+            DISPUTES_OPENED.inc()
+        dispute.vote(flagged_by, not dispute.is_valid)
+        await self._save_vote(room_id, round_number, dispute, flagged_by, answer_fields)
+        DISPUTE_VOTES.inc()
+        return dispute
+
+    async def vote(self, room_id, round_number: int, answer_id, voter_id: str, valid: bool) -> Dispute:
+        dispute = await self.get(room_id, round_number, answer_id)
+        if dispute is None:
+            raise LookupError(str(answer_id))
+        dispute.vote(voter_id, valid)
+        await self._save_vote(room_id, round_number, dispute, voter_id)
+        DISPUTE_VOTES.inc()
+        return dispute
+
+    async def take(self, room_id, round_number: int) -> List[Dispute]:
+        """Removes and returns the round's disputes (the phase is closing; callers hold the room lock)."""
+        disputes = await self.disputes(room_id, round_number)
+        if disputes:
+            await self.backend.delete(self._key(room_id, round_number))
+            await self.backend.delete_fields(self._open_rounds_key, [f"{room_id}:{round_number}"])
+        return disputes
+
+
+dispute_board = DisputeBoard(room_state.backend)
+
+
+def get_dispute_board() -> DisputeBoard:
+    return dispute_board
+
+
+async def rescore_round(supabase_client, room: dict, round_number: int, validity_overrides: Dict[str, bool]) -> Counter:
+    """Re-scores a whole round with the dispute outcomes applied; returns the score change per participant.
+
+    Se recalcula la ronda entera porque anular o aceptar una respuesta cambia
+    cuántos jugadores repiten en su categoría. Cuesta una lectura de respuestas,
+    un upsert de las que cambiaron, y una lectura más un upsert de los totales.
+    """
+    room_id_str = str(room["id"])
+    answer_rows = (await asyncio.to_thread(supabase_client.table("player_round_answers") \
+        .select("id, game_room_id, room_participant_id, round_number, category_id, answer_text, score_awarded, is_valid, validation_notes") \
+        .eq("game_room_id", room_id_str) \
+        .eq("round_number", round_number) \
+        .execute)).data or []
+    if not answer_rows:
+        return Counter()
+
+    rules = rules_from_room(room.get("scoring_rules"))
+    processed_answers, totals = score_round_answers(answer_rows, room["current_letter"], compile_scoring_rules(rules), validity_overrides)
+    rows_by_id = {str(row["id"]): row for row in answer_rows}
+    changed_rows = []
+    deltas = Counter()
+    for detail in processed_answers:
+        row = rows_by_id[str(detail["answer_db_id"])]
+        deltas[detail["participant_id"]] += detail["score"] - (row.get("score_awarded") or 0)
+        if (detail["score"], detail["is_valid"], detail["notes"]) != (row.get("score_awarded"), row.get("is_valid"), row.get("validation_notes")):
+            changed_rows.append({**row, "score_awarded": detail["score"], "is_valid": detail["is_valid"], "validation_notes": detail["notes"]})
+    if changed_rows:
+        await asyncio.to_thread(supabase_client.table("player_round_answers").upsert(changed_rows, on_conflict="id").execute)
+
+    deltas = Counter({p_id: delta for p_id, delta in deltas.items() if delta})
+    participant_rows = {}
+    if deltas:
+        participant_rows = await asyncio.to_thread(supabase_client.load_many, "room_participants", deltas.keys(), "id, game_room_id, user_id, nickname, score")
+        await asyncio.to_thread(supabase_client.table("room_participants").upsert([
+            {
+                "id": p_id,
+                "game_room_id": row["game_room_id"],
+                "user_id": row["user_id"],
+                "nickname": row["nickname"],
+                "score": (row.get("score") or 0) + deltas[p_id],
+            }
+            for p_id, row in participant_rows.items()
+        ], on_conflict="id").execute)
+
+    # Mismo formato que round_scored (más los overrides) para que replay_room.py pueda verificarlo
+    audit_log.record(
+        room_id_str, "round_rescored",
+        round_number=round_number,
+        letter=room["current_letter"],
+        scoring_rules=rules.model_dump(),
+        validity_overrides=validity_overrides,
+        answers=[{key: row[key] for key in ("id", "game_room_id", "room_participant_id", "round_number", "category_id", "answer_text")} for row in answer_rows],
+        results=[
+            {"answer_db_id": a["answer_db_id"], "score": a["score"], "is_valid": a["is_valid"], "notes": a["notes"]}
+            for a in processed_answers
+        ],
+        totals=dict(totals),
+        deltas=dict(deltas),
+    )
+    try:
+        # Los leaderboards son sumas: basta con sumar la diferencia (las estadísticas por jugador no se corrigen)
+        await leaderboards.record_round(
+            str(room["theme_id"]) if room.get("theme_id") else None,
+            [RoundScoreEntry(user_id=str(row["user_id"]), nickname=row.get("nickname") or "", round_score=deltas[p_id]) for p_id, row in participant_rows.items()]
+        )
+    except Exception as e:
+        logger.error("Failed to update leaderboards after re-scoring room %s R%s: %s", room_id_str, round_number, e, exc_info=True)
+    return deltas
+
+
+async def close_round_disputes(supabase_client, room: dict, round_number: int) -> Optional[Counter]:
+    """Closes the dispute phase of a round: applies the overturned answers in one batch.
+
+    `room` needs id, current_letter, theme_id and scoring_rules. Returns the score
+    deltas, or None when no dispute changed anything (no database access then).
+    """
+    disputes = await dispute_board.take(room["id"], round_number)
+    if not disputes:
+        return None
+    overrides = {}
+    for dispute in disputes:
+        outcome = dispute.outcome()
+        DISPUTES_RESOLVED.inc("kept" if outcome is None else "overturned")
+        if outcome is not None:
+            overrides[dispute.answer_id] = outcome
+    logger.info("Closing %s disputes for room %s R%s: %s overturned.", len(disputes), room["id"], round_number, len(overrides))
+    if not overrides:
+        return None
+    deltas = await rescore_round(supabase_client, room, round_number, overrides)
+    await room_state.publish_room_event(
+        room["id"], "round_rescored", round_number=round_number,
+        overturned=overrides, deltas=dict(deltas)
+    )
+    return deltas
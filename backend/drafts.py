@@ -0,0 +1,194 @@
+# backend/drafts.py
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DRAFT_FLUSH_INTERVAL_SECONDS = float(os.environ.get("DRAFT_FLUSH_INTERVAL_SECONDS", "3"))
+DRAFT_FLUSH_BATCH_SIZE = int(os.environ.get("DRAFT_FLUSH_BATCH_SIZE", "500"))
+DRAFT_PARTICIPANT_CACHE_SIZE = int(os.environ.get("DRAFT_PARTICIPANT_CACHE_SIZE", "20000"))
+
+DRAFTS_SAVED = registry.counter(
+    "basta_drafts_saved_total", "Draft saves received from clients."
+)
+DRAFTS_COALESCED = registry.counter(
+    "basta_drafts_coalesced_total", "Draft saves that replaced a pending draft before it reached the database."
+)
+DRAFT_FLUSH_ROWS = registry.histogram(
+    "basta_draft_flush_rows", "Drafts written per batched upsert.", (), (1, 5, 10, 25, 50, 100, 250, 500)
+)
+DRAFT_FLUSH_FAILURES = registry.counter(
+    "basta_draft_flush_failures_total", "Batched draft upserts that failed (drafts are kept for the next flush)."
+)
+
+DraftKey = Tuple[str, int] # (room_participant_id, round_number)
+
+
+class DraftBuffer:
+    """Latest draft per participant and round, written to `answer_drafts` in periodic batches.
+
+    Cada guardado solo reemplaza una entrada en memoria; una tarea de fondo escribe
+    todo lo pendiente con un único upsert cada DRAFT_FLUSH_INTERVAL_SECONDS. Así
+    16 jugadores tecleando en una sala generan un write cada pocos segundos en
+    lugar de uno por tecla. Las lecturas miran primero lo pendiente en memoria.
+
+    Al enviar las respuestas el borrador se descarta: la clave queda marcada (los
+    guardados y flushes posteriores la ignoran) y el siguiente flush borra la fila
+    guardada, después de cualquier upsert que ya estuviera en curso.
+    """
+
+    def __init__(self, interval: float = DRAFT_FLUSH_INTERVAL_SECONDS, batch_size: int = DRAFT_FLUSH_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._pending: Dict[DraftKey, dict] = {}
+        self._participants: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._discarded: "OrderedDict[DraftKey, None]" = OrderedDict()
+        self._deletions: Dict[DraftKey, None] = {} # Descartados cuya fila falta borrar en la base
+        self._client = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    # --- Participantes (para no consultar la base en cada guardado) ---
+    def cached_participant(self, room_id, user_id) -> Optional[str]:
+        key = (str(room_id), str(user_id))
+        participant_id = self._participants.get(key)
+        if participant_id is not None:
+            self._participants.move_to_end(key)
+        return participant_id
+
+    def remember_participant(self, room_id, user_id, participant_id) -> None:
+        self._participants[(str(room_id), str(user_id))] = str(participant_id)
+        if len(self._participants) > DRAFT_PARTICIPANT_CACHE_SIZE:
+            self._participants.popitem(last=False)
+
+    # --- Borradores ---
+    def save(self, supabase_client, room_id, participant_id, round_number: int, answers: Dict[str, Optional[str]]) -> dict:
+        key = (str(participant_id), round_number)
+        draft = {
+            "room_participant_id": str(participant_id),
+            "game_room_id": str(room_id),
+            "round_number": round_number,
+            "answers": answers,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if key in self._discarded:
+            return draft # Las respuestas ya se enviaron: un guardado tardío no revive el borrador
+        if key in self._pending:
+            DRAFTS_COALESCED.inc()
+        self._pending[key] = draft
+        self._client = supabase_client
+        DRAFTS_SAVED.inc()
+        self.ensure_started()
+        return draft
+
+    def discard(self, supabase_client, participant_id, round_number: int) -> None:
+        """Drops the draft once the real answers were submitted; the next flush deletes its stored row."""
+        key = (str(participant_id), round_number)
+        self._pending.pop(key, None)
+        self._discarded[key] = None
+        if len(self._discarded) > DRAFT_PARTICIPANT_CACHE_SIZE:
+            self._discarded.popitem(last=False)
+        self._deletions[key] = None
+        self._client = supabase_client
+        self.ensure_started()
+
+    def get(self, supabase_client, participant_id, round_number: int) -> Optional[dict]:
+        if (str(participant_id), round_number) in self._discarded:
+            return None
+        pending = self._pending.get((str(participant_id), round_number))
+        if pending is not None:
+            return pending
+        response = supabase_client.table("answer_drafts").select("*") \
+            .eq("room_participant_id", str(participant_id)) \
+            .eq("round_number", round_number) \
+            .maybe_single().execute()
+        return response.data if response is not None else None
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    # --- Escritura por lotes ---
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not (self._pending or self._deletions) or self._client is None:
+                return 0
+            batch, self._pending = self._pending, {}
+            drafts = list(batch.values())
+            written = done = 0
+            try:
+                for start in range(0, len(drafts), self.batch_size):
+                    # Se vuelve a mirar antes de cada upsert: la ronda pudo enviarse mientras corría el anterior
+                    chunk = [draft for draft in drafts[start:start + self.batch_size]
+                             if (draft["room_participant_id"], draft["round_number"]) not in self._discarded]
+                    if chunk:
+                        await asyncio.to_thread(
+                            lambda: self._client.table("answer_drafts").upsert(chunk, on_conflict="room_participant_id,round_number").execute()
+                        )
+                        DRAFT_FLUSH_ROWS.observe(len(chunk))
+                        written += len(chunk)
+                    done = start + self.batch_size
+            except Exception as e:
+                DRAFT_FLUSH_FAILURES.inc()
+                logger.warning("Draft flush failed after %s of %s drafts: %s", written, len(drafts), e)
+                # Se reencolan los no escritos, salvo que el jugador ya haya guardado uno más nuevo o enviado la ronda
+                for draft in drafts[done:]:
+                    key = (draft["room_participant_id"], draft["round_number"])
+                    if key not in self._discarded:
+                        self._pending.setdefault(key, draft)
+            await self._delete_discarded()
+            return written
+
+    async def _delete_discarded(self) -> None:
+        """Deletes the stored rows of discarded drafts, one delete per round (called with the flush lock held)."""
+        keys, self._deletions = list(self._deletions), {}
+        by_round: Dict[int, List[str]] = {}
+        for participant_id, round_number in keys:
+            by_round.setdefault(round_number, []).append(participant_id)
+        for round_number, participant_ids in by_round.items():
+            try:
+                await asyncio.to_thread(
+                    lambda: self._client.table("answer_drafts").delete()
+                    .eq("round_number", round_number).in_("room_participant_id", participant_ids).execute()
+                )
+            except Exception as e:
+                DRAFT_FLUSH_FAILURES.inc()
+                logger.warning("Deleting %s submitted drafts of round %s failed: %s", len(participant_ids), round_number, e)
+                self._deletions.update(dict.fromkeys((p_id, round_number) for p_id in participant_ids))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Draft flusher error: %s", e, exc_info=True)
+
+    def ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            # Contexto vacío: la tarea no debe heredar la caché de consultas ni el logging del request que la arranca
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        started = time.perf_counter()
+        written = await self.flush() # Lo pendiente no se pierde al apagar el worker
+        if written:
+            logger.info("Flushed %s pending drafts on shutdown in %.3fs.", written, time.perf_counter() - started)
+
+
+draft_buffer = DraftBuffer()
+
+
+def get_draft_buffer() -> DraftBuffer:
+    return draft_buffer
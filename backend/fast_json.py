@@ -0,0 +1,127 @@
+# backend/fast_json.py
+import json
+import os
+import typing
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError: # orjson es opcional: sin él se usa json de la stdlib con las mismas reglas
+    orjson = None
+
+# Interruptor global: con "false" las rutas rápidas vuelven a validar con Pydantic
+FAST_JSON_ENABLED = os.environ.get("FAST_JSON_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (UUID/datetime handled natively)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Proyector por modelo: (clave de salida, clave de entrada, default, modelo anidado, es lista)
+_FieldSpec = Tuple[str, str, Any, Optional[Type[BaseModel]], bool]
+
+
+def _nested_model(annotation) -> Tuple[Optional[Type[BaseModel]], bool]:
+    origin = typing.get_origin(annotation)
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    if origin in (list, List) and args:
+        model, _ = _nested_model(args[0])
+        return model, True
+    if origin is typing.Union and len(args) == 1:
+        return _nested_model(args[0])
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def _field_specs(model: Type[BaseModel]) -> Tuple[_FieldSpec, ...]:
+    specs = []
+    for name, field in model.model_fields.items():
+        key = field.alias or name
+        default = None if field.is_required() else field.get_default(call_default_factory=True)
+        nested, is_list = _nested_model(field.annotation)
+        specs.append((key, key, default, nested, is_list))
+    return tuple(specs)
+
+
+def project(model: Type[BaseModel], row: dict) -> dict:
+    """Shapes a trusted row (already valid JSON from PostgREST) like `model` would serialize it.
+
+    No revalida tipos: solo selecciona los campos del modelo (por alias, igual
+    que FastAPI con response_model), aplica defaults y recorre modelos anidados.
+    """
+    out = {}
+    for out_key, in_key, default, nested, is_list in _field_specs(model):
+        value = row.get(in_key, default)
+        if nested is not None and value is not None:
+            if is_list:
+                value = [project(nested, item) for item in value]
+            elif isinstance(value, dict):
+                value = project(nested, value)
+        out[out_key] = value
+    return out
+
+
+# Árbol de selección de ?fields=: nombre -> sub-árbol (None = el campo completo)
+FieldTree = Dict[str, Optional[dict]]
+
+
+def parse_fields(spec: Optional[str], model: Type[BaseModel]) -> Optional[FieldTree]:
+    """Parses `?fields=a,b.c,b.d` against `model`; raises ValueError on unknown names."""
+    if not spec or not spec.strip():
+        return None
+    tree: FieldTree = {}
+    for path in (item.strip() for item in spec.split(",")):
+        if not path:
+            continue
+        node, current_model = tree, model
+        parts = path.split(".")
+        for depth, part in enumerate(parts):
+            if current_model is None:
+                raise ValueError(f"Field '{path}' cannot be selected partially.")
+            nested_by_key = {key: nested for key, _, _, nested, _ in _field_specs(current_model)}
+            if part not in nested_by_key:
+                raise ValueError(f"Unknown field '{path}'.")
+            if depth == len(parts) - 1:
+                node[part] = None # Campo completo (gana sobre una selección parcial previa)
+            else:
+                if node.get(part, {}) is None:
+                    break # Ya se pidió el campo completo
+                node = node.setdefault(part, {})
+                current_model = nested_by_key[part]
+    return tree
+
+
+def select_fields(value: Any, tree: Optional[FieldTree]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [select_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: select_fields(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+def fast_response(model: Type[BaseModel], data: dict, status_code: int = 200, fields: Optional[FieldTree] = None, allow_validation: bool = True):
+    """Returns `data` shaped as `model` without re-validation, or the validated model if disabled.
+
+    Con `fields` (de parse_fields) solo se incluyen los campos pedidos; `allow_validation=False`
+    es para variantes del payload que el modelo no describe (p. ej. resultados compactos).
+    """
+    if not FAST_JSON_ENABLED and fields is None and allow_validation:
+        return model(**data)
+    return FastJSONResponse(select_fields(project(model, data), fields), status_code=status_code)
@@ -0,0 +1,213 @@
+# backend/idempotency.py
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .metrics import registry
+from .room_state import InMemoryRoomStateBackend, RoomStateBackend, room_state
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "600"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_MAX_BODY_BYTES = 256 * 1024 # Respuestas más grandes no se guardan
+IDEMPOTENT_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+IDEMPOTENT_PATH_PREFIXES = ("/api/v1/rooms",)
+# Errores del cliente que se repetirían igual con el mismo request; 409 y 429 dependen del momento y no se guardan
+IDEMPOTENCY_STORED_CLIENT_ERRORS = frozenset({400, 404, 422})
+
+IDEMPOTENCY_REQUESTS = registry.counter(
+    "basta_idempotency_requests_total", "Mutating requests carrying an Idempotency-Key, by outcome.", ("outcome",)
+)
+
+
+class IdempotencyStore:
+    """Bounded LRU of recent responses, with an optional shared tier.
+
+    El nivel local responde sin salir del proceso; si ROOM_STATE_URL apunta a
+    Redis, las respuestas también se guardan ahí para que un reintento que cae
+    en otro worker obtenga el mismo resultado.
+    """
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_MAX_ENTRIES, ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS, shared: Optional[RoomStateBackend] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, record = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return record
+            del self._entries[key]
+        if self.shared is not None:
+            try:
+                record = await self.shared.get(f"idempotency:{key}")
+            except Exception as e:
+                logger.warning("Shared idempotency lookup failed: %s", e)
+                return None
+            if record is not None:
+                self._remember(key, record)
+            return record
+        return None
+
+    async def put(self, key: str, record: dict) -> None:
+        self._remember(key, record)
+        if self.shared is not None:
+            try:
+                await self.shared.set(f"idempotency:{key}", record, self.ttl_seconds)
+            except Exception as e:
+                logger.warning("Shared idempotency store failed: %s", e)
+
+    def _remember(self, key: str, record: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, record)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def begin(self, key: str) -> Optional[asyncio.Future]:
+        """Marks key as running; returns the running attempt's future if there is one."""
+        running = self._in_flight.get(key)
+        if running is not None:
+            return running
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+        return None
+
+    def finish(self, key: str, record: Optional[dict]) -> None:
+        future = self._in_flight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(record)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+idempotency_store = IdempotencyStore(shared=None if isinstance(room_state.backend, InMemoryRoomStateBackend) else room_state.backend)
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value
+    return None
+
+
+def _storable(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code in IDEMPOTENCY_STORED_CLIENT_ERRORS
+
+
+async def _send_record(send, record: dict) -> None:
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record["headers"]]
+    headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": record["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": base64.b64decode(record["body"])})
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response for retried mutating requests with the same Idempotency-Key.
+
+    La clave se asocia al usuario (hash del header Authorization), método y ruta;
+    reutilizarla con otro body devuelve 422. Solo se guardan las respuestas 2xx y
+    los 4xx deterministas (400, 404, 422), así un 5xx, un 409 o un 429 se pueden
+    reintentar con la misma clave.
+    """
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store if store is not None else idempotency_store # Un store vacío es falsy (__len__)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS or not scope["path"].startswith(IDEMPOTENT_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        raw_key = _header(scope, IDEMPOTENCY_HEADER)
+        if not raw_key:
+            await self.app(scope, receive, send)
+            return
+
+        # Se lee el body completo para poder compararlo con el del primer intento
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        owner = hashlib.sha256(_header(scope, b"authorization") or b"").hexdigest()[:32]
+        key = hashlib.sha256(b"|".join([owner.encode(), scope["method"].encode(), scope["path"].encode(), raw_key[:255]])).hexdigest()
+
+        record = await self.store.get(key)
+        if record is None:
+            running = self.store.begin(key)
+            if running is not None:
+                # Reintento mientras el primer intento sigue en curso (mismo worker): esperar su resultado
+                IDEMPOTENCY_REQUESTS.inc("waited")
+                record = await asyncio.shield(running)
+                if record is None:
+                    await self._reject(send, 409, b'{"detail":"A request with this Idempotency-Key did not complete, retry."}')
+                    return
+
+        if record is not None:
+            if record["fingerprint"] != fingerprint:
+                IDEMPOTENCY_REQUESTS.inc("mismatch")
+                await self._reject(send, 422, b'{"detail":"Idempotency-Key was already used with a different request body."}')
+                return
+            IDEMPOTENCY_REQUESTS.inc("replayed")
+            await _send_record(send, record)
+            return
+
+        IDEMPOTENCY_REQUESTS.inc("executed")
+        await self._execute(scope, receive, body, send, key, fingerprint)
+
+    async def _execute(self, scope, receive, body: bytes, send, key: str, fingerprint: str) -> None:
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive() # Solo queda esperar el http.disconnect real
+
+        response = {"status": 500, "headers": [], "body": b""}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (k.decode("latin-1"), v.decode("latin-1")) for k, v in message.get("headers", [])
+                    if k.lower() not in (b"x-request-id", b"server-timing")
+                ]
+            elif message["type"] == "http.response.body" and len(response["body"]) <= IDEMPOTENCY_MAX_BODY_BYTES:
+                response["body"] += message.get("body", b"")
+            await send(message)
+
+        record = None
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if _storable(response["status"]) and len(response["body"]) <= IDEMPOTENCY_MAX_BODY_BYTES:
+                record = {
+                    "status": response["status"],
+                    "headers": response["headers"],
+                    "body": base64.b64encode(response["body"]).decode("ascii"),
+                    "fingerprint": fingerprint,
+                }
+                await self.store.put(key, record)
+        finally:
+            self.store.finish(key, record)
+
+    @staticmethod
+    async def _reject(send, status_code: int, body: bytes) -> None:
+        await send({"type": "http.response.start", "status": status_code, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,113 @@
+# backend/leaderboards.py
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from .room_state import ROOM_STATE_PREFIX, RoomStateBackend, room_state
+
+logger = logging.getLogger(__name__)
+
+WINDOW_ALL = "all"
+WINDOW_DAILY = "daily"
+WINDOW_WEEKLY = "weekly"
+WINDOWS = (WINDOW_ALL, WINDOW_DAILY, WINDOW_WEEKLY)
+
+GLOBAL_SCOPE = "global"
+
+
+@dataclass
+class RoundScoreEntry:
+    user_id: str
+    nickname: str
+    round_score: int
+
+
+def period_key(window: str, at: datetime) -> str:
+    """Returns the bucket a timestamp falls into for the given window."""
+    if window == WINDOW_ALL:
+        return WINDOW_ALL
+    if window == WINDOW_DAILY:
+        return at.date().isoformat()
+    if window == WINDOW_WEEKLY:
+        iso_year, iso_week, _ = at.isocalendar()
+        return f"{iso_year}-W{iso_week:02d}"
+    raise ValueError(f"Unknown leaderboard window: {window}")
+
+
+def theme_scope(theme_id: str) -> str:
+    return f"theme:{theme_id}"
+
+
+# Los periodos diarios y semanales caducan solos: se conservan el actual y el anterior
+PERIOD_TTL_SECONDS = {WINDOW_DAILY: 2 * 86400.0, WINDOW_WEEKLY: 14 * 86400.0}
+
+
+class Leaderboards:
+    """Incrementally maintained leaderboards (global and per theme, all-time/daily/weekly).
+
+    Each (scope, window, period) is a ranking in the shared room-state backend
+    that is updated when a round is scored, so reads never scan room_participants
+    and every worker serves the same standings. With ROOM_STATE_URL on Redis they
+    also survive restarts and deploys; rows archived out of the database keep
+    counting. Only the current and the previous period are kept for the daily
+    and weekly windows.
+    """
+
+    def __init__(self, backend: RoomStateBackend, prefix: str = ROOM_STATE_PREFIX):
+        self.backend = backend
+        self.prefix = prefix
+        self._nicknames_key = f"{prefix}:leaderboard:nicknames"
+
+    def _key(self, scope: str, window: str, at: datetime) -> str:
+        return f"{self.prefix}:leaderboard:{scope}:{window}:{period_key(window, at)}"
+
+    async def record_round(self, theme_id: Optional[str], entries: Iterable[RoundScoreEntry], at: Optional[datetime] = None) -> None:
+        at = at or datetime.now(timezone.utc)
+        scopes = [GLOBAL_SCOPE]
+        if theme_id:
+            scopes.append(theme_scope(str(theme_id)))
+
+        increments: Dict[str, int] = {}
+        nicknames: Dict[str, str] = {}
+        for entry in entries:
+            nicknames[entry.user_id] = entry.nickname
+            if entry.round_score:
+                increments[entry.user_id] = increments.get(entry.user_id, 0) + entry.round_score
+        if increments:
+            await asyncio.gather(*(
+                self.backend.increment_scores(self._key(scope, window, at), increments, PERIOD_TTL_SECONDS.get(window))
+                for scope in scopes for window in WINDOWS
+            ))
+        if nicknames:
+            await self.backend.update_fields(self._nicknames_key, values=nicknames)
+
+    async def top(self, scope: str, window: str = WINDOW_ALL, limit: int = 10, offset: int = 0, at: Optional[datetime] = None) -> List[dict]:
+        at = at or datetime.now(timezone.utc)
+        rows = await self.backend.top_scores(self._key(scope, window, at), limit, offset)
+        nicknames = await self.backend.get_fields(self._nicknames_key, [user_id for user_id, _ in rows])
+        return [
+            {"rank": offset + position, "user_id": user_id, "nickname": nicknames.get(user_id), "score": score}
+            for position, (user_id, score) in enumerate(rows, start=1)
+        ]
+
+    async def rank_of(self, scope: str, user_id: str, window: str = WINDOW_ALL, at: Optional[datetime] = None) -> Optional[dict]:
+        at = at or datetime.now(timezone.utc)
+        ranked = await self.backend.score_rank(self._key(scope, window, at), user_id)
+        if ranked is None:
+            return None
+        rank, score = ranked
+        nicknames = await self.backend.get_fields(self._nicknames_key, [user_id])
+        return {"rank": rank, "user_id": user_id, "nickname": nicknames.get(user_id), "score": score}
+
+    async def size(self, scope: str, window: str = WINDOW_ALL, at: Optional[datetime] = None) -> int:
+        at = at or datetime.now(timezone.utc)
+        return await self.backend.score_count(self._key(scope, window, at))
+
+
+leaderboards = Leaderboards(room_state.backend)
+
+
+def get_leaderboards() -> Leaderboards:
+    return leaderboards
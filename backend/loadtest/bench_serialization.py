@@ -0,0 +1,101 @@
+# backend/loadtest/bench_serialization.py
+"""Micro-benchmark: default Pydantic/FastAPI serialization vs the fast path (backend/fast_json.py).
+
+Uso:
+    python -m backend.loadtest.bench_serialization --players 16 --categories 6 --iterations 2000
+
+Mide el costo por respuesta de una sala de 16 jugadores (GameRoomResponse) y de
+los resultados de una ronda (RoundResultsResponse), sin red ni base de datos.
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Tuple
+
+from ..fast_json import dumps, project
+from ..models.game_models import GameRoomResponse, RoundResultsResponse
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def build_room(players: int) -> dict:
+    """A game_rooms row with embedded room_participants, as PostgREST returns it."""
+    room_id = str(uuid.uuid4())
+    return {
+        "id": room_id, "room_code": "ABC123", "theme_id": str(uuid.uuid4()), "host_user_id": str(uuid.uuid4()),
+        "status": "in_progress", "current_letter": "M", "current_round_number": 2, "max_players": 16,
+        "scoring_rules": {"profile": "split", "unique_points": 100, "repeated_points": 50, "split_repeated": True,
+                          "solo_category_bonus": 0, "max_rounds": 3, "round_time_limit_seconds": None},
+        "created_at": _now(), "current_round_basta_caller_id": None, "current_round_basta_called_at": None,
+        "room_participants": [
+            {"id": str(uuid.uuid4()), "game_room_id": room_id, "user_id": str(uuid.uuid4()), "nickname": f"Jugador {i}",
+             "score": i * 50, "is_ready": True, "joined_at": _now(), "created_at": _now()}
+            for i in range(players)
+        ],
+    }
+
+
+def build_results(players: int, categories: int) -> dict:
+    category_ids = [str(uuid.uuid4()) for _ in range(categories)]
+    return {
+        "room_id": str(uuid.uuid4()), "round_number": 2, "current_letter": "M", "room_status": "round_over_results",
+        "categories": [{"id": cid, "name": f"Categoría {i}", "order": i} for i, cid in enumerate(category_ids)],
+        "results_by_participant": [
+            {"participant_id": str(uuid.uuid4()), "user_id": str(uuid.uuid4()), "nickname": f"Jugador {i}",
+             "round_score": 300, "total_score": 900,
+             "answers": {cid: {"text": f"Messi {i}", "score": 50, "is_valid": True, "notes": "Repetida (2)"} for cid in category_ids}}
+            for i in range(players)
+        ],
+    }
+
+
+def default_path(model) -> Callable[[dict], bytes]:
+    # Lo que hace FastAPI con response_model: construir el modelo (validación), volcarlo a JSON-compatible y json.dumps
+    def run(data: dict) -> bytes:
+        instance = model(**data)
+        content = instance.model_dump(mode="json", by_alias=True)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return run
+
+
+def fast_path(model) -> Callable[[dict], bytes]:
+    def run(data: dict) -> bytes:
+        return dumps(project(model, data))
+    return run
+
+
+def measure(fn: Callable[[dict], bytes], data: dict, iterations: int) -> Tuple[float, int]:
+    size = len(fn(data)) # Calentamiento
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(data)
+    return (time.perf_counter() - started) / iterations, size
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=16)
+    parser.add_argument("--categories", type=int, default=6)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    cases = [
+        ("GameRoomResponse", GameRoomResponse, build_room(args.players)),
+        ("RoundResultsResponse", RoundResultsResponse, build_results(args.players, args.categories)),
+    ]
+    print(f"{'response':<24}{'path':<10}{'us/resp':>12}{'bytes':>10}{'speedup':>10}")
+    for name, model, data in cases:
+        default_seconds, default_size = measure(default_path(model), data, args.iterations)
+        fast_seconds, fast_size = measure(fast_path(model), data, args.iterations)
+        print(f"{name:<24}{'default':<10}{default_seconds * 1e6:>12.1f}{default_size:>10}")
+        print(f"{name:<24}{'fast':<10}{fast_seconds * 1e6:>12.1f}{fast_size:>10}{default_seconds / fast_seconds:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+# backend/loadtest/fake_supabase.py
+"""In-memory stand-in for the subset of the Supabase/PostgREST client used by the API.
+
+Se usa para pruebas de carga locales: las tablas viven en memoria y cada
+`.execute()` puede simular la latencia de red de un round trip a PostgREST.
+"""
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Valores por defecto que PostgreSQL pondría en cada tabla
+TABLE_DEFAULTS: Dict[str, Callable[[], dict]] = {
+    "themes": lambda: {"created_at": _now()},
+    "categories": lambda: {"created_at": _now(), "order": 0},
+    "game_rooms": lambda: {
+        "created_at": _now(), "status": "waiting", "current_letter": None, "current_round_number": 0,
+        "current_round_basta_caller_id": None, "current_round_basta_called_at": None, "scoring_rules": None,
+        "tournament_id": None, "tournament_stage": None,
+    },
+    "room_participants": lambda: {"created_at": _now(), "joined_at": _now(), "score": 0, "is_ready": False},
+    "player_round_answers": lambda: {"created_at": _now(), "score_awarded": 0, "is_valid": None, "validation_notes": None},
+    "answer_drafts": lambda: {"created_at": _now()},
+    "tournaments": lambda: {
+        "created_at": _now(), "status": "registering", "current_stage": 0, "current_round_number": 0,
+        "phase_started_at": None, "winner_user_id": None,
+    },
+    "tournament_entries": lambda: {
+        "created_at": _now(), "stage": 0, "game_room_id": None, "stage_score": 0, "carried_score": 0, "eliminated": False,
+    },
+}
+
+UNIQUE_CONSTRAINTS: Dict[str, List[Tuple[str, ...]]] = {
+    "game_rooms": [("room_code",)],
+    "room_participants": [("game_room_id", "user_id")],
+    "player_round_answers": [("room_participant_id", "round_number", "category_id")],
+    "tournament_entries": [("tournament_id", "user_id"), ("tournament_id", "seed")],
+    "answer_drafts": [("room_participant_id", "round_number")],
+}
+
+# (tabla padre, relación embebida) -> columna FK en la tabla embebida
+EMBEDDED_RELATIONS: Dict[Tuple[str, str], str] = {
+    ("game_rooms", "room_participants"): "game_room_id",
+}
+
+
+# Columnas con índice hash para que las consultas no recorran la tabla completa
+INDEXED_COLUMNS = ("id", "game_room_id", "room_code", "theme_id", "room_participant_id", "user_id", "tournament_id")
+
+
+class FakeResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+        self.error = None
+
+
+def _split_columns(columns: str) -> List[str]:
+    parts, depth, current = [], 0, ""
+    for char in columns:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _as_comparable(value):
+    return str(value) if value is not None and not isinstance(value, (int, float, bool)) else value
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeSupabaseClient", table: str):
+        self._client = client
+        self._table = table
+        self._operation = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload = None
+        self._on_conflict = None
+        self._filters: List[Callable[[dict], bool]] = []
+        self._index_lookup: Optional[Tuple[str, Any]] = None
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._single = False
+        self._maybe_single = False
+
+    # --- Operaciones ---
+    def select(self, *columns, count: Optional[str] = None):
+        self._operation = "select"
+        self._columns = ",".join(columns) if columns else "*"
+        self._count = count
+        return self
+
+    def insert(self, payload, count: Optional[str] = None, returning: str = "representation", upsert: bool = False):
+        self._operation = "insert"
+        self._payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = "", ignore_duplicates: bool = False, **kwargs):
+        self._operation = "upsert"
+        self._payload = payload
+        self._on_conflict = tuple(c.strip() for c in on_conflict.split(",") if c.strip()) or ("id",)
+        return self
+
+    def update(self, payload, count: Optional[str] = None):
+        self._operation = "update"
+        self._payload = payload
+        return self
+
+    def delete(self, count: Optional[str] = None):
+        self._operation = "delete"
+        return self
+
+    # --- Filtros ---
+    def _filter(self, column: str, predicate: Callable[[Any], bool]):
+        self._filters.append(lambda row: predicate(_as_comparable(row.get(column))))
+        return self
+
+    def eq(self, column: str, value):
+        if self._index_lookup is None and column in INDEXED_COLUMNS:
+            self._index_lookup = (column, _as_comparable(value))
+        return self._filter(column, lambda v: v == _as_comparable(value))
+
+    def neq(self, column: str, value):
+        return self._filter(column, lambda v: v != _as_comparable(value))
+
+    def in_(self, column: str, values):
+        wanted = {_as_comparable(v) for v in values}
+        return self._filter(column, lambda v: v in wanted)
+
+    def gt(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v > _as_comparable(value))
+
+    def gte(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v >= _as_comparable(value))
+
+    def lt(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v < _as_comparable(value))
+
+    def lte(self, column: str, value):
+        return self._filter(column, lambda v: v is not None and v <= _as_comparable(value))
+
+    def is_(self, column: str, value):
+        expected = None if value in (None, "null") else value
+        return self._filter(column, lambda v: v is expected or v == expected)
+
+    def order(self, column: str, desc: bool = False, nullsfirst: bool = False, foreign_table: Optional[str] = None):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, foreign_table: Optional[str] = None):
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int, foreign_table: Optional[str] = None):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def maybe_single(self):
+        self._maybe_single = True
+        return self
+
+    # --- Ejecución ---
+    def execute(self) -> Optional[FakeResponse]:
+        self._client.simulate_latency(self._table, self._operation)
+        with self._client.lock:
+            if self._operation == "select":
+                return self._execute_select()
+            if self._operation in ("insert", "upsert"):
+                return self._execute_insert()
+            if self._operation == "update":
+                return self._execute_update()
+            return self._execute_delete()
+
+    def _matching_rows(self) -> List[dict]:
+        if self._index_lookup is not None:
+            candidates = self._client.index_lookup(self._table, *self._index_lookup)
+        else:
+            candidates = self._client.rows(self._table)
+        rows = [row for row in candidates if all(f(row) for f in self._filters)]
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        return rows
+
+    def _project(self, row: dict, columns: str, table: str) -> dict:
+        result = {}
+        for column in _split_columns(columns):
+            if column == "*":
+                result.update(row)
+            elif "(" in column:
+                relation, nested_columns = column[:-1].split("(", 1)
+                relation = relation.strip()
+                fk_column = EMBEDDED_RELATIONS[(table, relation)]
+                children = self._client.index_lookup(relation, fk_column, str(row["id"]))
+                if nested_columns.strip() == "count":
+                    result[relation] = [{"count": len(children)}]
+                else:
+                    result[relation] = [self._project(child, nested_columns, relation) for child in children]
+            else:
+                result[column] = row.get(column)
+        return result
+
+    def _finish(self, rows: List[dict], count: Optional[int] = None) -> Optional[FakeResponse]:
+        if self._single or self._maybe_single:
+            if len(rows) != 1:
+                if self._maybe_single and not rows:
+                    return None # Igual que postgrest 1.x: maybe_single sin filas devuelve None, no una respuesta vacía
+                raise APIError({
+                    "code": "PGRST116",
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "details": f"The result contains {len(rows)} rows",
+                    "hint": None,
+                })
+            return FakeResponse(rows[0], count)
+        return FakeResponse(rows, count)
+
+    def _execute_select(self) -> Optional[FakeResponse]:
+        rows = self._matching_rows()
+        count = len(rows) if self._count else None
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return self._finish([self._project(row, self._columns, self._table) for row in rows], count)
+
+    def _violates_unique(self, candidate: dict, ignore: Optional[dict] = None) -> bool:
+        for columns in UNIQUE_CONSTRAINTS.get(self._table, []):
+            key = tuple(str(candidate.get(c)) for c in columns)
+            candidates = self._client.index_lookup(self._table, columns[0], _as_comparable(candidate.get(columns[0])))
+            for row in candidates:
+                if row is not ignore and tuple(str(row.get(c)) for c in columns) == key:
+                    return True
+        return False
+
+    @staticmethod
+    def _unique_violation() -> APIError:
+        return APIError({"code": "23505", "message": "duplicate key value violates unique constraint", "details": None, "hint": None})
+
+    def _execute_insert(self) -> FakeResponse:
+        payloads = self._payload if isinstance(self._payload, list) else [self._payload]
+        table_rows = self._client.rows(self._table)
+        inserted = []
+        for payload in payloads:
+            if self._operation == "upsert":
+                existing = next(
+                    (row for row in table_rows if all(str(row.get(c)) == str(payload.get(c)) for c in self._on_conflict)),
+                    None
+                )
+                if existing is not None:
+                    existing.update(payload)
+                    self._client.reindex(self._table)
+                    inserted.append(dict(existing))
+                    continue
+            row = {"id": str(uuid.uuid4()), **TABLE_DEFAULTS.get(self._table, dict)(), **payload}
+            if self._violates_unique(row):
+                raise self._unique_violation()
+            table_rows.append(row)
+            self._client.index_row(self._table, row)
+            inserted.append(dict(row))
+        return FakeResponse(inserted)
+
+    def _execute_update(self) -> FakeResponse:
+        updated = []
+        for row in self._matching_rows():
+            candidate = {**row, **self._payload}
+            if self._violates_unique(candidate, ignore=row):
+                raise self._unique_violation()
+            row.update(self._payload)
+            updated.append(dict(row))
+        if updated and any(column in INDEXED_COLUMNS for column in self._payload):
+            self._client.reindex(self._table)
+        return self._finish(updated) if self._single else FakeResponse(updated)
+
+    def _execute_delete(self) -> FakeResponse:
+        doomed = self._matching_rows()
+        doomed_ids = {id(row) for row in doomed}
+        self._client.tables[self._table] = [row for row in self._client.rows(self._table) if id(row) not in doomed_ids]
+        self._client.reindex(self._table)
+        return FakeResponse([dict(row) for row in doomed])
+
+
+class FakeRPC:
+    def __init__(self, client: "FakeSupabaseClient", function_name: str, params: dict):
+        self._client = client
+        self._function_name = function_name
+        self._params = params
+
+    def execute(self) -> FakeResponse:
+        self._client.simulate_latency("rpc", self._function_name)
+        handler = self._client.rpc_handlers.get(self._function_name)
+        if handler is None:
+            raise APIError({"code": "PGRST202", "message": f"Could not find the function {self._function_name}", "details": None, "hint": None})
+        with self._client.lock:
+            return FakeResponse(handler(self._client, **self._params))
+
+
+def _distinct_submitters_for_round(client: "FakeSupabaseClient", p_room_id: str, p_round_number: int) -> List[dict]:
+    submitters = {
+        str(row["room_participant_id"]) for row in client.rows("player_round_answers")
+        if str(row["game_room_id"]) == str(p_room_id) and row["round_number"] == p_round_number
+    }
+    return [{"submitter_count": len(submitters)}]
+
+
+class FakeSupabaseClient:
+    """Drop-in replacement for supabase.Client backed by in-memory tables.
+
+    latency_ms / jitter_ms se aplican con time.sleep en cada execute(), igual que el
+    cliente síncrono real bloquea el event loop mientras espera a PostgREST.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tables: Dict[str, List[dict]] = {}
+        self.indexes: Dict[Tuple[str, str], Dict[Any, List[dict]]] = {}
+        self.lock = threading.RLock()
+        self.rpc_handlers: Dict[str, Callable[..., Any]] = {
+            "get_distinct_submitters_for_round": _distinct_submitters_for_round,
+        }
+        self.round_trips = 0
+        self._random = random.Random(seed)
+
+    def rows(self, table: str) -> List[dict]:
+        return self.tables.setdefault(table, [])
+
+    def index_row(self, table: str, row: dict) -> None:
+        for column in INDEXED_COLUMNS:
+            if column in row:
+                self.indexes.setdefault((table, column), {}).setdefault(_as_comparable(row[column]), []).append(row)
+
+    def index_lookup(self, table: str, column: str, value) -> List[dict]:
+        if column not in INDEXED_COLUMNS:
+            return self.rows(table)
+        return self.indexes.get((table, column), {}).get(value, [])
+
+    def reindex(self, table: str) -> None:
+        for column in INDEXED_COLUMNS:
+            self.indexes.pop((table, column), None)
+        for row in self.rows(table):
+            self.index_row(table, row)
+
+    def simulate_latency(self, table: str, operation: str) -> None:
+        self.round_trips += 1
+        delay_ms = self.latency_ms
+        if self.jitter_ms:
+            delay_ms += self._random.uniform(0, self.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+    def table(self, table_name: str) -> FakeQuery:
+        return FakeQuery(self, table_name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Optional[dict] = None) -> FakeRPC:
+        return FakeRPC(self, fn, params or {})
+
+    def seed_theme(self, name: str, category_names: List[str]) -> Tuple[dict, List[dict]]:
+        theme = self.table("themes").insert({"name": name}).execute().data[0]
+        categories = self.table("categories").insert([
+            {"name": category_name, "theme_id": theme["id"], "order": position}
+            for position, category_name in enumerate(category_names)
+        ]).execute().data
+        return theme, categories
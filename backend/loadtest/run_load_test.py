@@ -0,0 +1,213 @@
+# backend/loadtest/run_load_test.py
+"""Simulates full BASTA games against the FastAPI app and an in-memory Supabase stand-in.
+
+Uso:
+    python -m backend.loadtest.run_load_test --rooms 500 --players 6 --rounds 3 --concurrency 100 --latency-ms 3
+
+Cada sala recorre create -> join -> ready -> start -> (BASTA -> results -> next round) x rondas.
+Al final se reporta p50/p95/p99 por endpoint y salas completadas por segundo.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import string
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List
+
+# La app lee estas variables al importarse: valores locales para no depender de un proyecto real
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "loadtest-service-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "loadtest-jwt-secret")
+os.environ.setdefault("AUDIT_LOG_ENABLED", "false")
+
+import httpx
+from jose import jwt
+
+from ..db import TrackedClient
+from ..main import app
+from ..metrics import DB_READ_ROUTING, DB_ROUND_TRIPS_PER_REQUEST, DB_TIME_PER_REQUEST
+from ..resilience import DB_HEDGED, DB_INJECTED_FAULTS, resilience
+from ..supabase_client import get_supabase_client
+from .fake_supabase import FakeSupabaseClient
+
+CATEGORY_NAMES = ["Jugador", "Equipo", "Estadio", "País", "Entrenador", "Liga"]
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, elapsed: float, ok: bool) -> None:
+        self.samples[endpoint].append(elapsed)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    @staticmethod
+    def percentile(sorted_samples: List[float], pct: float) -> float:
+        if not sorted_samples:
+            return 0.0
+        index = min(len(sorted_samples) - 1, int(round(pct / 100.0 * (len(sorted_samples) - 1))))
+        return sorted_samples[index]
+
+    def report(self) -> str:
+        lines = [f"{'endpoint':<48}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for endpoint in sorted(self.samples):
+            samples = sorted(self.samples[endpoint])
+            lines.append(
+                f"{endpoint:<48}{len(samples):>8}{self.errors[endpoint]:>8}"
+                f"{self.percentile(samples, 50) * 1000:>10.2f}"
+                f"{self.percentile(samples, 95) * 1000:>10.2f}"
+                f"{self.percentile(samples, 99) * 1000:>10.2f}"
+            )
+        return "\n".join(lines)
+
+
+class VirtualPlayer:
+    def __init__(self, http: httpx.AsyncClient, recorder: LatencyRecorder, secret: str):
+        self.user_id = str(uuid.uuid4())
+        self.email = f"player-{self.user_id[:8]}@loadtest.local"
+        token = jwt.encode(
+            {"sub": self.user_id, "email": self.email, "aud": "authenticated", "exp": int(time.time()) + 24 * 3600},
+            secret, algorithm="HS256"
+        )
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.http = http
+        self.recorder = recorder
+
+    async def call(self, method: str, endpoint: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.http.request(method, url, headers=self.headers, **kwargs)
+        self.recorder.record(endpoint, time.perf_counter() - started, response.status_code < 400)
+        return response
+
+
+async def play_game(http, recorder, secret, theme_id, categories, players_per_room, rounds) -> bool:
+    players = [VirtualPlayer(http, recorder, secret) for _ in range(players_per_room)]
+    host = players[0]
+
+    created = await host.call("POST", "POST /rooms/", "/api/v1/rooms/", json={"theme_id": theme_id, "max_players": max(players_per_room, 2), "max_rounds": rounds})
+    if created.status_code != 201:
+        return False
+    room = created.json()
+    room_id, room_code = room["id"], room["room_code"]
+
+    await asyncio.gather(*[
+        p.call("POST", "POST /rooms/{room_code}/join/", f"/api/v1/rooms/{room_code}/join/", json={"nickname": p.email[:12]})
+        for p in players[1:]
+    ])
+    await asyncio.gather(*[
+        p.call("PATCH", "PATCH /rooms/{room_id}/participants/me/ready", f"/api/v1/rooms/{room_id}/participants/me/ready", json={"is_ready": True})
+        for p in players
+    ])
+    started = await host.call("POST", "POST /rooms/{room_id}/start", f"/api/v1/rooms/{room_id}/start")
+    if started.status_code != 200:
+        return False
+    letter = started.json()["current_letter"]
+
+    for round_number in range(1, rounds + 1):
+        # Algunos jugadores consultan la sala mientras juegan (polling del cliente)
+        await asyncio.gather(*[
+            p.call("GET", "GET /rooms/{room_identifier}/", f"/api/v1/rooms/{room_id}/")
+            for p in random.sample(players, k=max(1, len(players) // 2))
+        ])
+
+        async def submit(player: VirtualPlayer):
+            answers = {
+                str(cat["id"]): letter + "".join(random.choices(string.ascii_lowercase, k=random.randint(2, 4)))
+                for cat in categories if random.random() < 0.9
+            }
+            return await player.call("POST", "POST /rooms/{room_id}/rounds/basta", f"/api/v1/rooms/{room_id}/rounds/basta", json={"answers": answers})
+
+        await asyncio.gather(*[submit(p) for p in players])
+        await asyncio.gather(*[
+            p.call("GET", "GET /rooms/{room_id}/rounds/{round_number}/results", f"/api/v1/rooms/{room_id}/rounds/{round_number}/results")
+            for p in players
+        ])
+        next_round = await host.call("POST", "POST /rooms/{room_id}/next-round", f"/api/v1/rooms/{room_id}/next-round")
+        if next_round.status_code != 200:
+            return False
+        letter = next_round.json().get("current_letter") or letter
+
+    return next_round.json().get("status") == "finished"
+
+
+async def run(args) -> int:
+    fake = FakeSupabaseClient(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+    theme, categories = fake.seed_theme("Load Test", CATEGORY_NAMES[:args.categories])
+    # Las réplicas simuladas comparten datos con el primario (sin lag): sirven para ver el reparto de lecturas
+    tracked_fake = TrackedClient(fake, replicas=[fake] * args.replicas)
+    resilience.set_fault_injection(args.faults)
+    app.dependency_overrides[get_supabase_client] = lambda: tracked_fake
+    secret = os.environ["SUPABASE_JWT_SECRET"]
+
+    recorder = LatencyRecorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    completed = 0
+    failed = 0
+
+    async def guarded_game(http):
+        nonlocal completed, failed
+        async with semaphore:
+            try:
+                ok = await play_game(http, recorder, secret, theme["id"], categories, args.players, args.rounds)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Virtual game crashed: {type(e).__name__} - {e}")
+                ok = False
+            if ok:
+                completed += 1
+            else:
+                failed += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as http:
+        started = time.perf_counter()
+        await asyncio.gather(*[guarded_game(http) for _ in range(args.rooms)])
+        elapsed = time.perf_counter() - started
+
+    print(recorder.report())
+    print()
+    print(f"{'route (server side)':<48}{'db calls/req':>14}{'db ms/req':>12}")
+    db_time = DB_TIME_PER_REQUEST.series()
+    for (route,), (round_trips, requests) in sorted(DB_ROUND_TRIPS_PER_REQUEST.series().items()):
+        seconds, _ = db_time.get((route,), (0.0, 0))
+        print(f"{route:<48}{round_trips / max(requests, 1):>14.1f}{seconds * 1000 / max(requests, 1):>12.2f}")
+    print()
+    if args.faults:
+        print(f"injected faults: {DB_INJECTED_FAULTS.value('error'):.0f} errors, {DB_INJECTED_FAULTS.value('latency'):.0f} slow calls; "
+              f"hedged reads: {DB_HEDGED.value('launched'):.0f} launched, {DB_HEDGED.value('won'):.0f} won")
+    if args.replicas:
+        print("read routing: " + ", ".join(f"{target}/{reason}={value:.0f}" for (target, reason), value in sorted(DB_READ_ROUTING.series().items())))
+    print(f"rooms: {completed} completed, {failed} failed, {args.rooms * args.players} virtual players")
+    print(f"wall time: {elapsed:.2f}s, {completed / elapsed:.2f} rooms/s, {fake.round_trips} DB round trips "
+          f"({fake.round_trips / max(completed, 1):.1f} per completed room)")
+    return 0 if failed == 0 else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--players", type=int, default=6, help="Players per room (2-16)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--categories", type=int, default=5, choices=range(1, len(CATEGORY_NAMES) + 1))
+    parser.add_argument("--concurrency", type=int, default=50, help="Games in flight at the same time")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Injected latency per DB call")
+    parser.add_argument("--jitter-ms", type=float, default=1.0, help="Extra random latency per DB call")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--replicas", type=int, default=0, help="Simulated read replicas (same data as the primary)")
+    parser.add_argument("--faults", default="", help="DB fault injection spec, e.g. 'error_rate=0.05,latency_ms=300,latency_rate=0.02'")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logs")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+# backend/logging_config.py
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower() # 'json' o 'text'
+LOG_MAX_MESSAGE_CHARS = int(os.environ.get("LOG_MAX_MESSAGE_CHARS", "1000"))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+# Fracción de requests cuyos logs INFO/DEBUG se conservan, por plantilla de ruta.
+# WARNING y superiores nunca se muestrean. Sobrescribible con LOG_SAMPLE_RATES="ruta=0.1;ruta2=0.5".
+DEFAULT_SAMPLE_RATES: Dict[str, float] = {
+    "/api/v1/rooms/{room_identifier}/": 0.1,
+    "/api/v1/rooms/{room_id}/rounds/{round_number}/results": 0.2,
+    "/metrics": 0.0,
+    "/ping": 0.0,
+    "/health/live": 0.0,
+    "/health/ready": 0.0,
+}
+
+_ROOM_IN_PATH = re.compile(r"/rooms/([^/]+)")
+_TEXT_FORMAT = '%(levelname)s:     %(name)s - %(asctime)s - [%(request_id)s] %(message)s'
+
+
+def _parse_sample_rates(raw: Optional[str]) -> Dict[str, float]:
+    rates = dict(DEFAULT_SAMPLE_RATES)
+    for item in (raw or "").split(";"):
+        if "=" in item:
+            route, rate = item.rsplit("=", 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+SAMPLE_RATES = _parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES"))
+
+
+class RequestLogContext:
+    __slots__ = ("request_id", "room_id", "scope", "_sampled")
+
+    def __init__(self, request_id: str, room_id: Optional[str], scope: dict):
+        self.request_id = request_id
+        self.room_id = room_id
+        self.scope = scope
+        self._sampled: Optional[bool] = None
+
+    @property
+    def route(self) -> Optional[str]:
+        route = self.scope.get("route")
+        return getattr(route, "path", None)
+
+    @property
+    def sampled(self) -> bool:
+        # Se decide una sola vez por request, cuando ya se conoce la ruta
+        if self._sampled is None:
+            route = self.route
+            if route is None:
+                return True
+            rate = SAMPLE_RATES.get(route, 1.0)
+            self._sampled = rate >= 1.0 or random.random() < rate
+        return self._sampled
+
+
+_log_context: ContextVar[Optional[RequestLogContext]] = ContextVar("log_context", default=None)
+
+
+def current_log_context() -> Optional[RequestLogContext]:
+    return _log_context.get()
+
+
+def bind_room_id(room_id) -> None:
+    """Lets handlers that resolve a room from a code attach its ID to later log lines."""
+    context = _log_context.get()
+    if context is not None:
+        context.room_id = str(room_id)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that only does O(1) work on the calling thread.
+
+    La plantilla y los argumentos se envían tal cual; el formateo (incluyendo
+    str() de payloads grandes) ocurre en el hilo del QueueListener.
+    """
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        if context is not None:
+            if record.levelno < logging.WARNING and not context.sampled:
+                return False
+            record.request_id = context.request_id
+            record.room_id = context.room_id
+            record.route = context.route
+        return super().handle(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass # Con la cola llena se descarta el log en lugar de bloquear el request
+
+
+def _truncate(text: str) -> str:
+    if len(text) <= LOG_MAX_MESSAGE_CHARS:
+        return text
+    return f"{text[:LOG_MAX_MESSAGE_CHARS]}…(+{len(text) - LOG_MAX_MESSAGE_CHARS} chars)"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": _truncate(record.getMessage()),
+        }
+        for field in ("request_id", "room_id", "route"):
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TruncatingTextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        record.msg = _truncate(record.getMessage())
+        record.args = None
+        return super().format(record)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT) -> None:
+    """Installs the queue-based pipeline on the root logger (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if log_format == "json" else TruncatingTextFormatter(_TEXT_FORMAT))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(ContextQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop() # Vacía la cola antes de terminar
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """Assigns a correlation id to each request (reusing X-Request-ID if sent) and echoes it back."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        room_match = _ROOM_IN_PATH.search(scope.get("path", ""))
+        token = _log_context.set(RequestLogContext(request_id, room_match.group(1) if room_match else None, scope))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _log_context.reset(token)
@@ -1,19 +1,30 @@
+import time
+_IMPORT_STARTED = time.perf_counter() # Tiempo de import de la app (medido en basta_boot_seconds{phase="import"})
+
 import logging
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from supabase import Client
 
-from .supabase_client import get_supabase_client
+from .compression import CompressionMiddleware
+from .db import RequestScopeMiddleware
+from .idempotency import IdempotencyMiddleware
+from .metrics import RequestMetricsMiddleware, registry as metrics_registry
+from .room_state import RoomAffinityMiddleware
+from .logging_config import configure_logging, RequestContextMiddleware
+from .startup import boot_state, lifespan
 
-from .routers import game_config_router, rooms_router
+from .routers import game_config_router, rooms_router, leaderboards_router, players_router, tournaments_router
 
-logging.basicConfig(level=logging.INFO, format='%(levelname)s:     %(name)s - %(asctime)s - %(message)s')
+# Logs JSON estructurados a través de una cola: el formateo y la escritura ocurren fuera del request
+configure_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Basta App API",
     description="API para el juego de BASTA multijugador.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan # Clientes, warm-up de cachés y apagado ordenado (backend/startup.py)
 )
 
 logger.info("Iniciando la aplicación Basta App API...")
@@ -33,8 +44,26 @@ app.add_middleware(
     allow_headers=["*"],    # Permite todos los headers
 )
 
+# Reintentos con el mismo Idempotency-Key reciben la respuesta guardada sin tocar la base
+app.add_middleware(IdempotencyMiddleware)
+# Caché de lecturas por request (deduplicación DataLoader-style en backend/db.py)
+app.add_middleware(RequestScopeMiddleware)
+# gzip/brotli negociado para respuestas JSON grandes; por fuera del idempotency store (guarda sin comprimir)
+app.add_middleware(CompressionMiddleware)
+# Latencia por ruta y round trips a Supabase por request, expuestos en /metrics
+app.add_middleware(RequestMetricsMiddleware)
+# Pistas de afinidad por sala (X-Room-Affinity) para el balanceador
+app.add_middleware(RoomAffinityMiddleware)
+# Request ID (X-Request-ID) y room ID para correlacionar logs; va por fuera de las métricas
+app.add_middleware(RequestContextMiddleware)
+
 app.include_router(game_config_router.router, prefix="/api/v1")
 app.include_router(rooms_router.router, prefix="/api/v1")
+app.include_router(leaderboards_router.router, prefix="/api/v1")
+app.include_router(players_router.router, prefix="/api/v1")
+app.include_router(tournaments_router.router, prefix="/api/v1")
+
+boot_state.record_phase("import", time.perf_counter() - _IMPORT_STARTED)
 
 @app.get("/")
 async def root():
@@ -43,3 +72,17 @@ async def root():
 @app.get("/ping")
 async def ping():
     return {"message": "pong"}
+
+@app.get("/health/live", include_in_schema=False)
+async def health_live():
+    # Solo comprueba que el event loop responde; no depende de servicios externos
+    return {"status": "alive", "uptime_seconds": round(time.monotonic() - boot_state.process_started, 1)}
+
+@app.get("/health/ready", include_in_schema=False)
+async def health_ready():
+    readiness = boot_state.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,249 @@
+# backend/metrics.py
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def series(self) -> Dict[Tuple[str, ...], float]:
+        return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [conteo por bucket (no acumulado)..., +Inf], suma, total
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *labels: str) -> Tuple[float, int]:
+        """Returns (sum, count) for one label set."""
+        series = self._series.get(labels)
+        return (series[1], series[2]) if series else (0.0, 0)
+
+    def series(self) -> Dict[Tuple[str, ...], Tuple[float, int]]:
+        return {labels: (series[1], series[2]) for labels, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, (bucket_counts, total_sum, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', repr(float(bound))))} {cumulative}")
+            cumulative += bucket_counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total_sum}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._metrics.get(name) or self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._metrics.get(name) or self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.get(name) or self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "basta_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+DB_CALL_DURATION = registry.histogram(
+    "basta_db_call_duration_seconds", "Latency of each Supabase/PostgREST call.", ("table", "operation")
+)
+DB_CALL_ERRORS = registry.counter(
+    "basta_db_call_errors_total", "Supabase/PostgREST calls that raised.", ("table", "operation")
+)
+DB_REQUEST_CACHE_HITS = registry.counter(
+    "basta_db_request_cache_hits_total", "Reads answered by the per-request query cache instead of Supabase.", ("table",)
+)
+DB_READ_ROUTING = registry.counter(
+    "basta_db_read_routing_total", "Reads by target (replica/primary) and why they went there.", ("target", "reason")
+)
+DB_ROUND_TRIPS_PER_REQUEST = registry.histogram(
+    "basta_db_round_trips_per_request", "Supabase round trips issued while serving one request.", ("route",), ROUND_TRIP_BUCKETS
+)
+DB_TIME_PER_REQUEST = registry.histogram(
+    "basta_db_time_per_request_seconds", "Time spent waiting on Supabase while serving one request.", ("route",)
+)
+
+
+class RequestDBStats:
+    __slots__ = ("round_trips", "db_seconds", "by_call")
+
+    def __init__(self):
+        self.round_trips = 0
+        self.db_seconds = 0.0
+        self.by_call: Dict[Tuple[str, str], int] = {}
+
+
+_request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_request_db_stats() -> Optional[RequestDBStats]:
+    return _request_db_stats.get()
+
+
+def record_db_call(table: str, operation: str, elapsed: float, failed: bool = False) -> None:
+    DB_CALL_DURATION.observe(elapsed, table, operation)
+    if failed:
+        DB_CALL_ERRORS.inc(table, operation)
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.round_trips += 1
+        stats.db_seconds += elapsed
+        key = (table, operation)
+        stats.by_call[key] = stats.by_call.get(key, 0) + 1
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware that records per-route latency and DB round trips per request.
+
+    Also adds a Server-Timing header so the DB share of a request is visible
+    from the browser's network panel.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDBStats()
+        token = _request_db_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.round_trips} calls"'.encode("latin-1")
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_db_stats.reset(token)
+            route = _route_template(scope)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, scope.get("method", ""), route, str(status_code))
+            DB_ROUND_TRIPS_PER_REQUEST.observe(stats.round_trips, route)
+            DB_TIME_PER_REQUEST.observe(stats.db_seconds, route)
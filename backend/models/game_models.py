@@ -34,6 +34,36 @@ class Category(CategoryBase):
     class Config:
         from_attributes = True
 
+# --- Catalog Import Models ---
+class CatalogImportRow(BaseModel):
+    # Una fila de la importación masiva: crea el theme si no existe y, opcionalmente, una categoría
+    theme: Optional[str] = Field(None, min_length=3, max_length=100)
+    theme_id: Optional[UUID] = None
+    category: Optional[str] = Field(None, min_length=3, max_length=100)
+    order: Optional[int] = None
+
+class CatalogImportError(BaseModel):
+    line: int
+    error: str
+
+class CatalogImportBatch(BaseModel):
+    batch: int
+    first_line: int
+    last_line: int
+    rows: int
+    inserted: int
+    error: Optional[str] = None
+
+class CatalogImportResult(BaseModel):
+    dry_run: bool
+    rows_read: int
+    rows_invalid: int
+    themes_created: int
+    categories_created: int
+    errors: List[CatalogImportError] # Primeros errores de validación por línea
+    batches: List[CatalogImportBatch]
+    elapsed_seconds: float
+
 # --- User Model ---
 class User(BaseModel):
     id: UUID
@@ -58,10 +88,27 @@ class RoomParticipant(RoomParticipantBase): # Hereda nickname de RoomParticipant
     class Config:
         from_attributes = True
 
+# --- Scoring Rules Models ---
+class ScoringRules(BaseModel):
+    # Reglas de puntuación de una sala; se guardan en game_rooms.scoring_rules (jsonb)
+    profile: str = "split"
+    unique_points: int = Field(default=100, ge=0)
+    repeated_points: int = Field(default=50, ge=0) # Solo aplica si split_repeated es False
+    split_repeated: bool = True # True: las repetidas reparten unique_points entre quienes coinciden
+    solo_category_bonus: int = Field(default=0, ge=0) # Extra si eres el único con respuesta válida en la categoría
+    max_rounds: int = Field(default=3, ge=1, le=20)
+    round_time_limit_seconds: Optional[int] = Field(default=None, ge=15, le=600)
+
+    class Config:
+        frozen = True # Hashable: permite cachear la función de puntuación compilada
+
 # --- GameRoom Models ---
 class GameRoomCreate(BaseModel):
     theme_id: UUID
     max_players: Optional[int] = Field(default=8, ge=2, le=16)
+    scoring_profile: str = Field(default="split", examples=["classic"])
+    max_rounds: Optional[int] = Field(default=None, ge=1, le=20) # Sobrescribe el valor del perfil
+    round_time_limit_seconds: Optional[int] = Field(default=None, ge=15, le=600)
 
 class GameRoom(BaseModel):
     id: UUID
@@ -72,6 +119,7 @@ class GameRoom(BaseModel):
     current_letter: Optional[str] = None
     current_round_number: Optional[int] = 0
     max_players: int
+    scoring_rules: Optional[ScoringRules] = None
     created_at: datetime
     # El campo se llama 'participants' en nuestro modelo/API,
     # pero Pydantic lo llenará desde la clave 'room_participants' de los datos de entrada.
@@ -92,6 +140,12 @@ class SetReadyPayload(BaseModel):
 class PlayerAnswers(BaseModel):
     answers: Dict[str, Optional[str]]
 
+class AnswerDraft(BaseModel):
+    # Borrador autoguardado mientras el jugador escribe (ver backend/drafts.py)
+    round_number: int
+    answers: Dict[str, Optional[str]]
+    updated_at: datetime
+
 # --- Result Models ---
 class AnswerResult(BaseModel):
     text: Optional[str] = None
@@ -118,4 +172,125 @@ class RoundResultsResponse(BaseModel):
     current_letter: str
     categories: List[CategoryInfo] # Lista de categorías en orden
     results_by_participant: List[ParticipantRoundResult]
-    room_status: str
\ No newline at end of file
+    room_status: str
+
+# --- Dispute Models ---
+class DisputeCreate(BaseModel):
+    answer_id: UUID # Fila de player_round_answers impugnada
+
+class DisputeVote(BaseModel):
+    valid: bool # Opinión del votante: ¿la respuesta debería contar como válida?
+
+class DisputeSummary(BaseModel):
+    answer_id: UUID
+    participant_id: UUID
+    category_id: UUID
+    answer_text: Optional[str] = None
+    is_valid: bool # Decisión del puntaje automático
+    valid_votes: int
+    invalid_votes: int
+    my_vote: Optional[bool] = None
+    overturned: bool # Con los votos actuales, ¿se invertiría al cerrar la fase?
+
+# --- Session Resume Models ---
+class ResumeAnswers(BaseModel):
+    round_number: int
+    source: str # 'submitted' | 'draft' | 'none'
+    answers: Dict[str, Optional[str]] # Clave es category_id
+
+class SessionResumeResponse(BaseModel):
+    room: GameRoomResponse
+    categories: List[CategoryInfo] # En orden
+    participant_id: UUID
+    my_answers: Optional[ResumeAnswers] = None # Solo si la sala ya empezó
+    round_started_at: Optional[datetime] = None
+    round_deadline: Optional[datetime] = None # round_started_at + round_time_limit_seconds
+    server_time: datetime # Para que el cliente corrija el desfase de su reloj al mostrar la cuenta regresiva
+    last_results: Optional[RoundResultsResponse] = None # Resultados de la ronda actual si ya se puntuó
+
+# --- Tournament Models ---
+class TournamentCreate(BaseModel):
+    name: str = Field(..., min_length=3, max_length=100, examples=["Copa de los Viernes"])
+    theme_id: UUID
+    room_size: int = Field(default=8, ge=2, le=16)
+    advance_per_room: int = Field(default=2, ge=1, le=8) # Clasificados por sala al cerrar cada fase
+    scoring_profile: str = Field(default="split", examples=["classic"])
+    max_rounds: Optional[int] = Field(default=None, ge=1, le=20) # Rondas por fase
+    round_seconds: int = Field(default=90, ge=15, le=600) # Duración de cada ronda en el calendario compartido
+    results_seconds: int = Field(default=20, ge=5, le=300) # Pausa para ver resultados antes de la siguiente ronda
+    auto_advance: bool = True # False: el host avanza cada paso con /advance
+
+class JoinTournamentPayload(BaseModel):
+    nickname: Optional[str] = Field(None, min_length=2, max_length=50)
+
+class TournamentStanding(BaseModel):
+    rank: int
+    user_id: UUID
+    nickname: str
+    seed: int
+    stage: int
+    game_room_id: Optional[UUID] = None
+    stage_score: int
+    total_score: int
+    eliminated: bool
+
+class TournamentRoom(BaseModel):
+    id: UUID
+    room_code: str
+    status: str
+    current_round_number: Optional[int] = 0
+    players: int
+
+class TournamentResponse(BaseModel):
+    id: UUID
+    name: str
+    theme_id: UUID
+    host_user_id: UUID
+    status: str # registering | round_in_progress | round_results | finished
+    current_stage: int
+    current_round_number: int
+    room_size: int
+    advance_per_room: int
+    round_seconds: int
+    results_seconds: int
+    auto_advance: bool
+    scoring_rules: Optional[ScoringRules] = None
+    winner_user_id: Optional[UUID] = None
+    next_step_at: Optional[datetime] = None # Cuándo el calendario ejecuta el siguiente paso
+    created_at: datetime
+    standings: List[TournamentStanding] = []
+    rooms: List[TournamentRoom] = [] # Salas de la fase actual
+
+# --- Leaderboard Models ---
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: UUID
+    nickname: Optional[str] = None
+    score: int
+
+class LeaderboardResponse(BaseModel):
+    scope: str # 'global' o 'theme:<theme_id>'
+    window: str # 'all', 'daily' o 'weekly'
+    total_players: int
+    entries: List[LeaderboardEntry]
+
+
+# --- Player Stats Models ---
+class FavoriteCategory(BaseModel):
+    category_id: UUID
+    valid_answers: int
+
+class PlayerStatsResponse(BaseModel):
+    user_id: UUID
+    nickname: str
+    games_played: int
+    wins: int
+    rounds_played: int
+    total_round_score: int
+    average_round_score: float
+    answers_submitted: int
+    valid_answers: int
+    unique_answers: int
+    unique_answer_rate: float # unique_answers / valid_answers
+    favorite_categories: List[FavoriteCategory]
+    updated_at: Optional[datetime] = None
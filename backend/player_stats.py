@@ -0,0 +1,150 @@
+# backend/player_stats.py
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+from .room_state import ROOM_STATE_PREFIX, RoomStateBackend, room_state
+
+logger = logging.getLogger(__name__)
+
+FAVORITE_CATEGORIES_LIMIT = 3
+
+# Campos del hash de cada jugador que son contadores; las categorías van como "category:<id>"
+COUNTER_FIELDS = ("games_played", "wins", "rounds_played", "total_round_score", "answers_submitted", "valid_answers", "unique_answers")
+CATEGORY_FIELD_PREFIX = "category:"
+
+
+@dataclass
+class PlayerRoundSummary:
+    user_id: str
+    nickname: str
+    round_score: int
+    answers_submitted: int
+    valid_answers: int
+    unique_answers: int
+    category_ids: List[str] = field(default_factory=list) # Categorías con respuesta válida
+
+
+@dataclass
+class PlayerStats:
+    user_id: str
+    nickname: str = ""
+    games_played: int = 0
+    wins: int = 0
+    rounds_played: int = 0
+    total_round_score: int = 0
+    answers_submitted: int = 0
+    valid_answers: int = 0
+    unique_answers: int = 0
+    category_counts: Counter = field(default_factory=Counter)
+    updated_at: Optional[datetime] = None
+
+    @property
+    def average_round_score(self) -> float:
+        return self.total_round_score / self.rounds_played if self.rounds_played else 0.0
+
+    @property
+    def unique_answer_rate(self) -> float:
+        return self.unique_answers / self.valid_answers if self.valid_answers else 0.0
+
+    @classmethod
+    def from_fields(cls, user_id: str, fields: Dict[str, Any]) -> "PlayerStats":
+        updated_at = fields.get("updated_at")
+        return cls(
+            user_id=user_id,
+            nickname=fields.get("nickname") or "",
+            category_counts=Counter({
+                name[len(CATEGORY_FIELD_PREFIX):]: int(count)
+                for name, count in fields.items() if name.startswith(CATEGORY_FIELD_PREFIX)
+            }),
+            updated_at=datetime.fromisoformat(updated_at) if updated_at else None,
+            **{name: int(fields.get(name) or 0) for name in COUNTER_FIELDS},
+        )
+
+    def favorite_categories(self, limit: int = FAVORITE_CATEGORIES_LIMIT) -> List[dict]:
+        return [{"category_id": cat_id, "valid_answers": count} for cat_id, count in self.category_counts.most_common(limit)]
+
+    def to_dict(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "nickname": self.nickname,
+            "games_played": self.games_played,
+            "wins": self.wins,
+            "rounds_played": self.rounds_played,
+            "total_round_score": self.total_round_score,
+            "average_round_score": round(self.average_round_score, 2),
+            "answers_submitted": self.answers_submitted,
+            "valid_answers": self.valid_answers,
+            "unique_answers": self.unique_answers,
+            "unique_answer_rate": round(self.unique_answer_rate, 4),
+            "favorite_categories": self.favorite_categories(),
+            "updated_at": self.updated_at,
+        }
+
+
+class PlayerStatsStore:
+    """Running per-user aggregates, updated when rounds are scored and games finish.
+
+    Each player is one hash of counters in the shared room-state backend, so any
+    worker can add to it without a lock (HINCRBY on Redis) and a profile read is
+    a single lookup; nothing is recomputed from player_round_answers or
+    room_participants, which the archiver eventually empties.
+    """
+
+    def __init__(self, backend: RoomStateBackend, prefix: str = ROOM_STATE_PREFIX):
+        self.backend = backend
+        self.prefix = prefix
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.prefix}:player:{user_id}:stats"
+
+    async def get(self, user_id: str) -> Optional[PlayerStats]:
+        fields = await self.backend.get_fields(self._key(user_id))
+        return PlayerStats.from_fields(user_id, fields) if fields else None
+
+    async def _update(self, user_id: str, nickname: Optional[str], at: datetime, increments: Dict[str, int]) -> None:
+        values = {"updated_at": at.isoformat()}
+        if nickname:
+            values["nickname"] = nickname
+        await self.backend.update_fields(self._key(user_id), values=values, increments=increments)
+
+    async def record_round(self, summaries: Iterable[PlayerRoundSummary], at: Optional[datetime] = None) -> None:
+        at = at or datetime.now(timezone.utc)
+        updates = []
+        for summary in summaries:
+            increments = {
+                "rounds_played": 1,
+                "total_round_score": summary.round_score,
+                "answers_submitted": summary.answers_submitted,
+                "valid_answers": summary.valid_answers,
+                "unique_answers": summary.unique_answers,
+            }
+            for category_id, count in Counter(summary.category_ids).items():
+                increments[f"{CATEGORY_FIELD_PREFIX}{category_id}"] = count
+            updates.append(self._update(summary.user_id, summary.nickname, at, increments))
+        await asyncio.gather(*updates)
+
+    async def record_game_finished(self, participants: Iterable[dict], at: Optional[datetime] = None) -> None:
+        """Counts a finished game for every participant; the top score(s) count as wins."""
+        at = at or datetime.now(timezone.utc)
+        participants = list(participants)
+        if not participants:
+            return
+        best_score = max(p.get("score", 0) for p in participants)
+        await asyncio.gather(*(
+            self._update(
+                str(participant["user_id"]), participant.get("nickname"), at,
+                {"games_played": 1, "wins": 1 if participant.get("score", 0) == best_score else 0},
+            )
+            for participant in participants
+        ))
+
+
+player_stats = PlayerStatsStore(room_state.backend)
+
+
+def get_player_stats_store() -> PlayerStatsStore:
+    return player_stats
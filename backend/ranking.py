@@ -0,0 +1,166 @@
+# backend/ranking.py
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_MAX_LEVEL = 32
+_LEVEL_PROBABILITY = 0.25
+
+
+class _Node:
+    __slots__ = ("key", "forward", "span")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.forward: List[Optional["_Node"]] = [None] * level
+        self.span: List[int] = [0] * level
+
+
+class RankingIndex:
+    """Order-statistic index of member -> score, ordered by score descending.
+
+    Backed by an indexable skip list (same layout as Redis sorted sets): every
+    forward pointer stores how many nodes it skips, so rank lookups, updates and
+    top-N reads are O(log n) instead of a scan over all members.
+    Ties are broken by member id so the ordering is deterministic.
+    """
+
+    def __init__(self):
+        self._header = _Node(None, _MAX_LEVEL)
+        self._level = 1
+        self._length = 0
+        self._scores: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, member: str) -> bool:
+        return member in self._scores
+
+    @staticmethod
+    def _key(member: str, score: int) -> Tuple[int, str]:
+        return (-score, member)
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < _MAX_LEVEL and random.random() < _LEVEL_PROBABILITY:
+            level += 1
+        return level
+
+    def score(self, member: str) -> Optional[int]:
+        return self._scores.get(member)
+
+    def set(self, member: str, score: int) -> None:
+        previous = self._scores.get(member)
+        if previous == score:
+            return
+        if previous is not None:
+            self._delete(self._key(member, previous))
+        self._insert(self._key(member, score))
+        self._scores[member] = score
+
+    def increment(self, member: str, delta: int) -> int:
+        new_score = self._scores.get(member, 0) + delta
+        self.set(member, new_score)
+        return new_score
+
+    def remove(self, member: str) -> bool:
+        previous = self._scores.pop(member, None)
+        if previous is None:
+            return False
+        self._delete(self._key(member, previous))
+        return True
+
+    def rank(self, member: str) -> Optional[int]:
+        """Returns the 1-based position of member (1 = highest score), or None."""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        key = self._key(member, score)
+        rank = 0
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key <= key:
+                rank += node.span[i]
+                node = node.forward[i]
+            if node.key == key:
+                return rank
+        return None
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[str, int]]:
+        """Returns up to `limit` (member, score) pairs starting at 0-based `offset`."""
+        if limit <= 0 or offset >= self._length:
+            return []
+        node = self._node_at(offset + 1)
+        result = []
+        while node is not None and len(result) < limit:
+            result.append((node.key[1], -node.key[0]))
+            node = node.forward[0]
+        return result
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        node = self._header.forward[0]
+        while node is not None:
+            yield node.key[1], -node.key[0]
+            node = node.forward[0]
+
+    def _node_at(self, rank: int) -> Optional[_Node]:
+        traversed = 0
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and traversed + node.span[i] <= rank:
+                traversed += node.span[i]
+                node = node.forward[i]
+            if traversed == rank:
+                return node
+        return None
+
+    def _insert(self, key) -> None:
+        update: List[_Node] = [self._header] * _MAX_LEVEL
+        rank = [0] * _MAX_LEVEL
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while node.forward[i] is not None and node.forward[i].key < key:
+                rank[i] += node.span[i]
+                node = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._header
+                self._header.span[i] = self._length
+            self._level = level
+
+        new_node = _Node(key, level)
+        for i in range(level):
+            new_node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new_node
+            new_node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = (rank[0] - rank[i]) + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._length += 1
+
+    def _delete(self, key) -> None:
+        update: List[_Node] = [self._header] * _MAX_LEVEL
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+
+        target = node.forward[0]
+        if target is None or target.key != key:
+            return
+        for i in range(self._level):
+            if update[i].forward[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].forward[i] = target.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._header.forward[self._level - 1] is None:
+            self._level -= 1
+        self._length -= 1
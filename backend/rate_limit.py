@@ -0,0 +1,140 @@
+# backend/rate_limit.py
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from .auth_utils import get_optional_user
+from .metrics import registry
+from .models.game_models import User
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+SCOPE_USER = "user"
+SCOPE_ROOM = "room"
+
+RATE_LIMITED = registry.counter(
+    "basta_rate_limited_total", "Requests rejected with 429 by the token-bucket limiter.", ("limit", "scope")
+)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    rate: float # tokens por segundo
+    burst: int  # capacidad del bucket
+
+
+# Límites por ruta: el de usuario frena a un cliente abusivo, el de sala acota el costo total
+# de una sala (16 jugadores enviando BASTA a la vez entran en el burst). Sobrescribibles con
+# RATE_LIMITS="room_details.user=2/10;ready.room=10/32".
+DEFAULT_LIMITS: Dict[str, Dict[str, RateLimit]] = {
+    "create_room": {SCOPE_USER: RateLimit(0.2, 3)},
+    "join_room": {SCOPE_USER: RateLimit(0.5, 5), SCOPE_ROOM: RateLimit(5, 20)},
+    "room_details": {SCOPE_USER: RateLimit(2, 10), SCOPE_ROOM: RateLimit(20, 60)},
+    "ready": {SCOPE_USER: RateLimit(1, 5), SCOPE_ROOM: RateLimit(10, 32)},
+    "start": {SCOPE_USER: RateLimit(1, 5)},
+    "basta": {SCOPE_USER: RateLimit(1, 5), SCOPE_ROOM: RateLimit(16, 32)},
+    "round_results": {SCOPE_USER: RateLimit(2, 10), SCOPE_ROOM: RateLimit(20, 60)},
+    "resume": {SCOPE_USER: RateLimit(1, 5), SCOPE_ROOM: RateLimit(20, 60)},
+    "dispute": {SCOPE_USER: RateLimit(0.5, 5), SCOPE_ROOM: RateLimit(8, 32)},
+    "dispute_vote": {SCOPE_USER: RateLimit(2, 10), SCOPE_ROOM: RateLimit(32, 64)}, # Solo cuentan en memoria
+    "next_round": {SCOPE_USER: RateLimit(1, 5)},
+    "draft": {SCOPE_USER: RateLimit(2, 10), SCOPE_ROOM: RateLimit(32, 64)}, # Clientes guardan con debounce al escribir
+    "create_tournament": {SCOPE_USER: RateLimit(0.05, 2)},
+    "join_tournament": {SCOPE_USER: RateLimit(0.5, 5)},
+    "tournament_details": {SCOPE_USER: RateLimit(2, 10)},
+}
+
+
+def _parse_limits(raw: Optional[str]) -> Dict[str, Dict[str, RateLimit]]:
+    limits = {name: dict(scopes) for name, scopes in DEFAULT_LIMITS.items()}
+    for item in (raw or "").split(";"):
+        if "=" not in item:
+            continue
+        target, value = item.split("=", 1)
+        name, scope = target.strip().rsplit(".", 1)
+        rate, burst = value.split("/", 1)
+        limits.setdefault(name, {})[scope] = RateLimit(float(rate), int(burst))
+    return limits
+
+
+LIMITS = _parse_limits(os.environ.get("RATE_LIMITS"))
+
+
+class TokenBucketLimiter:
+    """O(1) token buckets keyed by (limit, scope, id), bounded by LRU eviction.
+
+    Cada bucket guarda solo (tokens, último refill); el refill se calcula al
+    consultarlo, así que no hay timers. Un bucket desalojado vuelve lleno,
+    lo cual solo favorece al cliente.
+    """
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Tuple[str, str, str], list]" = OrderedDict()
+
+    def take(self, key: Tuple[str, str, str], limit: RateLimit, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Consumes `cost` tokens; returns 0 if allowed, otherwise seconds until it would be."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(limit.burst), now]
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(limit.burst), bucket[0] + (now - bucket[1]) * limit.rate)
+            bucket[1] = now
+
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / limit.rate if limit.rate > 0 else math.inf
+
+
+limiter = TokenBucketLimiter()
+
+_ROOM_PATH_PARAMS = ("room_id", "room_identifier", "room_code")
+
+
+def _client_key(request: Request, user: Optional[User]) -> str:
+    if user is not None:
+        return str(user.id)
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(name: str):
+    """Route dependency enforcing LIMITS[name] per user (or client IP) and per room."""
+    scopes = LIMITS[name]
+
+    async def dependency(request: Request, user: Optional[User] = Depends(get_optional_user)) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+        checks = []
+        if SCOPE_USER in scopes:
+            checks.append((SCOPE_USER, _client_key(request, user)))
+        if SCOPE_ROOM in scopes:
+            room_key = next((str(request.path_params[p]).upper() for p in _ROOM_PATH_PARAMS if p in request.path_params), None)
+            if room_key is not None:
+                checks.append((SCOPE_ROOM, room_key))
+
+        for scope, identity in checks:
+            retry_after = limiter.take((name, scope, identity), scopes[scope])
+            if retry_after > 0:
+                RATE_LIMITED.inc(name, scope)
+                logger.warning("Rate limited %s (%s=%s), retry in %.2fs.", name, scope, identity, retry_after)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"Too many requests ({scope} limit), retry later.",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after))), "X-RateLimit-Scope": scope},
+                )
+
+    return dependency
@@ -0,0 +1,302 @@
+# backend/resilience.py
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, FrozenSet, Optional
+
+import httpx
+from fastapi import HTTPException, status
+from postgrest.exceptions import APIError
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Plazos por operación (segundos, 0 = sin plazo: la llamada corre en el hilo del request como antes)
+DB_READ_DEADLINE_SECONDS = float(os.environ.get("DB_READ_DEADLINE_SECONDS", "3"))
+DB_WRITE_DEADLINE_SECONDS = float(os.environ.get("DB_WRITE_DEADLINE_SECONDS", "5"))
+# Reintentos (solo lecturas idempotentes) con backoff exponencial y jitter completo
+DB_READ_RETRIES = int(os.environ.get("DB_READ_RETRIES", "2"))
+DB_RETRY_BASE_DELAY_SECONDS = float(os.environ.get("DB_RETRY_BASE_DELAY_SECONDS", "0.05"))
+DB_RETRY_MAX_DELAY_SECONDS = float(os.environ.get("DB_RETRY_MAX_DELAY_SECONDS", "0.5"))
+# Lectura duplicada si la primera no respondió en este tiempo (~p95 de una lectura; 0 = sin hedging)
+DB_HEDGE_AFTER_SECONDS = float(os.environ.get("DB_HEDGE_AFTER_SECONDS", "0.2"))
+DB_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("DB_CIRCUIT_FAILURE_THRESHOLD", "5"))
+DB_CIRCUIT_RESET_SECONDS = float(os.environ.get("DB_CIRCUIT_RESET_SECONDS", "10"))
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "32"))
+# p. ej. "error_rate=0.1,latency_ms=400,latency_rate=0.2,tables=game_rooms,operations=select"
+DB_FAULT_INJECTION = os.environ.get("DB_FAULT_INJECTION", "")
+
+DB_RETRIES = registry.counter(
+    "basta_db_retries_total", "Read retries after a transient Supabase failure.", ("table", "operation")
+)
+DB_HEDGED = registry.counter(
+    "basta_db_hedged_reads_total", "Hedged duplicate reads: launched, and won (the duplicate answered first).", ("outcome",)
+)
+DB_DEADLINE_EXCEEDED = registry.counter(
+    "basta_db_deadline_exceeded_total", "Supabase calls abandoned after their deadline.", ("table", "operation")
+)
+DB_CIRCUIT_STATE = registry.gauge(
+    "basta_db_circuit_state", "Supabase circuit breaker: 0 closed, 1 open, 2 half-open."
+)
+DB_CIRCUIT_REJECTED = registry.counter(
+    "basta_db_circuit_rejected_total", "Supabase calls rejected without trying because the circuit was open."
+)
+DB_INJECTED_FAULTS = registry.counter(
+    "basta_db_injected_faults_total", "Faults injected by DB_FAULT_INJECTION.", ("kind",)
+)
+
+
+class DatabaseUnavailable(HTTPException):
+    """503 raised from the data-access layer; handlers re-raise HTTPException as-is."""
+
+    def __init__(self, detail: str, retry_after: float = 1.0):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail,
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class InjectedFault(ConnectionError):
+    pass
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Failures worth retrying and counting against the circuit (the database did not answer properly)."""
+    if isinstance(exc, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(exc, APIError):
+        code = str(exc.code or "")
+        # 08xxx conexión, 53xxx recursos, 57014 statement timeout, 40001/40P01 serialización/deadlock, 5xx del gateway
+        return code.startswith(("08", "53", "57")) or code in ("40001", "40P01", "502", "503", "504")
+    return False
+
+
+class FaultInjection:
+    """Parsed DB_FAULT_INJECTION spec; only meant for local runs against the fake client."""
+
+    def __init__(self, error_rate: float = 0.0, latency_ms: float = 0.0, latency_rate: float = 1.0,
+                 tables: Optional[FrozenSet[str]] = None, operations: Optional[FrozenSet[str]] = None):
+        self.error_rate = error_rate
+        self.latency_ms = latency_ms
+        self.latency_rate = latency_rate
+        self.tables = tables
+        self.operations = operations
+
+    @classmethod
+    def parse(cls, spec: str) -> Optional["FaultInjection"]:
+        if not spec or not spec.strip():
+            return None
+        options = {}
+        for item in spec.split(","):
+            name, _, value = item.partition("=")
+            options[name.strip()] = value.strip()
+        return cls(
+            error_rate=float(options.get("error_rate", 0)),
+            latency_ms=float(options.get("latency_ms", 0)),
+            latency_rate=float(options.get("latency_rate", 1)),
+            tables=frozenset(options["tables"].split("|")) if options.get("tables") else None,
+            operations=frozenset(options["operations"].split("|")) if options.get("operations") else None,
+        )
+
+    def apply(self, table: str, operation: str) -> None:
+        if self.tables is not None and table not in self.tables:
+            return
+        if self.operations is not None and operation not in self.operations:
+            return
+        if self.latency_ms and random.random() < self.latency_rate:
+            DB_INJECTED_FAULTS.inc("latency")
+            time.sleep(self.latency_ms / 1000.0)
+        if self.error_rate and random.random() < self.error_rate:
+            DB_INJECTED_FAULTS.inc("error")
+            raise InjectedFault(f"Injected fault on {operation} {table}")
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: opens after `failure_threshold` transient failures,
+    lets one trial call through after `reset_seconds` and closes again if it succeeds."""
+
+    CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold: int = DB_CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = DB_CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: int) -> None:
+        if state != self.state:
+            logger.warning("Supabase circuit breaker %s -> %s.", self.state_name(self.state), self.state_name(state))
+        self.state = state
+        DB_CIRCUIT_STATE.set(state)
+
+    @classmethod
+    def state_name(cls, state: int) -> str:
+        return {cls.CLOSED: "closed", cls.OPEN: "open", cls.HALF_OPEN: "half_open"}[state]
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return False
+                self._set_state(self.HALF_OPEN)
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def release_trial(self) -> None:
+        """Frees the half-open trial slot of a call that ended without an outcome (cancelled, interrupted)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+
+class ResiliencePolicy:
+    """Deadlines, read retries with jitter, hedged reads and a circuit breaker around each PostgREST call.
+
+    El cliente de Supabase es síncrono, así que el plazo se aplica ejecutando cada
+    intento en un pool de hilos y esperando el future con timeout: al vencer se
+    responde 503 y el intento abandonado termina solo (el timeout de transporte
+    del cliente real lo acota). Solo las lecturas sin RPC se reintentan o duplican;
+    una escritura que vence puede haberse aplicado igual, por eso los clientes
+    reintentan con Idempotency-Key.
+
+    `execute` bloquea mientras espera (backoff incluido): los handlers `async def`
+    llaman al cliente con `await asyncio.to_thread(...)` para que ni el plazo ni
+    los reintentos paren el event loop.
+    """
+
+    def __init__(self, read_deadline: float = DB_READ_DEADLINE_SECONDS, write_deadline: float = DB_WRITE_DEADLINE_SECONDS,
+                 read_retries: int = DB_READ_RETRIES, hedge_after: float = DB_HEDGE_AFTER_SECONDS,
+                 breaker: Optional[CircuitBreaker] = None, faults: Optional[FaultInjection] = None,
+                 max_workers: int = DB_EXECUTOR_WORKERS):
+        self.read_deadline = read_deadline
+        self.write_deadline = write_deadline
+        self.read_retries = read_retries
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self.faults = faults
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def set_fault_injection(self, spec: str) -> None:
+        self.faults = FaultInjection.parse(spec)
+        if self.faults is not None:
+            logger.warning("Supabase fault injection enabled: %s", spec)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="supabase")
+        return self._executor
+
+    def _run_once(self, table: str, operation: str, run: Callable[[], Any]) -> Any:
+        if self.faults is not None:
+            self.faults.apply(table, operation)
+        return run()
+
+    def _attempt(self, table: str, operation: str, run: Callable[[], Any], deadline: float, hedge: bool) -> Any:
+        if deadline <= 0:
+            return self._run_once(table, operation, run)
+        deadline_at = time.monotonic() + deadline
+        pool = self._pool()
+        first = pool.submit(contextvars.copy_context().run, self._run_once, table, operation, run)
+        pending = {first}
+        if hedge and 0 < self.hedge_after < deadline:
+            done, _ = wait(pending, timeout=self.hedge_after)
+            if not done:
+                DB_HEDGED.inc("launched")
+                pending.add(pool.submit(contextvars.copy_context().run, self._run_once, table, operation, run))
+
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline_at - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if future is not first:
+                        DB_HEDGED.inc("won")
+                    return future.result()
+                last_error = error
+        if last_error is not None and not pending:
+            raise last_error
+        DB_DEADLINE_EXCEEDED.inc(table, operation)
+        raise DeadlineExceeded(f"{operation} on {table} exceeded {deadline:.2f}s")
+
+    def execute(self, table: str, operation: str, idempotent: bool, run: Callable[[], Any]) -> Any:
+        attempts = 1 + (self.read_retries if idempotent else 0)
+        deadline = self.read_deadline if idempotent else self.write_deadline
+        last_error: Optional[BaseException] = None
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                DB_CIRCUIT_REJECTED.inc()
+                raise DatabaseUnavailable("Database temporarily unavailable, retry shortly.", self.breaker.retry_after())
+            if attempt:
+                DB_RETRIES.inc(table, operation)
+                # Jitter completo: evita que los reintentos de muchos requests lleguen juntos
+                time.sleep(random.uniform(0, min(DB_RETRY_MAX_DELAY_SECONDS, DB_RETRY_BASE_DELAY_SECONDS * 2 ** attempt)))
+            try:
+                response = self._attempt(table, operation, run, deadline, hedge=idempotent)
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.record_success() # La base respondió (p. ej. 23505): no cuenta como caída
+                    raise
+                self.breaker.record_failure()
+                last_error = e
+                logger.warning("Transient Supabase failure on %s %s (attempt %s/%s): %s", operation, table, attempt + 1, attempts, e)
+                continue
+            except BaseException:
+                # Cancelación o interrupción: sin resultado, pero el intento de prueba en half-open debe liberarse
+                self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return response
+        raise DatabaseUnavailable(f"Database did not answer in time ({type(last_error).__name__}).") from last_error
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+resilience = ResiliencePolicy()
+resilience.set_fault_injection(DB_FAULT_INJECTION)
+
+
+def get_resilience_policy() -> ResiliencePolicy:
+    return resilience
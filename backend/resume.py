@@ -0,0 +1,95 @@
+# backend/resume.py
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Ventana en la que una ráfaga de reconexiones de la misma sala comparte una sola lectura
+RESUME_CACHE_TTL_SECONDS = float(os.environ.get("RESUME_CACHE_TTL_SECONDS", "2"))
+RESUME_CACHE_MAX_ROOMS = int(os.environ.get("RESUME_CACHE_MAX_ROOMS", "5000"))
+
+# Fases en las que los resultados de la ronda actual ya están escritos
+RESULTS_STATUSES = ("round_over_results", "finished")
+
+RESUME_SNAPSHOTS = registry.counter(
+    "basta_resume_snapshots_total", "Room snapshots used by /resume, by source (cache, shared in-flight load, database).", ("source",)
+)
+
+
+class ResumeSnapshotCache:
+    """Short-lived per-room snapshot shared by every player resuming the same room.
+
+    El snapshot es la parte común del bundle de reconexión: la sala con sus
+    participantes y, si la ronda ya se puntuó, sus respuestas. Se guarda junto a
+    la versión (status, ronda) del estado compartido de la sala, así que un cambio
+    de fase lo invalida aunque no haya vencido el TTL. Las cargas concurrentes de
+    la misma sala y versión esperan a la primera en lugar de repetir la consulta;
+    una versión nueva no reusa la carga en curso de la anterior.
+    """
+
+    def __init__(self, ttl_seconds: float = RESUME_CACHE_TTL_SECONDS, max_rooms: int = RESUME_CACHE_MAX_ROOMS):
+        self.ttl_seconds = ttl_seconds
+        self.max_rooms = max_rooms
+        self._entries: Dict[str, Tuple[float, Any, dict]] = {}
+        self._inflight: Dict[Tuple[str, Any], asyncio.Future] = {}
+
+    def _load(self, supabase_client, room_id: str) -> Optional[dict]:
+        room_response = supabase_client.table("game_rooms").select("*, room_participants(*)").eq("id", room_id).maybe_single().execute()
+        if room_response is None or not room_response.data:
+            return None
+        room = room_response.data
+        round_answers = None
+        if room.get("status") in RESULTS_STATUSES and (room.get("current_round_number") or 0) >= 1:
+            round_answers = supabase_client.table("player_round_answers") \
+                .select("room_participant_id, category_id, answer_text, score_awarded, is_valid, validation_notes") \
+                .eq("game_room_id", room_id) \
+                .eq("round_number", room["current_round_number"]) \
+                .execute().data or []
+        return {"room": room, "round_answers": round_answers}
+
+    async def snapshot(self, supabase_client, room_id, version: Any = None) -> Optional[dict]:
+        """Room snapshot for `room_id`, or None if the room does not exist. Treat it as read-only."""
+        room_id = str(room_id)
+        entry = self._entries.get(room_id)
+        if entry is not None and entry[1] == version and time.monotonic() - entry[0] < self.ttl_seconds:
+            RESUME_SNAPSHOTS.inc("cache")
+            return entry[2]
+
+        inflight_key = (room_id, version)
+        inflight = self._inflight.get(inflight_key)
+        if inflight is not None:
+            RESUME_SNAPSHOTS.inc("shared")
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            snapshot = await asyncio.to_thread(self._load, supabase_client, room_id)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception() # Marcada como leída: sin esperas no debe quedar "exception never retrieved"
+            raise
+        finally:
+            self._inflight.pop(inflight_key, None)
+        RESUME_SNAPSHOTS.inc("database")
+        if snapshot is not None:
+            if len(self._entries) >= self.max_rooms:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[room_id] = (time.monotonic(), version, snapshot)
+        future.set_result(snapshot)
+        return snapshot
+
+    def invalidate(self, room_id) -> None:
+        self._entries.pop(str(room_id), None)
+
+
+resume_cache = ResumeSnapshotCache()
+
+
+def get_resume_cache() -> ResumeSnapshotCache:
+    return resume_cache
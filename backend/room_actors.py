@@ -0,0 +1,113 @@
+# backend/room_actors.py
+import asyncio
+import functools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from fastapi import HTTPException, status
+
+from .metrics import registry
+from .room_state import RoomLockTimeout, room_state
+
+logger = logging.getLogger(__name__)
+
+# Acciones en espera por sala antes de responder 503 (una sala tiene como máximo 16 jugadores)
+ROOM_MAILBOX_SIZE = int(os.environ.get("ROOM_MAILBOX_SIZE", "64"))
+
+ROOM_MAILBOX_WAIT = registry.histogram(
+    "basta_room_mailbox_wait_seconds", "Time a room mutation waited for its turn in the room mailbox.", ("action",)
+)
+ROOM_MAILBOX_DEPTH = registry.histogram(
+    "basta_room_mailbox_depth", "Pending mutations in the room mailbox when a new one arrives.", ("action",),
+    (0, 1, 2, 4, 8, 16, 32, 64)
+)
+ROOM_MAILBOX_REJECTED = registry.counter(
+    "basta_room_mailbox_rejected_total", "Room mutations rejected because the mailbox was full or the room lock timed out.", ("action", "reason")
+)
+ACTIVE_ROOM_MAILBOXES = registry.gauge(
+    "basta_room_mailboxes_active", "Rooms with at least one mutation running or queued."
+)
+
+
+class RoomMailboxFull(Exception):
+    """Raised when a room already has ROOM_MAILBOX_SIZE pending mutations."""
+
+
+class _RoomMailbox:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock() # asyncio.Lock despierta a los que esperan en orden FIFO
+        self.pending = 0
+
+
+class RoomMailboxes:
+    """Serializes mutations per room; different rooms never wait on each other.
+
+    Cada sala tiene un buzón acotado que se crea con la primera acción y se
+    descarta cuando queda vacío. La acción se ejecuta en la tarea del propio
+    request (conserva su contexto: métricas, caché de consultas, logs) y, además,
+    bajo `room_state.room_lock()` para excluir a otros workers/hosts.
+    """
+
+    def __init__(self, max_pending: int = ROOM_MAILBOX_SIZE):
+        self.max_pending = max_pending
+        self._mailboxes: Dict[str, _RoomMailbox] = {}
+
+    def depth(self, room_id) -> int:
+        mailbox = self._mailboxes.get(str(room_id))
+        return mailbox.pending if mailbox else 0
+
+    @asynccontextmanager
+    async def turn(self, room_id, action: str):
+        key = str(room_id)
+        mailbox = self._mailboxes.get(key)
+        if mailbox is None:
+            mailbox = self._mailboxes[key] = _RoomMailbox()
+            ACTIVE_ROOM_MAILBOXES.set(len(self._mailboxes))
+        if mailbox.pending >= self.max_pending:
+            ROOM_MAILBOX_REJECTED.inc(action, "mailbox_full")
+            raise RoomMailboxFull(key)
+
+        ROOM_MAILBOX_DEPTH.observe(mailbox.pending, action)
+        mailbox.pending += 1
+        enqueued_at = time.perf_counter()
+        try:
+            async with mailbox.lock:
+                async with room_state.room_lock(key):
+                    ROOM_MAILBOX_WAIT.observe(time.perf_counter() - enqueued_at, action)
+                    yield
+        finally:
+            mailbox.pending -= 1
+            if mailbox.pending == 0 and self._mailboxes.get(key) is mailbox:
+                del self._mailboxes[key]
+                ACTIVE_ROOM_MAILBOXES.set(len(self._mailboxes))
+
+
+room_mailboxes = RoomMailboxes()
+
+
+def serialized_room_action(action: str):
+    """Decorator for room endpoints that take `room_id`: runs them one at a time per room."""
+
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            room_id = kwargs["room_id"]
+            try:
+                async with room_mailboxes.turn(room_id, action):
+                    return await endpoint(*args, **kwargs)
+            except RoomMailboxFull:
+                logger.warning("Room %s mailbox full, rejecting %s.", room_id, action)
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Room is busy, try again.", headers={"Retry-After": "1"})
+            except RoomLockTimeout:
+                ROOM_MAILBOX_REJECTED.inc(action, "lock_timeout")
+                logger.warning("Timed out waiting for room %s lock (%s).", room_id, action)
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Room is busy, try again.", headers={"Retry-After": "1"})
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,486 @@
+# backend/room_state.py
+import abc
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .logging_config import current_log_context
+from .ranking import RankingIndex
+
+logger = logging.getLogger(__name__)
+
+# "memory://" (un solo proceso, tests) o "redis://host:6379/0" para varios workers/hosts
+ROOM_STATE_URL = os.environ.get("ROOM_STATE_URL", "memory://")
+ROOM_STATE_PREFIX = os.environ.get("ROOM_STATE_PREFIX", "basta")
+ROOM_STATE_TTL_SECONDS = float(os.environ.get("ROOM_STATE_TTL_SECONDS", str(6 * 3600)))
+ROOM_LOCK_TTL_SECONDS = float(os.environ.get("ROOM_LOCK_TTL_SECONDS", "30"))
+ROOM_LOCK_TIMEOUT_SECONDS = float(os.environ.get("ROOM_LOCK_TIMEOUT_SECONDS", "10"))
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Afinidad: el balanceador puede enrutar por X-Room-Affinity (p. ej. hash consistente en nginx/envoy)
+ROOM_AFFINITY_SHARDS = int(os.environ.get("ROOM_AFFINITY_SHARDS", "64"))
+NODE_ID = os.environ.get("NODE_ID") or f"{os.uname().nodename}-{os.getpid()}"
+
+
+class RoomLockTimeout(Exception):
+    """Raised when a room lock could not be acquired in time."""
+
+
+class RoomSubscription(abc.ABC):
+    """Async iterator over the messages published on one channel."""
+
+    async def __aenter__(self) -> "RoomSubscription":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def __aiter__(self) -> "RoomSubscription":
+        return self
+
+    @abc.abstractmethod
+    async def __anext__(self) -> dict:
+        ...
+
+    @abc.abstractmethod
+    async def close(self) -> None:
+        ...
+
+
+class RoomStateBackend(abc.ABC):
+    """Shared key/value + hash + sorted-set + pub/sub + lock primitives for room state.
+
+    Los valores son dicts serializables a JSON. Cada implementación debe
+    garantizar que `lock()` excluye a otros procesos, no solo a otras tareas, y
+    que los incrementos (campos de un hash, scores de un ranking) son atómicos
+    como HINCRBY/ZINCRBY en Redis, para no tener que tomar un lock por cada uno.
+    """
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[dict]:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: dict, ttl_seconds: Optional[float] = None) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def update_fields(self, key: str, values: Optional[Dict[str, Any]] = None, increments: Optional[Dict[str, int]] = None,
+                            ttl_seconds: Optional[float] = None) -> None:
+        """Sets `values` and adds `increments` to integer fields of the hash stored at key."""
+
+    @abc.abstractmethod
+    async def get_fields(self, key: str, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Every field of the hash at key, or only those of `fields` that exist."""
+
+    @abc.abstractmethod
+    async def delete_fields(self, key: str, fields: Iterable[str]) -> None:
+        """Removes `fields` from the hash at key (HDEL); missing fields are ignored."""
+
+    @abc.abstractmethod
+    async def increment_scores(self, key: str, increments: Dict[str, int], ttl_seconds: Optional[float] = None) -> None:
+        """Adds each delta to its member's score in the ranking stored at key."""
+
+    @abc.abstractmethod
+    async def top_scores(self, key: str, limit: int, offset: int = 0) -> List[Tuple[str, int]]:
+        """(member, score) pairs by score descending, starting at 0-based offset."""
+
+    @abc.abstractmethod
+    async def score_rank(self, key: str, member: str) -> Optional[Tuple[int, int]]:
+        """(1-based rank, score) of member, or None if it is not ranked."""
+
+    @abc.abstractmethod
+    async def score_count(self, key: str) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def publish(self, channel: str, message: dict) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def subscribe(self, channel: str) -> RoomSubscription:
+        ...
+
+    @abc.abstractmethod
+    def lock(self, key: str, ttl_seconds: float = ROOM_LOCK_TTL_SECONDS, timeout: float = ROOM_LOCK_TIMEOUT_SECONDS):
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class _MemorySubscription(RoomSubscription):
+    def __init__(self, backend: "InMemoryRoomStateBackend", channel: str):
+        self._backend = backend
+        self._channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._closed = False
+
+    def deliver(self, message: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait() # Suscriptor lento: se descarta el mensaje más viejo
+        self.queue.put_nowait(message)
+
+    async def __anext__(self) -> dict:
+        if self._closed:
+            raise StopAsyncIteration
+        return await self.queue.get()
+
+    async def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._backend._unsubscribe(self._channel, self)
+
+
+class InMemoryRoomStateBackend(RoomStateBackend):
+    """Single-process backend; same semantics as Redis, used by default and in tests/load tests."""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[dict, Optional[float]]] = {}
+        self._hashes: Dict[str, Tuple[Dict[str, Any], Optional[float]]] = {}
+        self._rankings: Dict[str, Tuple[RankingIndex, Optional[float]]] = {}
+        self._subscribers: Dict[str, Set[_MemorySubscription]] = {}
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {} # key -> (lock, tareas que lo usan)
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return json.loads(json.dumps(value)) # Copia, como si viniera de la red
+
+    async def set(self, key: str, value: dict, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        self._values[key] = (json.loads(json.dumps(value, default=str)), expires_at)
+
+    async def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+        self._hashes.pop(key, None)
+        self._rankings.pop(key, None)
+
+    @staticmethod
+    def _live(entries: Dict[str, Tuple[Any, Optional[float]]], key: str) -> Any:
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del entries[key]
+            return None
+        return value
+
+    async def update_fields(self, key: str, values: Optional[Dict[str, Any]] = None, increments: Optional[Dict[str, int]] = None,
+                            ttl_seconds: Optional[float] = None) -> None:
+        fields = self._live(self._hashes, key) or {}
+        if values:
+            fields.update(json.loads(json.dumps(values, default=str)))
+        for field, delta in (increments or {}).items():
+            fields[field] = int(fields.get(field, 0)) + delta
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        self._hashes[key] = (fields, expires_at)
+
+    async def get_fields(self, key: str, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        stored = self._live(self._hashes, key) or {}
+        if fields is not None:
+            stored = {field: stored[field] for field in fields if field in stored}
+        return json.loads(json.dumps(stored))
+
+    async def delete_fields(self, key: str, fields: Iterable[str]) -> None:
+        stored = self._live(self._hashes, key)
+        if stored is None:
+            return
+        for field in fields:
+            stored.pop(field, None)
+        if not stored:
+            del self._hashes[key] # Como en Redis: un hash sin campos deja de existir
+
+    def _ranking(self, key: str) -> Optional[RankingIndex]:
+        return self._live(self._rankings, key)
+
+    async def increment_scores(self, key: str, increments: Dict[str, int], ttl_seconds: Optional[float] = None) -> None:
+        ranking = self._ranking(key) or RankingIndex()
+        for member, delta in increments.items():
+            ranking.increment(member, delta)
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        self._rankings[key] = (ranking, expires_at)
+
+    async def top_scores(self, key: str, limit: int, offset: int = 0) -> List[Tuple[str, int]]:
+        ranking = self._ranking(key)
+        return ranking.top(limit, offset) if ranking is not None else []
+
+    async def score_rank(self, key: str, member: str) -> Optional[Tuple[int, int]]:
+        ranking = self._ranking(key)
+        if ranking is None or member not in ranking:
+            return None
+        return ranking.rank(member), ranking.score(member)
+
+    async def score_count(self, key: str) -> int:
+        ranking = self._ranking(key)
+        return len(ranking) if ranking is not None else 0
+
+    async def publish(self, channel: str, message: dict) -> None:
+        payload = json.loads(json.dumps(message, default=str))
+        for subscription in list(self._subscribers.get(channel, ())):
+            subscription.deliver(payload)
+
+    async def subscribe(self, channel: str) -> RoomSubscription:
+        subscription = _MemorySubscription(self, channel)
+        self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, channel: str, subscription: _MemorySubscription) -> None:
+        subscribers = self._subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[channel]
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl_seconds: float = ROOM_LOCK_TTL_SECONDS, timeout: float = ROOM_LOCK_TIMEOUT_SECONDS):
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            try:
+                await asyncio.wait_for(lock.acquire(), timeout)
+            except asyncio.TimeoutError:
+                raise RoomLockTimeout(key)
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            lock, users = self._locks[key]
+            if users <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+
+class _RedisSubscription(RoomSubscription):
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    async def __anext__(self) -> dict:
+        while True:
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            if message is not None and message.get("type") == "message":
+                return json.loads(message["data"])
+
+    async def close(self) -> None:
+        await self._pubsub.aclose()
+
+
+class RedisRoomStateBackend(RoomStateBackend):
+    """Redis-compatible backend (Redis, Valkey, KeyDB...) for several workers or hosts."""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("ROOM_STATE_URL points to Redis but the 'redis' package is not installed.") from e
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self._redis.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: dict, ttl_seconds: Optional[float] = None) -> None:
+        px = int(ttl_seconds * 1000) if ttl_seconds else None
+        await self._redis.set(key, json.dumps(value, default=str), px=px)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+
+    async def update_fields(self, key: str, values: Optional[Dict[str, Any]] = None, increments: Optional[Dict[str, int]] = None,
+                            ttl_seconds: Optional[float] = None) -> None:
+        # Los valores van como JSON; los contadores como enteros planos (HINCRBY), que también son JSON válido
+        async with self._redis.pipeline(transaction=False) as pipe:
+            if values:
+                pipe.hset(key, mapping={field: json.dumps(value, default=str) for field, value in values.items()})
+            for field, delta in (increments or {}).items():
+                pipe.hincrby(key, field, delta)
+            if ttl_seconds:
+                pipe.pexpire(key, int(ttl_seconds * 1000))
+            await pipe.execute()
+
+    async def get_fields(self, key: str, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        if fields is None:
+            raw = await self._redis.hgetall(key)
+        else:
+            fields = list(fields)
+            if not fields:
+                return {}
+            raw = {field: value for field, value in zip(fields, await self._redis.hmget(key, fields)) if value is not None}
+        return {field: json.loads(value) for field, value in raw.items()}
+
+    async def delete_fields(self, key: str, fields: Iterable[str]) -> None:
+        fields = list(fields)
+        if fields:
+            await self._redis.hdel(key, *fields)
+
+    async def increment_scores(self, key: str, increments: Dict[str, int], ttl_seconds: Optional[float] = None) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for member, delta in increments.items():
+                pipe.zincrby(key, delta, member)
+            if ttl_seconds:
+                pipe.pexpire(key, int(ttl_seconds * 1000))
+            await pipe.execute()
+
+    async def top_scores(self, key: str, limit: int, offset: int = 0) -> List[Tuple[str, int]]:
+        if limit <= 0:
+            return []
+        rows = await self._redis.zrevrange(key, offset, offset + limit - 1, withscores=True)
+        return [(member, int(score)) for member, score in rows]
+
+    async def score_rank(self, key: str, member: str) -> Optional[Tuple[int, int]]:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(key, member)
+            pipe.zscore(key, member)
+            rank, score = await pipe.execute()
+        if rank is None or score is None:
+            return None
+        return rank + 1, int(score)
+
+    async def score_count(self, key: str) -> int:
+        return await self._redis.zcard(key)
+
+    async def publish(self, channel: str, message: dict) -> None:
+        await self._redis.publish(channel, json.dumps(message, default=str))
+
+    async def subscribe(self, channel: str) -> RoomSubscription:
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(channel)
+        return _RedisSubscription(pubsub)
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl_seconds: float = ROOM_LOCK_TTL_SECONDS, timeout: float = ROOM_LOCK_TIMEOUT_SECONDS):
+        # Lock con token y expiración: si el worker muere, la sala no queda bloqueada para siempre
+        lock = self._redis.lock(key, timeout=ttl_seconds, blocking_timeout=timeout, thread_local=False)
+        if not await lock.acquire(token=uuid.uuid4().hex):
+            raise RoomLockTimeout(key)
+        try:
+            yield
+        finally:
+            try:
+                await lock.release()
+            except Exception as e: # LockNotOwnedError si expiró el TTL mientras se ejecutaba
+                logger.warning("Room lock %s expired before release: %s", key, e)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_backend(url: str = ROOM_STATE_URL) -> RoomStateBackend:
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRoomStateBackend(url)
+    if url.startswith("memory://"):
+        return InMemoryRoomStateBackend()
+    raise ValueError(f"Unsupported ROOM_STATE_URL: {url}")
+
+
+class RoomStateStore:
+    """Room-level API over a RoomStateBackend: snapshot, events and per-room lock.
+
+    El snapshot, los eventos y el lock de la sala se comparten entre procesos
+    (los leaderboards, las estadísticas por jugador y las disputas usan el mismo
+    backend), pero no todo el estado por sala: los borradores pendientes de
+    escribir viven en la memoria del worker hasta el siguiente flush, así que
+    leerlos supone que los requests de una sala llegan al mismo worker (ver
+    RoomAffinityMiddleware).
+    """
+
+    def __init__(self, backend: RoomStateBackend, prefix: str = ROOM_STATE_PREFIX, ttl_seconds: float = ROOM_STATE_TTL_SECONDS):
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, kind: str, room_id) -> str:
+        return f"{self.prefix}:room:{room_id}:{kind}"
+
+    async def get_room_state(self, room_id) -> Optional[dict]:
+        return await self.backend.get(self._key("state", room_id))
+
+    async def set_room_state(self, room_id, state: dict) -> None:
+        await self.backend.set(self._key("state", room_id), state, self.ttl_seconds)
+
+    async def update_room_state(self, room_id, **fields: Any) -> dict:
+        """Merges fields into the shared snapshot; callers should hold room_lock()."""
+        state = await self.get_room_state(room_id) or {}
+        state.update(fields)
+        await self.set_room_state(room_id, state)
+        return state
+
+    async def clear_room_state(self, room_id) -> None:
+        await self.backend.delete(self._key("state", room_id))
+
+    async def publish_room_event(self, room_id, event: str, **data: Any) -> None:
+        """Broadcasts a room event to every subscriber on any node. Never raises."""
+        message = {"room_id": str(room_id), "event": event, "node": NODE_ID, "ts": time.time(), "data": data}
+        try:
+            await self.backend.publish(self._key("events", room_id), message)
+        except Exception as e:
+            logger.warning("Could not publish %s for room %s: %s", event, room_id, e)
+
+    async def subscribe_room(self, room_id) -> RoomSubscription:
+        return await self.backend.subscribe(self._key("events", room_id))
+
+    def room_lock(self, room_id, ttl_seconds: float = ROOM_LOCK_TTL_SECONDS, timeout: float = ROOM_LOCK_TIMEOUT_SECONDS):
+        return self.backend.lock(self._key("lock", room_id), ttl_seconds, timeout)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+room_state = RoomStateStore(create_backend())
+
+
+def get_room_state_store() -> RoomStateStore:
+    return room_state
+
+
+def room_affinity_key(room_id) -> int:
+    """Stable shard for a room; the same room maps to the same shard on every node."""
+    return zlib.crc32(str(room_id).encode("utf-8")) % ROOM_AFFINITY_SHARDS
+
+
+class RoomAffinityMiddleware:
+    """Adds routing hints to room responses: X-Room-Affinity (shard) and X-Served-By (node).
+
+    El balanceador puede usar X-Room-Affinity para mandar todos los requests de
+    una sala al mismo worker, lo que reduce contención en el lock de la sala.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-served-by", NODE_ID.encode("latin-1")))
+                context = current_log_context()
+                if context is not None and context.room_id:
+                    headers.append((b"x-room-affinity", str(room_affinity_key(context.room_id)).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,11 +1,16 @@
 # backend/routers/game_config_router.py
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from supabase import Client
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from ..models.game_models import Theme, ThemeCreate, Category, CategoryCreate
+from ..models.game_models import Theme, ThemeCreate, Category, CategoryCreate, CatalogImportResult, User
+from ..auth_utils import get_current_active_user
+from ..catalog_import import CatalogImporter, iter_lines, FORMAT_CSV, FORMAT_JSONL
 from ..supabase_client import get_supabase_client # Ajusta el path si es necesario
+from ..catalog_cache import catalog_cache
 
 router = APIRouter()
 
@@ -17,8 +22,9 @@ async def create_theme_endpoint(
     supabase: Client = Depends(get_supabase_client)
 ):
     try:
-        response = supabase.table("themes").insert(theme_data.model_dump()).execute()
+        response = await asyncio.to_thread(supabase.table("themes").insert(theme_data.model_dump()).execute)
         if response.data:
+            catalog_cache.invalidate()
             return response.data[0]
         else:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Could not create theme")
@@ -33,11 +39,8 @@ async def list_themes_endpoint(
     supabase: Client = Depends(get_supabase_client)
 ):
     try:
-        response = supabase.table("themes").select("*").order("created_at", desc=False).execute()
-        if response.data is not None: # Verificar que data no sea None
-             return response.data
-        else: # Si data es None, puede ser un error o simplemente no hay datos
-            return [] # Devolver lista vacía si no hay datos o si response.error tiene algo
+        # Servido desde el caché del catálogo (precargado al arrancar el worker)
+        return await asyncio.to_thread(catalog_cache.themes, supabase)
     except Exception as e:
         # print(f"Exception listing themes: {e}") # Para depuración
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to list themes")
@@ -55,8 +58,9 @@ async def create_category_endpoint(
         insert_payload = category_data.model_dump(mode="json")
         insert_payload["theme_id"] = str(category_data.theme_id)
 
-        response = supabase.table("categories").insert(insert_payload).execute()
+        response = await asyncio.to_thread(supabase.table("categories").insert(insert_payload).execute)
         if response.data:
+            catalog_cache.invalidate()
             return response.data[0]
         else:
             # print("Error data from Supabase (create category):", response.error) # Para depuración
@@ -72,11 +76,31 @@ async def list_categories_by_theme_endpoint(
     supabase: Client = Depends(get_supabase_client)
 ):
     try:
-        response = supabase.table("categories").select("*").eq("theme_id", str(theme_id)).order("order", desc=False).execute() # str(theme_id) es importante para Supabase
-        if response.data is not None:
-            return response.data
-        else:
-            return []
+        return await asyncio.to_thread(catalog_cache.categories_for_theme, supabase, theme_id)
     except Exception as e:
         # print(f"Exception listing categories: {e}") # Para depuración
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to list categories")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to list categories")
+
+
+# --- Importación masiva de THEMES y CATEGORIES ---
+
+@router.post("/catalog/import", response_model=CatalogImportResult, tags=["Catalog"])
+async def import_catalog_endpoint(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(jsonl|csv)$", description="Upload format; defaults from Content-Type (text/csv -> csv, else jsonl)."),
+    dry_run: bool = Query(False, description="Validate rows and report what would be created without writing."),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Streams a JSON-lines or CSV upload of `theme`/`theme_id`, `category`, `order` rows.
+
+    Ejemplo JSONL: `{"theme": "Liga MX", "category": "Jugador", "order": 0}`;
+    CSV con encabezado `theme,category,order`. Las filas se validan al leerse,
+    se insertan por lotes y el caché del catálogo se invalida una sola vez.
+    """
+    file_format = format or (FORMAT_CSV if request.headers.get("content-type", "").startswith("text/csv") else FORMAT_JSONL)
+    importer = await asyncio.to_thread(CatalogImporter, supabase, dry_run=dry_run) # Lee el catálogo (caché o base)
+    try:
+        return await importer.run(iter_lines(request.stream()), file_format)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload must be UTF-8 encoded.")
@@ -0,0 +1,60 @@
+# backend/routers/leaderboards_router.py
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
+from typing import Optional
+from uuid import UUID
+
+from ..auth_utils import get_current_active_user
+from ..leaderboards import Leaderboards, GLOBAL_SCOPE, WINDOWS, WINDOW_ALL, get_leaderboards, theme_scope
+from ..models.game_models import User, LeaderboardEntry, LeaderboardResponse
+
+router = APIRouter(
+    prefix="/leaderboards",
+    tags=["Leaderboards"],
+    responses={404: {"description": "Not found"}},
+)
+
+def _resolve_scope(theme_id: Optional[UUID], window: str) -> str:
+    if window not in WINDOWS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid window '{window}'. Use one of: {', '.join(WINDOWS)}.")
+    return theme_scope(str(theme_id)) if theme_id else GLOBAL_SCOPE
+
+
+@router.get("/", response_model=LeaderboardResponse)
+async def get_leaderboard(
+    theme_id: Optional[UUID] = Query(None, description="Filtra el ranking por temática. Sin valor devuelve el global."),
+    window: str = Query(WINDOW_ALL, description="Ventana de tiempo: all, daily o weekly."),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    boards: Leaderboards = Depends(get_leaderboards)
+):
+    scope = _resolve_scope(theme_id, window)
+    return LeaderboardResponse(
+        scope=scope,
+        window=window,
+        total_players=await boards.size(scope, window),
+        entries=[LeaderboardEntry(**entry) for entry in await boards.top(scope, window, limit=limit, offset=offset)]
+    )
+
+
+@router.get("/me", response_model=LeaderboardEntry)
+async def get_my_leaderboard_rank(
+    theme_id: Optional[UUID] = Query(None),
+    window: str = Query(WINDOW_ALL),
+    current_user: User = Depends(get_current_active_user),
+    boards: Leaderboards = Depends(get_leaderboards)
+):
+    return await get_user_leaderboard_rank(user_id=current_user.id, theme_id=theme_id, window=window, boards=boards)
+
+
+@router.get("/users/{user_id}", response_model=LeaderboardEntry)
+async def get_user_leaderboard_rank(
+    user_id: UUID = Path(..., description="ID del usuario a consultar."),
+    theme_id: Optional[UUID] = Query(None),
+    window: str = Query(WINDOW_ALL),
+    boards: Leaderboards = Depends(get_leaderboards)
+):
+    scope = _resolve_scope(theme_id, window)
+    entry = await boards.rank_of(scope, str(user_id), window)
+    if entry is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User has no score in this leaderboard.")
+    return LeaderboardEntry(**entry)
@@ -0,0 +1,32 @@
+# backend/routers/players_router.py
+from fastapi import APIRouter, Depends, HTTPException, status, Path
+from uuid import UUID
+
+from ..auth_utils import get_current_active_user
+from ..player_stats import PlayerStatsStore, get_player_stats_store
+from ..models.game_models import User, PlayerStatsResponse
+
+router = APIRouter(
+    prefix="/players",
+    tags=["Players"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/me/stats", response_model=PlayerStatsResponse)
+async def get_my_stats(
+    current_user: User = Depends(get_current_active_user),
+    store: PlayerStatsStore = Depends(get_player_stats_store)
+):
+    return await get_player_stats(user_id=current_user.id, store=store)
+
+
+@router.get("/{user_id}/stats", response_model=PlayerStatsResponse)
+async def get_player_stats(
+    user_id: UUID = Path(..., description="ID del usuario."),
+    store: PlayerStatsStore = Depends(get_player_stats_store)
+):
+    stats = await store.get(str(user_id))
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No statistics recorded for this player yet.")
+    return PlayerStatsResponse(**stats.to_dict())
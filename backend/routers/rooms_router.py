@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, WebSocket
 from supabase import Client
 from typing import List, Optional
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import asyncio
 import logging
+import os
 from postgrest.exceptions import APIError 
 
 from ..supabase_client import get_supabase_client
@@ -16,49 +18,72 @@ from ..models.game_models import (
     SetReadyPayload,
     RoomParticipant,
     PlayerAnswers,
-    AnswerResult,
-    ParticipantRoundResult,
-    CategoryInfo,
+    AnswerDraft,
     RoundResultsResponse,
+    SessionResumeResponse,
+    DisputeCreate,
+    DisputeVote,
+    DisputeSummary,
 )
-from ..utils import generate_room_code, calculate_round_scores
+from ..utils import generate_room_code, calculate_round_scores, record_game_finished
+from ..audit_log import audit_log
+from ..logging_config import bind_room_id
+from ..room_state import room_state
+from ..room_actors import serialized_room_action
+from ..rate_limit import rate_limit
+from ..catalog_cache import catalog_cache
+from ..fast_json import fast_response, parse_fields
+from ..spectators import spectator_hub
+from ..drafts import draft_buffer
+from ..resume import resume_cache
+from ..disputes import DisputeError, close_round_disputes, dispute_board
+from ..scoring_rules import build_scoring_rules, rules_from_room
 
 logger = logging.getLogger(__name__)
+
+# Margen sobre round_time_limit_seconds para respuestas enviadas al agotarse el tiempo (latencia de red)
+ROUND_SUBMIT_GRACE_SECONDS = float(os.environ.get("ROUND_SUBMIT_GRACE_SECONDS", "3"))
+
 router = APIRouter(
     prefix="/rooms",
     tags=["Game Rooms"],
     responses={404: {"description": "Not found"}},
 )
-MAX_ROUNDS = 3
 
 def get_user_nickname(user: User) -> str:
     if user.email:
         return user.email.split('@')[0][:20]
     return f"User_{str(user.id)[:8]}"
 
-@router.post("/", response_model=GameRoomResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=GameRoomResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("create_room"))])
 async def create_game_room(
     room_data: GameRoomCreate,
     current_user: User = Depends(get_current_active_user),
     supabase: Client = Depends(get_supabase_client)
 ):
     room_code = generate_room_code()
-    logger.info(f"User {current_user.id} creating room. Generated room_code: {room_code}")
+    logger.info("User %s creating room. Generated room_code: %s", current_user.id, room_code)
+
+    try:
+        scoring_rules = build_scoring_rules(room_data.scoring_profile, room_data.max_rounds, room_data.round_time_limit_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     new_room_payload = {
         "room_code": room_code,
         "theme_id": str(room_data.theme_id),
         "host_user_id": str(current_user.id),
         "max_players": room_data.max_players,
+        "scoring_rules": scoring_rules.model_dump(),
         "status": "waiting"
     }
-    logger.info(f"Payload for new game_room: {new_room_payload}")
+    logger.debug("Payload for new game_room: %s", new_room_payload)
 
     try:
         # 3. Insertar la nueva sala
-        room_insert_response = supabase.table("game_rooms").insert(new_room_payload).execute()
+        room_insert_response = await asyncio.to_thread(supabase.table("game_rooms").insert(new_room_payload).execute)
         # Si ocurre un error de PostgREST (4xx, 5xx), APIError se lanzará aquí.
-        logger.info(f"Game_rooms insert response data: {room_insert_response.data}, count: {room_insert_response.count}")
+        logger.debug("Game_rooms insert response data: %s, count: %s", room_insert_response.data, room_insert_response.count)
 
         if not room_insert_response.data: # Después de un insert exitoso, data debería estar poblada
             detail = "Could not create game room: No data returned from Supabase after insert."
@@ -67,7 +92,7 @@ async def create_game_room(
 
         created_room_data = room_insert_response.data[0]
         game_room_id_str = str(created_room_data["id"])
-        logger.info(f"Game room created with ID: {game_room_id_str}")
+        logger.info("Game room created with ID: %s", game_room_id_str)
 
         # 4. Añadir al host como el primer participante
         host_nickname = get_user_nickname(current_user)
@@ -77,10 +102,10 @@ async def create_game_room(
             "nickname": host_nickname,
             "is_ready": False
         }
-        logger.info(f"Payload for host participant: {participant_payload}")
-        participant_insert_response = supabase.table("room_participants").insert(participant_payload).execute()
+        logger.debug("Payload for host participant: %s", participant_payload)
+        participant_insert_response = await asyncio.to_thread(supabase.table("room_participants").insert(participant_payload).execute)
         # Si ocurre un error de PostgREST, APIError se lanzará aquí.
-        logger.info(f"Room_participants insert response data: {participant_insert_response.data}, count: {participant_insert_response.count}")
+        logger.debug("Room_participants insert response data: %s, count: %s", participant_insert_response.data, participant_insert_response.count)
 
         if not participant_insert_response.data:
             detail = "Failed to add host as participant: No data returned from Supabase after insert."
@@ -88,31 +113,26 @@ async def create_game_room(
             # Considera rollback: await supabase.table("game_rooms").delete().eq("id", game_room_id_str).execute()
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail)
         
-        logger.info(f"Host participant added for user ID: {current_user.id} in room ID: {game_room_id_str}")
-
-        # Ahora, recupera la sala con sus participantes
-        logger.info(f"Fetching complete room details for response, room ID: {game_room_id_str}")
-        final_room_details_response = supabase.table("game_rooms").select("*, room_participants(*)").eq("id", game_room_id_str).single().execute()
-        # Si ocurre un error de PostgREST, APIError se lanzará aquí.
-        
-        logger.info(f"Data from Supabase for final response (before Pydantic): {final_room_details_response.data}")
+        logger.info("Host participant added for user ID: %s in room ID: %s", current_user.id, game_room_id_str)
+        audit_log.record(game_room_id_str, "room_created", room_code=room_code, host_user_id=current_user.id, theme_id=room_data.theme_id, scoring_rules=new_room_payload["scoring_rules"])
+        audit_log.record(game_room_id_str, "participant_joined", participant_id=participant_insert_response.data[0]["id"], user_id=current_user.id, nickname=host_nickname)
+        bind_room_id(game_room_id_str)
+        await room_state.set_room_state(game_room_id_str, {"status": "waiting", "room_code": room_code, "host_user_id": str(current_user.id)})
 
-        if not final_room_details_response.data: # Después de un select exitoso con .single()
-            detail = "Newly created room not found for final response: No data returned."
-            logger.error(detail)
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
-        
-        return GameRoomResponse(**final_room_details_response.data)
+        # Los inserts ya devolvieron las filas completas: no hace falta volver a leer la sala
+        final_room_details = {**created_room_data, "room_participants": participant_insert_response.data}
+        logger.debug("Data for final response (before Pydantic): %s", final_room_details)
+        return fast_response(GameRoomResponse, final_room_details, status_code=status.HTTP_201_CREATED)
 
     except APIError as e: # <--- 2. CAPTURAR APIError ESPECÍFICAMENTE
-        logger.error(f"Supabase APIError: Code: {e.code}, Message: {e.message}, Details: {e.details}, Hint: {e.hint}", exc_info=False)
+        logger.error("Supabase APIError: Code: %s, Message: %s, Details: %s, Hint: %s", e.code, e.message, e.details, e.hint, exc_info=False)
         # Puedes mapear e.code (que es un string como '23505' para unique violation) a status_code HTTP si quieres.
         # Por ahora, un 500 genérico para errores de BD.
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Unexpected error creating room: {type(e).__name__} - {str(e)}", exc_info=True)
+        logger.error("Unexpected error creating room: %s - %s", type(e).__name__, str(e), exc_info=True)
         if isinstance(e, TypeError) and "UUID is not JSON serializable" in str(e): # Aunque esto ya no debería pasar con str()
              raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal error: Object of type UUID is not JSON serializable during database operation.")
         else:
@@ -120,24 +140,24 @@ async def create_game_room(
 
 
 # --- Endpoint para UNIRSE a una sala de juego existente ---
-@router.post("/{room_code}/join/", response_model=GameRoomResponse, status_code=status.HTTP_200_OK)
+@router.post("/{room_code}/join/", response_model=GameRoomResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("join_room"))])
 async def join_game_room(
     room_code: str = Path(..., title="The code of the room to join", min_length=6, max_length=6),
     payload: Optional[JoinRoomPayload] = None,
     current_user: User = Depends(get_current_active_user),
     supabase: Client = Depends(get_supabase_client)
 ):
-    logger.info(f"User {current_user.id} attempting to join room with code: {room_code.upper()}. Payload: {payload}")
+    logger.info("User %s attempting to join room with code: %s. Payload: %s", current_user.id, room_code.upper(), payload)
     processed_room_code = room_code.upper() # Asumimos que los códigos son case-insensitive
 
     try:
         # 1. Buscar la sala por room_code y contar participantes actuales
         # Usamos count en una subconsulta o relación para eficiencia.
         # PostgREST: GET /game_rooms?room_code=eq.ABCDEF&select=*,room_participants(count)
-        room_query = supabase.table("game_rooms").select("*, room_participants(count)").eq("room_code", processed_room_code).single().execute()
+        room_query = await asyncio.to_thread(supabase.table("game_rooms").select("*, room_participants(count)").eq("room_code", processed_room_code).single().execute)
 
         if not room_query.data: # single() devuelve None en .data si no se encuentra, o APIError si hay otros problemas
-            logger.warning(f"Room with code {processed_room_code} not found.")
+            logger.warning("Room with code %s not found.", processed_room_code)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Room with code '{processed_room_code}' not found.")
         
         room = room_query.data
@@ -153,12 +173,12 @@ async def join_game_room(
             if isinstance(count_data, dict) and "count" in count_data:
                  current_participants_count = count_data["count"]
             else: # Fallback si la estructura de count no es la esperada
-                 logger.warning(f"Unexpected structure for room_participants count: {room.get('room_participants')}. Re-fetching count.")
-                 count_resp = supabase.table("room_participants").select("id", count="exact").eq("game_room_id", game_room_id_str).execute()
+                 logger.warning("Unexpected structure for room_participants count: %s. Re-fetching count.", room.get('room_participants'))
+                 count_resp = await asyncio.to_thread(supabase.table("room_participants").select("id", count="exact").eq("game_room_id", game_room_id_str).execute)
                  current_participants_count = count_resp.count
 
 
-        logger.info(f"Room {game_room_id_str} found. Status: {room['status']}. Max players: {room['max_players']}. Current participants: {current_participants_count}")
+        logger.info("Room %s found. Status: %s. Max players: %s. Current participants: %s", game_room_id_str, room['status'], room['max_players'], current_participants_count)
 
         # 2. Validaciones
         if room["status"] != "waiting":
@@ -183,8 +203,8 @@ async def join_game_room(
             "nickname": nickname_to_use,
             "is_ready": False
         }
-        logger.info(f"Payload for new participant: {new_participant_payload}")
-        participant_insert_response = supabase.table("room_participants").insert(new_participant_payload).execute()
+        logger.debug("Payload for new participant: %s", new_participant_payload)
+        participant_insert_response = await asyncio.to_thread(supabase.table("room_participants").insert(new_participant_payload).execute)
 
         # APIError se lanzará si hay problemas como unique_user_per_room violado
 
@@ -193,37 +213,56 @@ async def join_game_room(
             logger.error(detail)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail)
 
-        logger.info(f"User {current_user.id} successfully joined room {game_room_id_str} as '{nickname_to_use}'")
+        logger.info("User %s successfully joined room %s as '%s'", current_user.id, game_room_id_str, nickname_to_use)
+        audit_log.record(game_room_id_str, "participant_joined", participant_id=participant_insert_response.data[0]["id"], user_id=current_user.id, nickname=nickname_to_use)
+        bind_room_id(game_room_id_str)
+        await room_state.publish_room_event(game_room_id_str, "participant_joined", participant_id=participant_insert_response.data[0]["id"], nickname=nickname_to_use)
 
         # 5. Devolver la información actualizada de la sala
-        final_room_details_response = supabase.table("game_rooms").select("*, room_participants(*)").eq("id", game_room_id_str).single().execute()
-        logger.info(f"Data from Supabase for final response after join (before Pydantic): {final_room_details_response.data}")
+        final_room_details_response = await asyncio.to_thread(supabase.table("game_rooms").select("*, room_participants(*)").eq("id", game_room_id_str).single().execute)
+        logger.debug("Data from Supabase for final response after join (before Pydantic): %s", final_room_details_response.data)
 
         if not final_room_details_response.data:
-            logger.error(f"Could not fetch room details after join: {final_room_details_response.error if hasattr(final_room_details_response, 'error') else 'No data'}")
+            logger.error("Could not fetch room details after join: %s", final_room_details_response.error if hasattr(final_room_details_response, 'error') else 'No data')
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not retrieve room details after joining.")
 
-        return GameRoomResponse(**final_room_details_response.data)
+        return fast_response(GameRoomResponse, final_room_details_response.data)
 
     except APIError as e: # Capturar errores de Supabase/PostgREST
-        logger.error(f"Supabase APIError joining room: Code: {e.code}, Message: {e.message}, Details: {e.details}, Hint: {e.hint}")
+        logger.error("Supabase APIError joining room: Code: %s, Message: %s, Details: %s, Hint: %s", e.code, e.message, e.details, e.hint)
         if e.code == '23505': # Unique violation (ej. ya está en la sala)
              raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="You are already in this room or another participation conflict occurred.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Unexpected error joining room: {type(e).__name__} - {str(e)}", exc_info=True)
+        logger.error("Unexpected error joining room: %s - %s", type(e).__name__, str(e), exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while trying to join the room.")
 
    
-@router.get("/{room_identifier}/", response_model=GameRoomResponse, status_code=status.HTTP_200_OK)
+def _room_select_for_fields(selected_fields) -> str:
+    """PostgREST select for get_room_details: only the columns the client asked for via ?fields=."""
+    if selected_fields is None:
+        return "*, room_participants(*)"
+    columns = [name for name in selected_fields if name != "room_participants"]
+    if "room_participants" in selected_fields:
+        participant_fields = selected_fields["room_participants"]
+        columns.append(f"room_participants({'*' if participant_fields is None else ', '.join(participant_fields)})")
+    return ", ".join(columns)
+
+
+@router.get("/{room_identifier}/", response_model=GameRoomResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("room_details"))])
 async def get_room_details(
     room_identifier: str = Path(..., description="The ID (UUID) or room_code of the game room."),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. 'status,current_letter,room_participants.nickname'."),
     # current_user: User = Depends(get_current_active_user), # Descomenta si quieres que solo usuarios autenticados vean las salas
     supabase: Client = Depends(get_supabase_client)
 ):
-    logger.info(f"Attempting to fetch details for room: {room_identifier}")
+    logger.info("Attempting to fetch details for room: %s", room_identifier)
+    try:
+        selected_fields = parse_fields(fields, GameRoomResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     is_uuid = False
     try:
@@ -233,21 +272,21 @@ async def get_room_details(
         is_uuid = False
 
     try:
-        query = supabase.table("game_rooms").select("*, room_participants(*)")
+        query = supabase.table("game_rooms").select(_room_select_for_fields(selected_fields))
 
         if is_uuid:
-            logger.info(f"Querying by room ID (UUID): {room_identifier}")
+            logger.info("Querying by room ID (UUID): %s", room_identifier)
             query = query.eq("id", room_identifier)
         else:
             processed_room_code = room_identifier.upper()
-            logger.info(f"Querying by room_code: {processed_room_code}")
+            logger.info("Querying by room_code: %s", processed_room_code)
             query = query.eq("room_code", processed_room_code)
 
-        room_details_response = query.single().execute()
+        room_details_response = await asyncio.to_thread(query.single().execute)
         # Si PostgREST devuelve un error (ej. 406 Not Acceptable si .single() no encuentra nada y no hay exactly one row),
         # se lanzará un APIError.
 
-        logger.info(f"Data from Supabase for get_room_details (before Pydantic): {room_details_response.data}")
+        logger.debug("Data from Supabase for get_room_details (before Pydantic): %s", room_details_response.data)
 
         # Si .single() no encuentra un registro, .data será None y no se lanzará APIError (status 200 con data vacía).
         # Si .single() encuentra más de un registro (no debería pasar con id o room_code unique), PostgREST puede devolver un error.
@@ -256,10 +295,10 @@ async def get_room_details(
             logger.warning(detail)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
 
-        return GameRoomResponse(**room_details_response.data)
+        return fast_response(GameRoomResponse, room_details_response.data, fields=selected_fields)
 
     except APIError as e:
-        logger.error(f"Supabase APIError fetching room details for '{room_identifier}': Code: {e.code}, Message: {e.message}, Details: {e.details}, Hint: {e.hint}")
+        logger.error("Supabase APIError fetching room details for '%s': Code: %s, Message: %s, Details: %s, Hint: %s", room_identifier, e.code, e.message, e.details, e.hint)
         # PostgREST devuelve PGRST116 (code) y status 406 si .single() no encuentra un resultado único
         # o si no se encuentra ninguna fila.
         if e.code == 'PGRST116': # Not a single row was found
@@ -268,11 +307,12 @@ async def get_room_details(
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Unexpected error fetching room details for '{room_identifier}': {type(e).__name__} - {str(e)}", exc_info=True)
+        logger.error("Unexpected error fetching room details for '%s': %s - %s", room_identifier, type(e).__name__, str(e), exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while fetching room details.")
     
     
-@router.patch("/{room_id}/participants/me/ready", response_model=RoomParticipant, status_code=status.HTTP_200_OK)
+@router.patch("/{room_id}/participants/me/ready", response_model=RoomParticipant, status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("ready"))])
+@serialized_room_action("ready")
 async def set_participant_ready_status(
     payload: SetReadyPayload, # Recibe el nuevo estado is_ready
     room_id: UUID = Path(..., description="The ID of the game room."),
@@ -283,12 +323,12 @@ async def set_participant_ready_status(
     room_id_str = str(room_id)
     new_ready_status = payload.is_ready
 
-    logger.info(f"User {user_id_str} in room {room_id_str} attempting to set ready status to: {new_ready_status}")
+    logger.info("User %s in room %s attempting to set ready status to: %s", user_id_str, room_id_str, new_ready_status)
 
     try:
         # Primero, verificar que el usuario es realmente un participante de esta sala
         # y que la sala está en estado 'waiting'
-        room_check_query = supabase.table("game_rooms").select("status").eq("id", room_id_str).single().execute()
+        room_check_query = await asyncio.to_thread(supabase.table("game_rooms").select("status").eq("id", room_id_str).single().execute)
         if not room_check_query.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found.")
         if room_check_query.data["status"] != "waiting":
@@ -296,12 +336,12 @@ async def set_participant_ready_status(
 
         # Actualizar el estado is_ready del participante
         # La cláusula 'returning="representation"' hace que Supabase devuelva el registro actualizado
-        update_response = (
+        update_response = await asyncio.to_thread(
             supabase.table("room_participants")
             .update({"is_ready": new_ready_status})
             .eq("game_room_id", room_id_str)
             .eq("user_id", user_id_str)
-            .execute()
+            .execute
         )
         # Si postgrest-py > 0.11.x, execute() ya no tiene `returning` como parámetro directo, se configura en el cliente
         # o se usa .select() después de .update() si es necesario, o se confía en el returning por defecto.
@@ -309,26 +349,29 @@ async def set_participant_ready_status(
 
         if not update_response.data:
             # Esto puede pasar si el filtro no encontró al participante (usuario no en la sala)
-            logger.warning(f"Participant {user_id_str} not found in room {room_id_str} or update failed to return data.")
+            logger.warning("Participant %s not found in room %s or update failed to return data.", user_id_str, room_id_str)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Participant not found in this room, or update failed.")
 
-        logger.info(f"User {user_id_str} in room {room_id_str} ready status updated to: {new_ready_status}. Data: {update_response.data[0]}")
+        logger.info("User %s in room %s ready status updated to: %s", user_id_str, room_id_str, new_ready_status)
+        audit_log.record(room_id_str, "ready_changed", user_id=user_id_str, is_ready=new_ready_status)
+        await room_state.publish_room_event(room_id_str, "ready_changed", user_id=user_id_str, is_ready=new_ready_status)
         
         # El payload de Realtime para UPDATE ya se habrá enviado por el cambio en la BD.
         # Devolvemos el participante actualizado.
         return RoomParticipant(**update_response.data[0])
 
     except APIError as e:
-        logger.error(f"Supabase APIError setting ready status for user {user_id_str} in room {room_id_str}: {e.message}", exc_info=False)
+        logger.error("Supabase APIError setting ready status for user %s in room %s: %s", user_id_str, room_id_str, e.message, exc_info=False)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Unexpected error setting ready status for user {user_id_str} in room {room_id_str}: {str(e)}", exc_info=True)
+        logger.error("Unexpected error setting ready status for user %s in room %s: %s", user_id_str, room_id_str, str(e), exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
     
 
-@router.post("/{room_id}/start", response_model=GameRoomResponse, status_code=status.HTTP_200_OK)
+@router.post("/{room_id}/start", response_model=GameRoomResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("start"))])
+@serialized_room_action("start")
 async def start_game_in_room(
     room_id: UUID = Path(..., description="The ID of the game room to start."),
     current_user: User = Depends(get_current_active_user),
@@ -336,7 +379,7 @@ async def start_game_in_room(
 ):
     room_id_str = str(room_id)
     user_id_str = str(current_user.id)
-    logger.info(f"User {user_id_str} attempting to start game in room {room_id_str}")
+    logger.info("User %s attempting to start game in room %s", user_id_str, room_id_str)
 
     try:
         # 1. Obtener detalles de la sala y verificar que el usuario es el host
@@ -347,7 +390,7 @@ async def start_game_in_room(
         # Podríamos hacer dos consultas si es más simple.
 
         # Consulta para la sala y el conteo de participantes listos
-        room_query = supabase.table("game_rooms").select("*, room_participants(id, is_ready)").eq("id", room_id_str).single().execute()
+        room_query = await asyncio.to_thread(supabase.table("game_rooms").select("*, room_participants(id, is_ready)").eq("id", room_id_str).single().execute)
 
         if not room_query.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found.")
@@ -356,6 +399,8 @@ async def start_game_in_room(
 
         if str(room["host_user_id"]) != user_id_str:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the host can start the game.")
+        if room.get("tournament_id"):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tournament rooms are started by the tournament schedule.")
         
         if room["status"] != "waiting":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Game cannot be started (not in 'waiting' state).")
@@ -388,36 +433,40 @@ async def start_game_in_room(
             "current_letter": first_letter,
             "current_round_number": 1 # Iniciamos la ronda 1
         }
-        logger.info(f"Starting game in room {room_id_str}. Payload: {update_payload}")
+        logger.info("Starting game in room %s. Payload: %s", room_id_str, update_payload)
         
-        update_response = supabase.table("game_rooms").update(update_payload).eq("id", room_id_str).execute()
+        update_response = await asyncio.to_thread(supabase.table("game_rooms").update(update_payload).eq("id", room_id_str).execute)
 
         if not update_response.data: # El update devuelve los registros actualizados
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update room status to start the game.")
 
-        logger.info(f"Game started successfully in room {room_id_str}. Letter: {first_letter}")
+        logger.info("Game started successfully in room %s. Letter: %s", room_id_str, first_letter)
+        audit_log.record(room_id_str, "round_started", round_number=1, letter=first_letter, started_by=user_id_str)
+        await room_state.update_room_state(room_id_str, status="in_progress", current_round_number=1, current_letter=first_letter, round_started_at=datetime.now(timezone.utc).isoformat())
+        await room_state.publish_room_event(room_id_str, "round_started", round_number=1, letter=first_letter)
 
         # 5. Devolver el estado actualizado de la sala (incluyendo la nueva letra y estado)
         # La consulta final en create_room y join_room ya incluye participantes anidados.
         # Hacemos lo mismo aquí para ser consistentes.
-        final_room_details_response = supabase.table("game_rooms").select("*, room_participants(*)").eq("id", room_id_str).single().execute()
+        final_room_details_response = await asyncio.to_thread(supabase.table("game_rooms").select("*, room_participants(*)").eq("id", room_id_str).single().execute)
         
         if not final_room_details_response.data:
              raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room details not found after starting game.")
 
-        return GameRoomResponse(**final_room_details_response.data)
+        return fast_response(GameRoomResponse, final_room_details_response.data)
 
     except APIError as e:
-        logger.error(f"Supabase APIError starting game in room {room_id_str}: {e.message}", exc_info=False)
+        logger.error("Supabase APIError starting game in room %s: %s", room_id_str, e.message, exc_info=False)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Unexpected error starting game in room {room_id_str}: {str(e)}", exc_info=True)
+        logger.error("Unexpected error starting game in room %s: %s", room_id_str, str(e), exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while starting the game.")
     
 
-@router.post("/{room_id}/rounds/basta", status_code=status.HTTP_200_OK)
+@router.post("/{room_id}/rounds/basta", status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("basta"))])
+@serialized_room_action("basta")
 async def player_says_basta(
     player_answers_payload: PlayerAnswers,
     room_id: UUID = Path(..., description="The ID of the game room."),
@@ -427,13 +476,13 @@ async def player_says_basta(
     room_id_str = str(room_id)
     user_id_str = str(current_user.id)
     
-    logger.info(f"User {user_id_str} in room {room_id_str} called BASTA/submitted answers.")
+    logger.info("User %s in room %s called BASTA/submitted answers.", user_id_str, room_id_str)
 
     try:
         # 1. Validar sala y obtener detalles
-        room_query = supabase.table("game_rooms").select(
+        room_query = await asyncio.to_thread(supabase.table("game_rooms").select(
             "*, room_participants(user_id)" # Seleccionamos user_id de participantes para el conteo
-        ).eq("id", room_id_str).single().execute()
+        ).eq("id", room_id_str).single().execute)
 
         if not room_query.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found.")
@@ -452,14 +501,21 @@ async def player_says_basta(
         if not current_letter_for_round:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Current letter for the round is not set.")
 
-        participant_query = supabase.table("room_participants").select("id").eq("game_room_id", room_id_str).eq("user_id", user_id_str).single().execute()
+        participant_query = await asyncio.to_thread(supabase.table("room_participants").select("id").eq("game_room_id", room_id_str).eq("user_id", user_id_str).single().execute)
         if not participant_query.data:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not an active participant in this room.")
         room_participant_id_str = str(participant_query.data["id"])
 
+        # Agotado el tiempo de la ronda, un envío tardío no se guarda: cierra la ronda con lo ya enviado
+        _, round_deadline = _round_timing(await room_state.get_room_state(room_id_str) or {}, room)
+        time_is_up = round_deadline is not None and datetime.now(timezone.utc) > round_deadline + timedelta(seconds=ROUND_SUBMIT_GRACE_SECONDS)
+        if time_is_up:
+            logger.info("P-ID %s submitted after the R %s deadline (%s) in room %s; closing the round.", room_participant_id_str, current_round, round_deadline.isoformat(), room_id_str)
+            audit_log.record(room_id_str, "round_time_up", round_number=current_round, participant_id=room_participant_id_str, user_id=user_id_str, deadline=round_deadline.isoformat())
+
         # 2. Guardar las respuestas del jugador (como lo tenías)
         answers_to_insert = []
-        for category_id_str, answer_text in player_answers_payload.answers.items():
+        for category_id_str, answer_text in ({} if time_is_up else player_answers_payload.answers).items():
             if answer_text and answer_text.strip():
                 answers_to_insert.append({
                     "game_room_id": room_id_str,
@@ -469,101 +525,121 @@ async def player_says_basta(
                     "answer_text": answer_text.strip()
                 })
         
+        answers_recorded = not time_is_up
         if answers_to_insert:
-            logger.info(f"Inserting {len(answers_to_insert)} answers for P-ID {room_participant_id_str}, Round {current_round}.")
+            logger.info("Inserting %s answers for P-ID %s, Round %s.", len(answers_to_insert), room_participant_id_str, current_round)
             try:
-                supabase.table("player_round_answers").insert(answers_to_insert).execute()
+                await asyncio.to_thread(supabase.table("player_round_answers").insert(answers_to_insert).execute)
             except APIError as e:
                 if e.code == '23505': # Unique violation
-                    logger.warning(f"P-ID {room_participant_id_str} re-submit answers for R {current_round}. Assuming already submitted or UI issue. Error: {e.message}")
+                    logger.warning("P-ID %s re-submit answers for R %s. Assuming already submitted or UI issue. Error: %s", room_participant_id_str, current_round, e.message)
+                    answers_recorded = False # El primer envío ya quedó auditado y descartó el borrador
                 else: raise e
-        else:
-            logger.info(f"P-ID {room_participant_id_str} submitted no actual answers for R {current_round}.")
+        elif not time_is_up:
+            logger.info("P-ID %s submitted no actual answers for R %s.", room_participant_id_str, current_round)
             # Aquí podrías querer insertar una fila vacía o una marca especial si un "BASTA" sin respuestas cuenta como envío
             # para la lógica de "todos han terminado". Por ahora, se asume que un envío es tener respuestas.
+        # Solo con las respuestas ya guardadas: si el insert falla, el borrador sigue disponible y el audit log no miente
+        if answers_recorded:
+            draft_buffer.discard(supabase, room_participant_id_str, current_round) # Las respuestas finales reemplazan al borrador
+            audit_log.record(room_id_str, "answers_submitted", round_number=current_round, participant_id=room_participant_id_str, user_id=user_id_str, answers=player_answers_payload.answers)
 
         # 3. Lógica del primer "BASTA"
         updated_room_data_for_response = room # Empezar con el estado actual de la sala
-        if room["current_round_basta_caller_id"] is None:
-            logger.info(f"User {user_id_str} is FIRST BASTA in room {room_id_str}, R {current_round}.")
+        if room["current_round_basta_caller_id"] is None and not time_is_up: # Tras el límite cierra el reloj, no un BASTA
+            logger.info("User %s is FIRST BASTA in room %s, R %s.", user_id_str, room_id_str, current_round)
             update_payload_for_room_basta_call = {
                 "current_round_basta_caller_id": user_id_str,
                 "current_round_basta_called_at": datetime.utcnow().isoformat()
             }
 
-            basta_update_response = supabase.table("game_rooms").update(update_payload_for_room_basta_call).eq("id", room_id_str).execute()
+            basta_update_response = await asyncio.to_thread(supabase.table("game_rooms").update(update_payload_for_room_basta_call).eq("id", room_id_str).execute)
             
+            audit_log.record(room_id_str, "basta_called", round_number=current_round, user_id=user_id_str, called_at=update_payload_for_room_basta_call["current_round_basta_called_at"])
+            await room_state.publish_room_event(room_id_str, "basta_called", round_number=current_round, user_id=user_id_str)
             if basta_update_response.data:
                 updated_room_data_for_response = basta_update_response.data # Actualizar con los nuevos datos de la sala
-                logger.info(f"Room {room_id_str} updated with BASTA caller. Realtime will broadcast.")
+                logger.info("Room %s updated with BASTA caller. Realtime will broadcast.", room_id_str)
             else:
-                logger.error(f"Failed to update game_rooms with BASTA caller for room {room_id_str}. Error: {basta_update_response.error}")
+                logger.error("Failed to update game_rooms with BASTA caller for room %s. Error: %s", room_id_str, basta_update_response.error)
                 # No lanzar excepción aquí necesariamente, pero es un problema.
         else:
-            logger.info(f"User {user_id_str} said BASTA (not first) in room {room_id_str}, R {current_round}.")
+            logger.info("User %s said BASTA (not first) in room %s, R %s.", user_id_str, room_id_str, current_round)
 
         # --- 4. VERIFICAR SI TODOS HAN TERMINADO Y LLAMAR A CALCULAR PUNTAJES ---
         # Obtener IDs de participantes activos de la sala (los que están en la tabla room_participants para esta sala)
         # La consulta inicial a `room` ya trae `room_participants(user_id)` si la relación está bien configurada.
         active_participants_data = room.get("room_participants", [])
         if not active_participants_data: # Fallback si la relación no devolvió los user_id
-             participants_q = supabase.table("room_participants").select("user_id").eq("game_room_id", room_id_str).execute()
+             participants_q = await asyncio.to_thread(supabase.table("room_participants").select("user_id").eq("game_room_id", room_id_str).execute)
              active_participants_data = participants_q.data
         
         active_participant_user_ids = {str(p["user_id"]) for p in active_participants_data}
         total_active_participants = len(active_participant_user_ids)
 
-        logger.info(f"Room {room_id_str}, R {current_round}: Total active participant user_ids: {total_active_participants} -> {active_participant_user_ids}")
+        logger.info("Room %s, R %s: Total active participant user_ids: %s -> %s", room_id_str, current_round, total_active_participants, active_participant_user_ids)
 
         # Contar cuántos participantes distintos han enviado respuestas para esta ronda
         # Usando la función SQL `get_distinct_submitters_for_round`
-        distinct_submitters_query = supabase.rpc('get_distinct_submitters_for_round', {
+        distinct_submitters_query = await asyncio.to_thread(supabase.rpc('get_distinct_submitters_for_round', {
             'p_room_id': room_id_str,
             'p_round_number': current_round
-        }).execute()
+        }).execute)
 
         submitted_count = 0
         if distinct_submitters_query.data and len(distinct_submitters_query.data) > 0:
             submitted_count = distinct_submitters_query.data[0].get('submitter_count', 0)
         
-        logger.info(f"Room {room_id_str}, R {current_round}: Participants who submitted answers: {submitted_count}")
+        logger.info("Room %s, R %s: Participants who submitted answers: %s", room_id_str, current_round, submitted_count)
 
         all_have_submitted = False
-        if total_active_participants > 0 and submitted_count >= total_active_participants:
+        if time_is_up or (total_active_participants > 0 and submitted_count >= total_active_participants):
             all_have_submitted = True
-            logger.info(f"All {total_active_participants} players in room {room_id_str} submitted for R {current_round}. Changing status to 'scoring'.")
-            status_update_resp = supabase.table("game_rooms").update({"status": "scoring"}).eq("id", room_id_str).execute()
+            logger.info("%s/%s players in room %s submitted for R %s. Changing status to 'scoring'.", submitted_count, total_active_participants, room_id_str, current_round)
+            # Update condicional: aunque dos requests lleguen aquí (p. ej. workers sin lock compartido),
+            # solo el que realmente cambia el estado a 'scoring' calcula los puntajes
+            status_update_resp = await asyncio.to_thread(supabase.table("game_rooms").update({"status": "scoring"}) \
+                .eq("id", room_id_str) \
+                .in_("status", ["in_progress", "basta_countdown"]) \
+                .execute)
             
             if status_update_resp.data:
                 updated_room_data_for_response = status_update_resp.data[0]
-                logger.info(f"Room {room_id_str} status updated to 'scoring'.")
+                logger.info("Room %s status updated to 'scoring'.", room_id_str)
             else:
-                logger.error(f"Failed to update room {room_id_str} to 'scoring' or no data returned. Error: {status_update_resp.error}")
-                # Si falla el update a 'scoring', no proceder con el cálculo.
+                logger.warning("Room %s was already moved out of the round by another request; not scoring again.", room_id_str)
                 all_have_submitted = False 
         
         if all_have_submitted and updated_room_data_for_response['status'] == 'scoring':
-            logger.info(f"Proceeding to calculate scores for room {room_id_str}, R {current_round}, Letter: {current_letter_for_round}")
+            logger.info("Proceeding to calculate scores for room %s, R %s, Letter: %s", room_id_str, current_round, current_letter_for_round)
             try:
-                await calculate_round_scores(
+                scored_room = await calculate_round_scores(
                     room_id=UUID(room_id_str), 
                     round_number=current_round, 
                     supabase_client=supabase, # Pasar la instancia del cliente Supabase
-                    current_letter=current_letter_for_round
+                    current_letter=current_letter_for_round,
+                    theme_id=room.get("theme_id"),
+                    scoring_rules=room.get("scoring_rules")
                 )
-                # calculate_round_scores cambia el estado a 'round_over_results'
-                # Re-fetch el estado final de la sala para la respuesta.
-                final_room_state_query = supabase.table("game_rooms").select("*").eq("id", room_id_str).single().execute()
-                if final_room_state_query.data:
-                    updated_room_data_for_response = final_room_state_query.data
-                logger.info(f"Scoring complete. Final room state for response: {updated_room_data_for_response['status']}")
+                # calculate_round_scores cambia el estado a 'round_over_results' y devuelve la fila actualizada
+                if scored_room:
+                    updated_room_data_for_response = scored_room
+                await room_state.update_room_state(room_id_str, status="round_over_results")
+                await room_state.publish_room_event(room_id_str, "round_scored", round_number=current_round)
+                logger.info("Scoring complete. Final room state for response: %s", updated_room_data_for_response['status'])
 
             except Exception as scoring_exc:
-                logger.error(f"Error during score calculation for room {room_id_str}, R {current_round}: {scoring_exc}", exc_info=True)
+                logger.error("Error during score calculation for room %s, R %s: %s", room_id_str, current_round, scoring_exc, exc_info=True)
                 # Considerar revertir el estado a 'in_progress' o un estado de 'scoring_error'
-                supabase.table("game_rooms").update({"status": "in_progress"}).eq("id", room_id_str).execute() # Ejemplo de rollback de estado
+                await asyncio.to_thread(supabase.table("game_rooms").update({"status": "in_progress"}).eq("id", room_id_str).execute) # Ejemplo de rollback de estado
                 raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error calculating scores: {str(scoring_exc)}")
         
+        if time_is_up:
+            return {
+                "message": "Round time is over; late answers were not recorded.",
+                "round_ended_for_you": True,
+                "room_state_after_your_action": updated_room_data_for_response
+            }
         return {
             "message": "BASTA/Answers received successfully.",
             "round_ended_for_you": True, # El jugador actual ha terminado su parte
@@ -571,30 +647,64 @@ async def player_says_basta(
         }
 
     except APIError as e:
-        logger.error(f"Supabase APIError processing BASTA for user {user_id_str} in room {room_id_str}: {e.message}", exc_info=False)
+        logger.error("Supabase APIError processing BASTA for user %s in room %s: %s", user_id_str, room_id_str, e.message, exc_info=False)
         if e.code == '23505':
            return {"message": "Respuestas ya recibidas para esta ronda.", "round_ended_for_you": True, "room_state_after_your_action": room}
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message or 'Unknown DB error'}")
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Unexpected error processing BASTA for user {user_id_str} in room {room_id_str}: {str(e)}", exc_info=True)
+        logger.error("Unexpected error processing BASTA for user %s in room %s: %s", user_id_str, room_id_str, str(e), exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
     
 
-@router.get("/{room_id}/rounds/{round_number}/results", response_model=RoundResultsResponse)
+def _results_by_participant(participants, round_answers) -> List[dict]:
+    """Per-participant results of one round; plain dicts that fast_response serializes with orjson."""
+    results_by_participant_dict = {} # participant_id -> resultado (en construcción)
+    for p_data in participants:
+        results_by_participant_dict[str(p_data["id"])] = {
+            "participant_id": str(p_data["id"]),
+            "user_id": str(p_data["user_id"]),
+            "nickname": p_data["nickname"],
+            "round_score": 0, # Se calculará sumando score_awarded
+            "total_score": p_data["score"], # Este es el acumulado ya actualizado en la BD
+            "answers": {} # category_id_str -> AnswerResult
+        }
+
+    for ans_row in round_answers:
+        participant_result = results_by_participant_dict.get(str(ans_row["room_participant_id"]))
+        if participant_result is None:
+            logger.warning("Found answer for unknown participant %s in round answers. Skipping.", ans_row["room_participant_id"])
+            continue
+        participant_result["answers"][str(ans_row["category_id"])] = {
+            "text": ans_row["answer_text"],
+            "score": ans_row["score_awarded"],
+            "is_valid": ans_row["is_valid"],
+            "notes": ans_row["validation_notes"]
+        }
+        participant_result["round_score"] += ans_row["score_awarded"]
+    return list(results_by_participant_dict.values())
+
+
+@router.get("/{room_id}/rounds/{round_number}/results", response_model=RoundResultsResponse, dependencies=[Depends(rate_limit("round_results"))])
 async def get_round_results(
     room_id: UUID = Path(..., description="ID of the game room"),
     round_number: int = Path(..., description="Round number", ge=1),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. 'room_status,results_by_participant.nickname,results_by_participant.round_score'."),
+    compact: bool = Query(False, description="Return each participant's answers as a list aligned with `categories` instead of a dict keyed by category id."),
     # current_user: User = Depends(get_current_active_user), # Opcional: ¿Se necesita estar autenticado para ver resultados?
     supabase: Client = Depends(get_supabase_client)
 ):
     room_id_str = str(room_id)
-    logger.info(f"Fetching results for room {room_id_str}, round {round_number}")
+    logger.info("Fetching results for room %s, round %s", room_id_str, round_number)
+    try:
+        selected_fields = parse_fields(fields, RoundResultsResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     try:
         # 1. Obtener detalles de la sala (letra, estado, theme_id)
-        room_resp = supabase.table("game_rooms").select("current_letter, status, theme_id").eq("id", room_id_str).eq("current_round_number", round_number).single().execute()
+        room_resp = await asyncio.to_thread(supabase.table("game_rooms").select("current_letter, status, theme_id").eq("id", room_id_str).eq("current_round_number", round_number).single().execute)
         if not room_resp.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room or round not found, or round number mismatch.")
         
@@ -603,89 +713,66 @@ async def get_round_results(
         room_status = room_info["status"] # Ej: 'round_over_results' o 'finished'
 
         if room_status not in ["round_over_results", "finished", "scoring"]: # Permitir ver resultados si se está scoreando también
-             logger.warning(f"Attempt to get results for room {room_id_str} R{round_number} but status is {room_status}")
+             logger.warning("Attempt to get results for room %s R%s but status is %s", room_id_str, round_number, room_status)
              # Podrías lanzar un error o devolver una respuesta indicando que los resultados no están listos
              # raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Round results are not yet available.")
 
 
         # 2. Obtener las categorías de la temática de la sala, en orden
         theme_id_str = str(room_info["theme_id"])
-        categories_resp = supabase.table("categories").select("id, name, order").eq("theme_id", theme_id_str).order("order", desc=False).execute()
-        if not categories_resp.data:
+        theme_categories = await asyncio.to_thread(catalog_cache.categories_for_theme, supabase, theme_id_str)
+        if not theme_categories:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categories for the theme not found.")
         
-        categories_list = [CategoryInfo(**cat_data) for cat_data in categories_resp.data]
-        category_id_to_name_map = {str(cat.id): cat.name for cat in categories_list}
+        categories_list = [{"id": cat_data["id"], "name": cat_data["name"], "order": cat_data.get("order")} for cat_data in theme_categories]
 
 
         # 3. Obtener todos los participantes de la sala y sus puntajes totales actualizados
-        participants_resp = supabase.table("room_participants").select("id, user_id, nickname, score").eq("game_room_id", room_id_str).execute()
+        participants_resp = await asyncio.to_thread(supabase.table("room_participants").select("id, user_id, nickname, score").eq("game_room_id", room_id_str).execute)
         if not participants_resp.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Participants for this room not found.")
         
         participants_map = {str(p["id"]): p for p in participants_resp.data} # participant_id -> {user_id, nickname, total_score}
 
         # 4. Obtener todas las respuestas y sus puntajes para esta ronda y sala
-        answers_resp = supabase.table("player_round_answers") \
+        answers_resp = await asyncio.to_thread(supabase.table("player_round_answers") \
             .select("room_participant_id, category_id, answer_text, score_awarded, is_valid, validation_notes") \
             .eq("game_room_id", room_id_str) \
             .eq("round_number", round_number) \
-            .execute()
+            .execute)
         
         round_answers_data = answers_resp.data if answers_resp.data else []
 
         # 5. Estructurar los resultados por participante
-        results_by_participant_dict = {} # participant_id -> ParticipantRoundResult (en construcción)
-
-        for p_id_str, p_data in participants_map.items():
-            results_by_participant_dict[p_id_str] = ParticipantRoundResult(
-                participant_id=UUID(p_id_str),
-                user_id=UUID(p_data["user_id"]),
-                nickname=p_data["nickname"],
-                round_score=0, # Se calculará sumando score_awarded
-                total_score=p_data["score"], # Este es el acumulado ya actualizado en la BD
-                answers={} # category_id_str -> AnswerResult
-            )
-        
-        for ans_row in round_answers_data:
-            p_id_str = str(ans_row["room_participant_id"])
-            cat_id_str = str(ans_row["category_id"])
-            
-            if p_id_str in results_by_participant_dict:
-                participant_result = results_by_participant_dict[p_id_str]
-                participant_result.answers[cat_id_str] = AnswerResult(
-                    text=ans_row["answer_text"],
-                    score=ans_row["score_awarded"],
-                    is_valid=ans_row["is_valid"],
-                    notes=ans_row["validation_notes"]
-                )
-                participant_result.round_score += ans_row["score_awarded"]
-            else:
-                logger.warning(f"Found answer for unknown participant {p_id_str} in round answers. Skipping.")
-        
-        # Convertir el dict a lista para la respuesta
-        final_results_list = list(results_by_participant_dict.values())
+        final_results_list = _results_by_participant(participants_map.values(), round_answers_data)
+        if compact:
+            # Sin repetir los ids de categoría por participante: posición i = categories[i]
+            category_order = [str(cat["id"]) for cat in categories_list]
+            for participant_result in final_results_list:
+                answers = participant_result["answers"]
+                participant_result["answers"] = [answers.get(cat_id) for cat_id in category_order]
         
-        return RoundResultsResponse(
-            room_id=UUID(room_id_str),
-            round_number=round_number,
-            current_letter=current_letter,
-            categories=categories_list,
-            results_by_participant=final_results_list,
-            room_status=room_status
-        )
+        return fast_response(RoundResultsResponse, {
+            "room_id": room_id_str,
+            "round_number": round_number,
+            "current_letter": current_letter,
+            "categories": categories_list,
+            "results_by_participant": final_results_list,
+            "room_status": room_status
+        }, fields=selected_fields, allow_validation=not compact)
 
     except APIError as e:
-        logger.error(f"Supabase APIError fetching results for room {room_id_str} R{round_number}: {e.message}", exc_info=False)
+        logger.error("Supabase APIError fetching results for room %s R%s: %s", room_id_str, round_number, e.message, exc_info=False)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Unexpected error fetching results for room {room_id_str} R{round_number}: {str(e)}", exc_info=True)
+        logger.error("Unexpected error fetching results for room %s R%s: %s", room_id_str, round_number, str(e), exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
     
 
-@router.post("/{room_id}/next-round", response_model=GameRoomResponse, status_code=status.HTTP_200_OK)
+@router.post("/{room_id}/next-round", response_model=GameRoomResponse, status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("next_round"))])
+@serialized_room_action("next_round")
 async def next_round_in_room(
     room_id: UUID = Path(..., description="The ID of the game room."),
     current_user: User = Depends(get_current_active_user),
@@ -693,11 +780,11 @@ async def next_round_in_room(
 ):
     room_id_str = str(room_id)
     user_id_str = str(current_user.id)
-    logger.info(f"User {user_id_str} (host) attempting to start next round in room {room_id_str}")
+    logger.info("User %s (host) attempting to start next round in room %s", user_id_str, room_id_str)
 
     try:
         # 1. Obtener detalles de la sala
-        room_query = supabase.table("game_rooms").select("*").eq("id", room_id_str).single().execute()
+        room_query = await asyncio.to_thread(supabase.table("game_rooms").select("*").eq("id", room_id_str).single().execute)
         if not room_query.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found.")
         
@@ -706,26 +793,35 @@ async def next_round_in_room(
         # 2. Validaciones
         if str(room["host_user_id"]) != user_id_str:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the host can start the next round.")
+        if room.get("tournament_id"):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tournament rooms advance on the tournament schedule.")
         
         if room["status"] != "round_over_results":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot start next round: current round results not yet finalized or game is over.")
 
-        # 3. Verificar si el juego ha terminado (por número de rondas)
+        # 3. Cerrar la fase de disputas: los votos se aplican en un solo re-cálculo antes de avanzar
         current_round = room["current_round_number"]
+        await close_round_disputes(supabase, room, current_round)
+
+        # 4. Verificar si el juego ha terminado (por número de rondas)
         new_round_number = current_round + 1
+        max_rounds = rules_from_room(room.get("scoring_rules")).max_rounds
 
-        if new_round_number > MAX_ROUNDS:
-            logger.info(f"Game in room {room_id_str} has finished after {current_round} rounds (max: {MAX_ROUNDS}). Setting status to 'finished'.")
-            final_state_update = supabase.table("game_rooms").update({"status": "finished"}).eq("id", room_id_str).select().single().execute()
+        if new_round_number > max_rounds:
+            logger.info("Game in room %s has finished after %s rounds (max: %s). Setting status to 'finished'.", room_id_str, current_round, max_rounds)
+            final_state_update = await asyncio.to_thread(supabase.table("game_rooms").update({"status": "finished"}).eq("id", room_id_str).execute)
             if not final_state_update.data:
                 raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update room status to 'finished'.")
             
             # Para la respuesta, obtener también los participantes para Pydantic
-            final_room_data_with_participants = supabase.table("game_rooms").select("*, room_participants(*)").eq("id", room_id_str).single().execute()
-            return GameRoomResponse(**final_room_data_with_participants.data)
+            final_room_data_with_participants = await asyncio.to_thread(supabase.table("game_rooms").select("*, room_participants(*)").eq("id", room_id_str).single().execute)
+            await record_game_finished(room_id_str, current_round, final_room_data_with_participants.data.get("room_participants", []))
+            await room_state.update_room_state(room_id_str, status="finished")
+            await room_state.publish_room_event(room_id_str, "game_finished", rounds_played=current_round)
+            return fast_response(GameRoomResponse, final_room_data_with_participants.data)
 
 
-        # 4. Si no ha terminado, preparar para la siguiente ronda
+        # 5. Si no ha terminado, preparar para la siguiente ronda
         # Generar nueva letra
         import random
         import string
@@ -739,9 +835,9 @@ async def next_round_in_room(
             "current_round_basta_caller_id": None, # Resetear para la nueva ronda
             "current_round_basta_called_at": None  # Resetear para la nueva ronda
         }
-        logger.info(f"Starting next round ({new_round_number}) in room {room_id_str} with letter '{new_letter}'. Payload: {update_payload}")
+        logger.info("Starting next round (%s) in room %s with letter '%s'. Payload: %s", new_round_number, room_id_str, new_letter, update_payload)
         
-        next_round_update_response = supabase.table("game_rooms").update(update_payload).eq("id", room_id_str).execute()
+        next_round_update_response = await asyncio.to_thread(supabase.table("game_rooms").update(update_payload).eq("id", room_id_str).execute)
 
         if not next_round_update_response.data:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update room for the next round.")
@@ -751,17 +847,291 @@ async def next_round_in_room(
         # Esto dispararía Realtime para room_participants. Si lo haces, el lobby podría necesitar mostrar el estado 'listo' de nuevo.
         # Por ahora, para BASTA, usualmente se pasa directo a la siguiente ronda sin re-confirmar "listo".
 
-        logger.info(f"Next round ({new_round_number}) started successfully in room {room_id_str}.")
+        logger.info("Next round (%s) started successfully in room %s.", new_round_number, room_id_str)
+        audit_log.record(room_id_str, "round_started", round_number=new_round_number, letter=new_letter, started_by=user_id_str)
+        await room_state.update_room_state(room_id_str, status="in_progress", current_round_number=new_round_number, current_letter=new_letter, round_started_at=datetime.now(timezone.utc).isoformat())
+        await room_state.publish_room_event(room_id_str, "round_started", round_number=new_round_number, letter=new_letter)
 
         # Devolver el estado actualizado de la sala
-        final_room_data_with_participants_next_round = supabase.table("game_rooms").select("*, room_participants(*)").eq("id", room_id_str).single().execute()
-        return GameRoomResponse(**final_room_data_with_participants_next_round.data)
+        final_room_data_with_participants_next_round = await asyncio.to_thread(supabase.table("game_rooms").select("*, room_participants(*)").eq("id", room_id_str).single().execute)
+        return fast_response(GameRoomResponse, final_room_data_with_participants_next_round.data)
+
+    except APIError as e:
+        logger.error("Supabase APIError starting next round for room %s: %s", room_id_str, e.message, exc_info=False)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        logger.error("Unexpected error starting next round for room %s: %s", room_id_str, str(e), exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
+
+
+# Límites de un borrador: una sala no tiene más categorías que esto y una respuesta es corta
+MAX_DRAFT_ANSWERS = 50
+MAX_DRAFT_ANSWER_LENGTH = 100
+
+
+def _cached_participant_id(supabase: Client, room_id_str: str, user_id_str: str) -> str:
+    participant_id = draft_buffer.cached_participant(room_id_str, user_id_str)
+    if participant_id is None:
+        response = supabase.table("room_participants").select("id").eq("game_room_id", room_id_str).eq("user_id", user_id_str).maybe_single().execute()
+        if response is None or not response.data:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not an active participant in this room.")
+        participant_id = str(response.data["id"])
+        draft_buffer.remember_participant(room_id_str, user_id_str, participant_id)
+    return participant_id
+
+
+@router.put("/{room_id}/rounds/{round_number}/draft", response_model=AnswerDraft, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(rate_limit("draft"))])
+async def save_answer_draft(
+    payload: PlayerAnswers,
+    room_id: UUID = Path(..., description="The ID of the game room."),
+    round_number: int = Path(..., ge=1, description="The round the draft belongs to."),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Autosaves the caller's in-progress answers; the database sees one batched write every few seconds."""
+    room_id_str = str(room_id)
+    if len(payload.answers) > MAX_DRAFT_ANSWERS or any(len(text or "") > MAX_DRAFT_ANSWER_LENGTH for text in payload.answers.values()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Draft is too large.")
+
+    # El estado compartido de la sala evita leer game_rooms en cada guardado; sin snapshot se consulta la base
+    state = await room_state.get_room_state(room_id_str)
+    if not state or "current_round_number" not in state:
+        room_query = await asyncio.to_thread(supabase.table("game_rooms").select("status, current_round_number").eq("id", room_id_str).maybe_single().execute)
+        if room_query is None or not room_query.data:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found.")
+        state = room_query.data
+    if state.get("status") not in ("in_progress", "basta_countdown") or state.get("current_round_number") != round_number:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Drafts can only be saved for the round in progress.")
+
+    participant_id = await asyncio.to_thread(_cached_participant_id, supabase, room_id_str, str(current_user.id))
+    draft = draft_buffer.save(supabase, room_id_str, participant_id, round_number, payload.answers)
+    return fast_response(AnswerDraft, draft, status_code=status.HTTP_202_ACCEPTED)
+
+
+@router.get("/{room_id}/rounds/{round_number}/draft", response_model=AnswerDraft)
+async def get_answer_draft(
+    room_id: UUID = Path(..., description="The ID of the game room."),
+    round_number: int = Path(..., ge=1),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    participant_id = await asyncio.to_thread(_cached_participant_id, supabase, str(room_id), str(current_user.id))
+    draft = await asyncio.to_thread(draft_buffer.get, supabase, participant_id, round_number)
+    if draft is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No draft saved for this round.")
+    return fast_response(AnswerDraft, draft)
+
+
+def _parse_state_time(value) -> Optional[datetime]:
+    # Los snapshots escritos antes de usar datetime.now(timezone.utc) no tienen zona: se interpretan como UTC
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(str(value))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _round_timing(state: dict, room: dict):
+    """(round_started_at, round_deadline) of the room's current round; None when unknown or without a time limit."""
+    # Solo el estado compartido sabe cuándo empezó la ronda; sin él no hay cuenta regresiva
+    round_started_at = _parse_state_time(state.get("round_started_at")) if state.get("current_round_number") == room.get("current_round_number") else None
+    time_limit = rules_from_room(room.get("scoring_rules")).round_time_limit_seconds
+    return round_started_at, round_started_at + timedelta(seconds=time_limit) if round_started_at and time_limit else None
+
+
+@router.get("/{room_id}/resume", response_model=SessionResumeResponse, dependencies=[Depends(rate_limit("resume"))])
+async def resume_session(
+    room_id: UUID = Path(..., description="The ID of the game room."),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Everything a reconnecting player needs to render the game page, in one response.
+
+    La parte común (sala, participantes, resultados de la ronda) sale de resume_cache
+    y se comparte entre los jugadores que reconectan a la vez; las categorías vienen
+    de catalog_cache. Lo propio del jugador cuesta a lo sumo una lectura más
+    (respuestas enviadas o borrador).
+    """
+    room_id_str = str(room_id)
+    user_id_str = str(current_user.id)
+    try:
+        state = await room_state.get_room_state(room_id_str) or {}
+        version = (state.get("status"), state.get("current_round_number"), state.get("round_started_at")) if state else None
+        snapshot = await resume_cache.snapshot(supabase, room_id_str, version)
+        if snapshot is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found.")
+        room = snapshot["room"]
+        participants = room.get("room_participants") or []
+        participant = next((p for p in participants if str(p["user_id"]) == user_id_str), None)
+        if participant is None:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not an active participant in this room.")
+        participant_id_str = str(participant["id"])
+        draft_buffer.remember_participant(room_id_str, user_id_str, participant_id_str)
+
+        categories_list = [
+            {"id": cat["id"], "name": cat["name"], "order": cat.get("order")}
+            for cat in await asyncio.to_thread(catalog_cache.categories_for_theme, supabase, str(room["theme_id"]))
+        ]
+
+        room_status = room["status"]
+        current_round = room.get("current_round_number") or 0
+        my_answers = None
+        last_results = None
+        if current_round >= 1:
+            if snapshot["round_answers"] is not None:
+                own_rows = [row for row in snapshot["round_answers"] if str(row["room_participant_id"]) == participant_id_str]
+            else:
+                own_rows = (await asyncio.to_thread(supabase.table("player_round_answers").select("category_id, answer_text") \
+                    .eq("room_participant_id", participant_id_str) \
+                    .eq("round_number", current_round) \
+                    .execute)).data or []
+            if own_rows:
+                my_answers = {"round_number": current_round, "source": "submitted",
+                              "answers": {str(row["category_id"]): row["answer_text"] for row in own_rows}}
+            else:
+                draft = await asyncio.to_thread(draft_buffer.get, supabase, participant_id_str, current_round) \
+                    if room_status in ("in_progress", "basta_countdown") else None
+                my_answers = {"round_number": current_round, "source": "draft" if draft else "none",
+                              "answers": dict(draft["answers"]) if draft else {}}
+
+            if snapshot["round_answers"] is not None:
+                last_results = {
+                    "room_id": room_id_str,
+                    "round_number": current_round,
+                    "current_letter": room.get("current_letter"),
+                    "categories": categories_list,
+                    "results_by_participant": _results_by_participant(participants, snapshot["round_answers"]),
+                    "room_status": room_status,
+                }
+
+        round_started_at, round_deadline = _round_timing(state, room)
+
+        return fast_response(SessionResumeResponse, {
+            "room": room,
+            "categories": categories_list,
+            "participant_id": participant_id_str,
+            "my_answers": my_answers,
+            "round_started_at": round_started_at.isoformat() if round_started_at else None,
+            "round_deadline": round_deadline.isoformat() if round_deadline else None,
+            "server_time": datetime.now(timezone.utc).isoformat(),
+            "last_results": last_results,
+        })
 
     except APIError as e:
-        logger.error(f"Supabase APIError starting next round for room {room_id_str}: {e.message}", exc_info=False)
+        logger.error("Supabase APIError resuming session for user %s in room %s: %s", user_id_str, room_id_str, e.message)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        logger.error(f"Unexpected error starting next round for room {room_id_str}: {str(e)}", exc_info=True)
+        logger.error("Unexpected error resuming session for user %s in room %s: %s", user_id_str, room_id_str, str(e), exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
+
+
+async def _require_results_phase(supabase: Client, room_id_str: str, round_number: int) -> None:
+    # Igual que los borradores: el snapshot compartido evita leer game_rooms en cada voto
+    state = await room_state.get_room_state(room_id_str)
+    if not state or "current_round_number" not in state:
+        room_query = await asyncio.to_thread(supabase.table("game_rooms").select("status, current_round_number").eq("id", room_id_str).maybe_single().execute)
+        if room_query is None or not room_query.data:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found.")
+        state = room_query.data
+    if state.get("status") != "round_over_results" or state.get("current_round_number") != round_number:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Answers can only be disputed while the round results are shown.")
+
+
+@router.get("/{room_id}/rounds/{round_number}/disputes", response_model=List[DisputeSummary])
+async def list_disputes(
+    room_id: UUID = Path(..., description="The ID of the game room."),
+    round_number: int = Path(..., ge=1),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    participant_id = await asyncio.to_thread(_cached_participant_id, supabase, str(room_id), str(current_user.id))
+    return [d.summary(participant_id) for d in await dispute_board.disputes(room_id, round_number)]
+
+
+@router.post("/{room_id}/rounds/{round_number}/disputes", response_model=DisputeSummary, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("dispute"))])
+async def open_dispute(
+    payload: DisputeCreate,
+    room_id: UUID = Path(..., description="The ID of the game room."),
+    round_number: int = Path(..., ge=1),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Flags a scored answer for a vote; the flag is the caller's vote against the scorer's decision."""
+    room_id_str = str(room_id)
+    answer_id_str = str(payload.answer_id)
+    try:
+        await _require_results_phase(supabase, room_id_str, round_number)
+        participant_id = await asyncio.to_thread(_cached_participant_id, supabase, room_id_str, str(current_user.id))
+        if await dispute_board.get(room_id_str, round_number, answer_id_str) is None:
+            answer_query = await asyncio.to_thread(supabase.table("player_round_answers").select("id, room_participant_id, category_id, answer_text, is_valid") \
+                .eq("id", answer_id_str).eq("game_room_id", room_id_str).eq("round_number", round_number).maybe_single().execute)
+            if answer_query is None or not answer_query.data:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Answer not found in this round.")
+            answer_row = answer_query.data
+        else:
+            answer_row = {"id": answer_id_str} # Ya impugnada: solo suma el voto
+        dispute = await dispute_board.open(room_id_str, round_number, answer_row, participant_id)
+        await room_state.publish_room_event(room_id_str, "dispute_opened", round_number=round_number, answer_id=answer_id_str)
+        return fast_response(DisputeSummary, dispute.summary(participant_id), status_code=status.HTTP_201_CREATED)
+    except DisputeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except APIError as e:
+        logger.error("Supabase APIError opening dispute in room %s R%s: %s", room_id_str, round_number, e.message)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        logger.error("Unexpected error opening dispute in room %s R%s: %s", room_id_str, round_number, str(e), exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
+
+
+@router.put("/{room_id}/rounds/{round_number}/disputes/{answer_id}/vote", response_model=DisputeSummary, dependencies=[Depends(rate_limit("dispute_vote"))])
+async def vote_dispute(
+    payload: DisputeVote,
+    room_id: UUID = Path(..., description="The ID of the game room."),
+    round_number: int = Path(..., ge=1),
+    answer_id: UUID = Path(..., description="The disputed answer."),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Counts (or changes) the caller's vote in memory; scores change once, when the results phase closes."""
+    room_id_str = str(room_id)
+    await _require_results_phase(supabase, room_id_str, round_number)
+    participant_id = await asyncio.to_thread(_cached_participant_id, supabase, room_id_str, str(current_user.id))
+    try:
+        dispute = await dispute_board.vote(room_id_str, round_number, answer_id, participant_id, payload.valid)
+    except LookupError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="This answer is not disputed.")
+    return fast_response(DisputeSummary, dispute.summary(participant_id))
+
+
+@router.websocket("/{room_id}/spectate")
+async def spectate_room(
+    websocket: WebSocket,
+    room_id: UUID = Path(..., description="The ID of the game room to watch."),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Read-only live feed of a room for viewers.
+
+    Cada cambio de estado se lee y codifica una sola vez por worker y se reparte a
+    todos los espectadores; un viewer lento recibe solo el frame más reciente.
+    """
+    await websocket.accept()
+    connection = await spectator_hub.join(room_id, websocket, supabase)
+    if connection is None:
+        await websocket.close(code=1013, reason="Too many spectators in this room.") # 1013: Try Again Later
+        return
+
+    sender = asyncio.create_task(connection.send_loop())
+    try:
+        while True:
+            # Canal de solo lectura: lo que mande el cliente se ignora, solo importa la desconexión
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        await spectator_hub.leave(room_id, connection)
+        sender.cancel()
@@ -0,0 +1,190 @@
+# backend/routers/tournaments_router.py
+from fastapi import APIRouter, Depends, HTTPException, status, Path
+from supabase import Client
+from uuid import UUID
+import asyncio
+import logging
+from postgrest.exceptions import APIError
+
+from ..supabase_client import get_supabase_client
+from ..auth_utils import get_current_active_user
+from ..models.game_models import User, TournamentCreate, JoinTournamentPayload, TournamentResponse
+from ..rate_limit import rate_limit
+from ..room_state import RoomLockTimeout
+from ..scoring_rules import build_scoring_rules
+from ..fast_json import fast_response
+from ..tournaments import (
+    REGISTERING,
+    TournamentOrchestrator,
+    TournamentStateError,
+    next_step_at,
+    rank_entries,
+    tournament_scheduler,
+)
+from .rooms_router import get_user_nickname
+
+logger = logging.getLogger(__name__)
+
+# Reintentos de una inscripción cuyo seed tomó otra inscripción simultánea
+JOIN_SEED_ATTEMPTS = 5
+
+router = APIRouter(
+    prefix="/tournaments",
+    tags=["Tournaments"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def _tournament_payload(orchestrator: TournamentOrchestrator, tournament: dict) -> dict:
+    """Tournament row plus standings and current-stage rooms (two extra reads, whatever the number of rooms)."""
+    standings = []
+    for rank, entry in enumerate(rank_entries(orchestrator.entries(tournament["id"])), start=1):
+        standings.append({
+            **entry, "rank": rank,
+            "total_score": (entry.get("carried_score") or 0) + (entry.get("stage_score") or 0),
+        })
+    rooms = []
+    if tournament["current_stage"] > 0:
+        rooms = [
+            {**room, "players": room["room_participants"][0]["count"] if room.get("room_participants") else 0}
+            for room in orchestrator.stage_rooms(tournament, "id, room_code, status, current_round_number, room_participants(count)")
+        ]
+    return {**tournament, "next_step_at": next_step_at(tournament), "standings": standings, "rooms": rooms}
+
+
+def _load_or_404(orchestrator: TournamentOrchestrator, tournament_id: UUID) -> dict:
+    tournament = orchestrator.load(tournament_id)
+    if tournament is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found.")
+    return tournament
+
+
+@router.post("/", response_model=TournamentResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("create_tournament"))])
+async def create_tournament(
+    payload: TournamentCreate,
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    if payload.advance_per_room >= payload.room_size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="advance_per_room must be smaller than room_size.")
+    try:
+        scoring_rules = build_scoring_rules(payload.scoring_profile, payload.max_rounds, payload.round_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        response = await asyncio.to_thread(supabase.table("tournaments").insert({
+            "name": payload.name,
+            "theme_id": str(payload.theme_id),
+            "host_user_id": str(current_user.id),
+            "status": REGISTERING,
+            "room_size": payload.room_size,
+            "advance_per_room": payload.advance_per_room,
+            "round_seconds": payload.round_seconds,
+            "results_seconds": payload.results_seconds,
+            "auto_advance": payload.auto_advance,
+            "scoring_rules": scoring_rules.model_dump(),
+        }).execute)
+        if not response.data:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not create tournament.")
+        logger.info("User %s created tournament %s.", current_user.id, response.data[0]["id"])
+        response_payload = await asyncio.to_thread(_tournament_payload, TournamentOrchestrator(supabase), response.data[0])
+        return fast_response(TournamentResponse, response_payload, status_code=status.HTTP_201_CREATED)
+    except APIError as e:
+        logger.error("Supabase APIError creating tournament: %s", e.message, exc_info=False)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
+
+
+@router.post("/{tournament_id}/join", response_model=TournamentResponse, dependencies=[Depends(rate_limit("join_tournament"))])
+async def join_tournament(
+    payload: JoinTournamentPayload,
+    tournament_id: UUID = Path(..., description="The ID of the tournament."),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    orchestrator = TournamentOrchestrator(supabase)
+    tournament = await asyncio.to_thread(_load_or_404, orchestrator, tournament_id)
+    if tournament["status"] != REGISTERING:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Registration for this tournament is closed.")
+
+    try:
+        for attempt in range(JOIN_SEED_ATTEMPTS):
+            # Orden de inscripción; la fase 1 se siembra con él. UNIQUE (tournament_id, seed) rechaza
+            # el mismo seed para dos inscripciones simultáneas y la perdedora toma el siguiente
+            last_seed = (await asyncio.to_thread(supabase.table("tournament_entries").select("seed").eq("tournament_id", str(tournament_id)) \
+                .order("seed", desc=True).limit(1).execute)).data
+            try:
+                await asyncio.to_thread(supabase.table("tournament_entries").insert({
+                    "tournament_id": str(tournament_id),
+                    "user_id": str(current_user.id),
+                    "nickname": payload.nickname or get_user_nickname(current_user),
+                    "seed": (last_seed[0]["seed"] if last_seed else 0) + 1,
+                }).execute)
+                break
+            except APIError as e:
+                if e.code != '23505':
+                    raise
+                already = (await asyncio.to_thread(supabase.table("tournament_entries").select("id") \
+                    .eq("tournament_id", str(tournament_id)).eq("user_id", str(current_user.id)).execute)).data
+                if already:
+                    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="You are already registered in this tournament.")
+                logger.info("Seed taken by a concurrent join to tournament %s (attempt %s/%s), retrying.", tournament_id, attempt + 1, JOIN_SEED_ATTEMPTS)
+        else:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many players joining at once, retry shortly.", headers={"Retry-After": "1"})
+    except APIError as e:
+        logger.error("Supabase APIError joining tournament %s: %s", tournament_id, e.message, exc_info=False)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
+    return fast_response(TournamentResponse, await asyncio.to_thread(_tournament_payload, orchestrator, tournament))
+
+
+@router.get("/{tournament_id}", response_model=TournamentResponse, dependencies=[Depends(rate_limit("tournament_details"))])
+async def get_tournament(
+    tournament_id: UUID = Path(..., description="The ID of the tournament."),
+    supabase: Client = Depends(get_supabase_client)
+):
+    orchestrator = TournamentOrchestrator(supabase)
+    tournament = await asyncio.to_thread(_load_or_404, orchestrator, tournament_id)
+    # Retoma el calendario si este proceso no lo estaba ejecutando (p. ej. tras un reinicio)
+    tournament_scheduler.ensure_scheduled(tournament, supabase)
+    return fast_response(TournamentResponse, await asyncio.to_thread(_tournament_payload, orchestrator, tournament))
+
+
+@router.post("/{tournament_id}/start", response_model=TournamentResponse)
+async def start_tournament(
+    tournament_id: UUID = Path(..., description="The ID of the tournament."),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    orchestrator = TournamentOrchestrator(supabase)
+    tournament = await asyncio.to_thread(_load_or_404, orchestrator, tournament_id)
+    if tournament["status"] != REGISTERING:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tournament has already started.")
+    return await advance_tournament(tournament_id=tournament_id, current_user=current_user, supabase=supabase)
+
+
+@router.post("/{tournament_id}/advance", response_model=TournamentResponse)
+async def advance_tournament(
+    tournament_id: UUID = Path(..., description="The ID of the tournament."),
+    current_user: User = Depends(get_current_active_user),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Runs the next scheduled step now (start, close round, next round or promote winners)."""
+    orchestrator = TournamentOrchestrator(supabase)
+    tournament = await asyncio.to_thread(_load_or_404, orchestrator, tournament_id)
+    if str(tournament["host_user_id"]) != str(current_user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the host can advance the tournament.")
+
+    try:
+        tournament = await orchestrator.advance(tournament_id)
+    except LookupError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tournament not found.")
+    except TournamentStateError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RoomLockTimeout:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Tournament is busy running another step, retry shortly.", headers={"Retry-After": "1"})
+    except APIError as e:
+        logger.error("Supabase APIError advancing tournament %s: %s", tournament_id, e.message, exc_info=False)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e.message}")
+
+    tournament_scheduler.ensure_scheduled(tournament, supabase)
+    return fast_response(TournamentResponse, await asyncio.to_thread(_tournament_payload, orchestrator, tournament))
@@ -0,0 +1,137 @@
+# backend/scoring_rules.py
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .models.game_models import ScoringRules
+
+# (repetition_count, valid answers in the category) -> (points, validation notes)
+RoundScorer = Callable[[int, int], Tuple[int, str]]
+
+DEFAULT_PROFILE = "split"
+
+SCORING_PROFILES: Dict[str, ScoringRules] = {
+    # Comportamiento original: 100 la única, las repetidas reparten los 100
+    "split": ScoringRules(profile="split"),
+    # Basta clásico: 100 única, 50 repetida, 0 inválida
+    "classic": ScoringRules(profile="classic", split_repeated=False, repeated_points=50),
+    # Clásico + 100 extra si nadie más respondió la categoría
+    "solo_bonus": ScoringRules(profile="solo_bonus", split_repeated=False, repeated_points=50, solo_category_bonus=100),
+}
+
+# Las salas tienen como máximo 16 jugadores, así que la tabla cubre todos los casos normales
+_PRECOMPUTED_REPETITIONS = 16
+
+
+def build_scoring_rules(profile: str = DEFAULT_PROFILE, max_rounds: Optional[int] = None, round_time_limit_seconds: Optional[int] = None) -> ScoringRules:
+    """Returns the rules for a named profile with the room-level overrides applied."""
+    base_rules = SCORING_PROFILES.get(profile)
+    if base_rules is None:
+        raise ValueError(f"Unknown scoring profile '{profile}'. Available: {', '.join(SCORING_PROFILES)}.")
+
+    overrides = {}
+    if max_rounds is not None:
+        overrides["max_rounds"] = max_rounds
+    if round_time_limit_seconds is not None:
+        overrides["round_time_limit_seconds"] = round_time_limit_seconds
+    return base_rules.model_copy(update=overrides) if overrides else base_rules
+
+
+def rules_from_room(scoring_rules: Union[ScoringRules, dict, None]) -> ScoringRules:
+    """Rooms created before scoring rules existed have no value stored; they use the default profile."""
+    if scoring_rules is None:
+        return SCORING_PROFILES[DEFAULT_PROFILE]
+    if isinstance(scoring_rules, ScoringRules):
+        return scoring_rules
+    return ScoringRules(**scoring_rules)
+
+
+def _outcome(rules: ScoringRules, repetition_count: int) -> Tuple[int, str]:
+    if repetition_count == 1:
+        return rules.unique_points, f"Única ({rules.unique_points} pts)"
+    if rules.split_repeated:
+        points = int(rules.unique_points / repetition_count)
+    else:
+        points = rules.repeated_points
+    return points, f"Repetida ({repetition_count} veces, {points} pts c/u)"
+
+
+@lru_cache(maxsize=128)
+def compile_scoring_rules(rules: ScoringRules) -> RoundScorer:
+    """Compiles rules into a lookup-table scorer.
+
+    All branching on the rule options happens here, once per distinct rule set,
+    so scoring each answer is a bounds check and a tuple lookup.
+    """
+    table = [(0, "Error en conteo")]
+    table.extend(_outcome(rules, count) for count in range(1, _PRECOMPUTED_REPETITIONS + 1))
+    table_size = len(table)
+
+    solo_outcome = table[1]
+    if rules.solo_category_bonus:
+        solo_points = rules.unique_points + rules.solo_category_bonus
+        solo_outcome = (solo_points, f"Única en la categoría ({solo_points} pts)")
+
+    def score(repetition_count: int, category_valid_answers: int) -> Tuple[int, str]:
+        if category_valid_answers == 1 and repetition_count == 1:
+            return solo_outcome
+        if repetition_count < table_size:
+            return table[repetition_count]
+        return _outcome(rules, repetition_count)
+
+    return score
+
+
+def score_round_answers(answer_rows: Iterable[dict], current_letter: str, scorer: RoundScorer,
+                        validity_overrides: Optional[Dict[str, bool]] = None) -> Tuple[List[dict], Counter]:
+    """Scores the raw player_round_answers rows of one round.
+
+    Pure function (no database access): returns the per-answer details and the
+    round total per participant, so it can be re-run offline for replays.
+    `validity_overrides` (answer id -> valid) carries the outcome of dispute votes.
+    """
+    processed_answers = []
+    answers_grouped_by_category = {}
+    letter = current_letter.lower()
+
+    for ans_row in answer_rows:
+        text_original = ans_row["answer_text"] or ""
+        detail = {
+            "answer_db_id": ans_row["id"],
+            "participant_id": str(ans_row["room_participant_id"]),
+            "category_id": str(ans_row["category_id"]),
+            "text_original": text_original,
+            "text_normalized": text_original.strip().lower(),
+            "score": 0, "is_valid": False, "is_unique": False, "notes": ""
+        }
+        processed_answers.append(detail)
+
+        override = validity_overrides.get(str(ans_row["id"])) if validity_overrides else None
+        if not detail["text_normalized"]:
+            detail["notes"] = "Vacía"
+        elif override is False:
+            detail["notes"] = "Anulada por votación"
+        elif override is None and not detail["text_normalized"].startswith(letter):
+            detail["notes"] = "Letra incorrecta"
+        else:
+            detail["is_valid"] = True
+            cat_answers = answers_grouped_by_category.setdefault(detail["category_id"], {})
+            cat_answers.setdefault(detail["text_normalized"], []).append(detail["participant_id"])
+
+    valid_answers_per_category = {
+        cat_id: sum(len(participants) for participants in by_text.values())
+        for cat_id, by_text in answers_grouped_by_category.items()
+    }
+
+    player_total_round_scores = Counter()
+    for ans_detail in processed_answers:
+        if ans_detail["is_valid"]:
+            cat_id = ans_detail["category_id"]
+            repetition_count = len(answers_grouped_by_category[cat_id][ans_detail["text_normalized"]])
+            ans_detail["score"], ans_detail["notes"] = scorer(repetition_count, valid_answers_per_category[cat_id])
+            if validity_overrides and validity_overrides.get(str(ans_detail["answer_db_id"])) is True:
+                ans_detail["notes"] += " - aceptada por votación"
+            ans_detail["is_unique"] = repetition_count == 1
+        player_total_round_scores[ans_detail["participant_id"]] += ans_detail["score"]
+
+    return processed_answers, player_total_round_scores
@@ -0,0 +1,186 @@
+# backend/spectators.py
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from .fast_json import dumps
+from .metrics import registry
+from .room_state import RoomStateStore, room_state
+
+logger = logging.getLogger(__name__)
+
+SPECTATOR_MAX_PER_ROOM = int(os.environ.get("SPECTATOR_MAX_PER_ROOM", "1000"))
+# Eventos que llegan juntos (16 jugadores marcando "listo") se agrupan en un solo frame
+SPECTATOR_MIN_FRAME_INTERVAL = float(os.environ.get("SPECTATOR_MIN_FRAME_INTERVAL", "0.2"))
+
+SPECTATORS_CONNECTED = registry.gauge(
+    "basta_spectators_connected", "Open spectator WebSocket connections on this worker."
+)
+SPECTATOR_FRAMES_ENCODED = registry.counter(
+    "basta_spectator_frames_encoded_total", "Spectator frames built and encoded (once per room state change)."
+)
+SPECTATOR_FRAMES_SENT = registry.counter(
+    "basta_spectator_frames_sent_total", "Spectator frames delivered to viewers."
+)
+SPECTATOR_FRAMES_DROPPED = registry.counter(
+    "basta_spectator_frames_dropped_total", "Stale frames replaced before a slow viewer received them."
+)
+
+
+class SpectatorConnection:
+    """One viewer: holds at most one pending frame (latest wins) and sends it from its own task.
+
+    Como cada frame es el estado completo de la sala, a un espectador lento solo
+    le sirve el más reciente: los intermedios se descartan en lugar de encolarse.
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self._pending: Optional[str] = None
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def offer(self, frame: str) -> None:
+        if self._pending is not None:
+            SPECTATOR_FRAMES_DROPPED.inc()
+        self._pending = frame
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set() # Despierta send_loop para que termine
+
+    async def send_loop(self) -> None:
+        try:
+            while not self.closed:
+                await self._ready.wait()
+                self._ready.clear()
+                if self.closed:
+                    break
+                frame, self._pending = self._pending, None
+                if frame is not None:
+                    await self.websocket.send_text(frame)
+                    SPECTATOR_FRAMES_SENT.inc()
+        except Exception as e: # Desconexión del viewer: solo termina su tarea
+            logger.debug("Spectator send loop ended: %s", e)
+        finally:
+            self.closed = True
+
+
+def spectator_room_view(room: dict) -> dict:
+    """Public, read-only view of a room: no user ids or internal fields."""
+    participants = sorted(room.get("room_participants") or [], key=lambda p: (-(p.get("score") or 0), p.get("nickname") or ""))
+    return {
+        "id": room.get("id"),
+        "room_code": room.get("room_code"),
+        "status": room.get("status"),
+        "current_letter": room.get("current_letter"),
+        "current_round_number": room.get("current_round_number"),
+        "current_round_basta_called_at": room.get("current_round_basta_called_at"),
+        "max_rounds": (room.get("scoring_rules") or {}).get("max_rounds"),
+        "participants": [
+            {"nickname": p.get("nickname"), "score": p.get("score") or 0, "is_ready": p.get("is_ready", False)}
+            for p in participants
+        ],
+    }
+
+
+class RoomBroadcast:
+    """Per-room fan-out: one event subscription, one DB read and one encode per frame, N viewers."""
+
+    def __init__(self, room_id: str, supabase_client: Any, store: RoomStateStore):
+        self.room_id = room_id
+        self.supabase = supabase_client
+        self.store = store
+        self.viewers: Set[SpectatorConnection] = set()
+        self.latest_frame: Optional[str] = None
+        self.seq = 0
+        self._events: List[dict] = []
+        self._dirty = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._subscription = None
+
+    async def start(self) -> None:
+        self._subscription = await self.store.subscribe_room(self.room_id)
+        self._tasks = [asyncio.create_task(self._read_events()), asyncio.create_task(self._build_frames())]
+        self._events.append({"event": "snapshot"})
+        self._dirty.set()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self._subscription is not None:
+            await self._subscription.close()
+
+    async def _read_events(self) -> None:
+        async for message in self._subscription:
+            self._events.append({"event": message.get("event"), "data": message.get("data")})
+            self._dirty.set()
+
+    def _load_room(self) -> Optional[dict]:
+        response = self.supabase.table("game_rooms").select("*, room_participants(*)").eq("id", self.room_id).maybe_single().execute()
+        return response.data if response is not None else None
+
+    async def _build_frames(self) -> None:
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            events, self._events = self._events, []
+            try:
+                room = await asyncio.to_thread(self._load_room)
+            except Exception as e:
+                logger.warning("Spectator frame for room %s failed: %s", self.room_id, e)
+                room = None
+            if room is not None:
+                self.seq += 1
+                # Se codifica una sola vez; todos los viewers reciben el mismo str
+                self.latest_frame = dumps({
+                    "seq": self.seq, "ts": time.time(), "events": events, "room": spectator_room_view(room)
+                }).decode("utf-8")
+                SPECTATOR_FRAMES_ENCODED.inc()
+                for viewer in list(self.viewers):
+                    viewer.offer(self.latest_frame)
+            await asyncio.sleep(SPECTATOR_MIN_FRAME_INTERVAL)
+
+
+class SpectatorHub:
+    def __init__(self, store: RoomStateStore = room_state, max_per_room: int = SPECTATOR_MAX_PER_ROOM):
+        self.store = store
+        self.max_per_room = max_per_room
+        self._rooms: Dict[str, RoomBroadcast] = {}
+
+    def viewer_count(self, room_id) -> int:
+        broadcast = self._rooms.get(str(room_id))
+        return len(broadcast.viewers) if broadcast else 0
+
+    async def join(self, room_id, websocket, supabase_client) -> Optional[SpectatorConnection]:
+        key = str(room_id)
+        broadcast = self._rooms.get(key)
+        if broadcast is None:
+            broadcast = self._rooms[key] = RoomBroadcast(key, supabase_client, self.store)
+            await broadcast.start()
+        if len(broadcast.viewers) >= self.max_per_room:
+            return None
+        connection = SpectatorConnection(websocket)
+        broadcast.viewers.add(connection)
+        SPECTATORS_CONNECTED.inc()
+        if broadcast.latest_frame is not None:
+            connection.offer(broadcast.latest_frame)
+        return connection
+
+    async def leave(self, room_id, connection: SpectatorConnection) -> None:
+        key = str(room_id)
+        connection.close()
+        broadcast = self._rooms.get(key)
+        if broadcast is None or connection not in broadcast.viewers:
+            return
+        broadcast.viewers.discard(connection)
+        SPECTATORS_CONNECTED.dec()
+        if not broadcast.viewers:
+            del self._rooms[key]
+            await broadcast.stop()
+
+
+spectator_hub = SpectatorHub()
@@ -0,0 +1,4 @@
+-- Reglas de puntuación por sala (ver backend/scoring_rules.py).
+-- Las salas existentes quedan en NULL y usan el perfil por defecto ('split').
+ALTER TABLE public.game_rooms
+    ADD COLUMN IF NOT EXISTS scoring_rules jsonb;
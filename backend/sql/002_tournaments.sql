@@ -0,0 +1,43 @@
+-- Torneos: muchas salas en paralelo con un calendario de rondas compartido (ver backend/tournaments.py).
+CREATE TABLE IF NOT EXISTS public.tournaments (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    name text NOT NULL,
+    theme_id uuid NOT NULL REFERENCES public.themes(id),
+    host_user_id uuid NOT NULL,
+    status text NOT NULL DEFAULT 'registering', -- registering | round_in_progress | round_results | finished
+    current_stage integer NOT NULL DEFAULT 0,
+    current_round_number integer NOT NULL DEFAULT 0,
+    room_size integer NOT NULL DEFAULT 8,
+    advance_per_room integer NOT NULL DEFAULT 2,
+    round_seconds integer NOT NULL DEFAULT 90,
+    results_seconds integer NOT NULL DEFAULT 20,
+    auto_advance boolean NOT NULL DEFAULT true,
+    scoring_rules jsonb,
+    phase_started_at timestamptz,
+    winner_user_id uuid,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS public.tournament_entries (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    tournament_id uuid NOT NULL REFERENCES public.tournaments(id) ON DELETE CASCADE,
+    user_id uuid NOT NULL,
+    nickname text NOT NULL,
+    seed integer NOT NULL,
+    stage integer NOT NULL DEFAULT 0, -- Última fase que jugó
+    game_room_id uuid REFERENCES public.game_rooms(id) ON DELETE SET NULL,
+    stage_score integer NOT NULL DEFAULT 0,
+    carried_score integer NOT NULL DEFAULT 0, -- Puntos de fases ya cerradas
+    eliminated boolean NOT NULL DEFAULT false,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    UNIQUE (tournament_id, user_id)
+);
+
+-- Las salas de un torneo se leen y se actualizan en bloque por (torneo, fase)
+ALTER TABLE public.game_rooms
+    ADD COLUMN IF NOT EXISTS tournament_id uuid REFERENCES public.tournaments(id) ON DELETE SET NULL,
+    ADD COLUMN IF NOT EXISTS tournament_stage integer;
+
+CREATE INDEX IF NOT EXISTS game_rooms_tournament_stage_idx
+    ON public.game_rooms (tournament_id, tournament_stage)
+    WHERE tournament_id IS NOT NULL;
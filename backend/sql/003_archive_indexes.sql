@@ -0,0 +1,12 @@
+-- Archivado de partidas terminadas (ver backend/archive.py y backend/tools/archive_rooms.py).
+-- El job busca salas 'finished' por antigüedad: índice parcial, solo cubre las candidatas.
+CREATE INDEX IF NOT EXISTS game_rooms_finished_created_at_idx
+    ON public.game_rooms (created_at)
+    WHERE status = 'finished';
+
+-- Las consultas calientes filtran por sala y ronda; al sacar el histórico el índice queda pequeño.
+CREATE INDEX IF NOT EXISTS player_round_answers_room_round_idx
+    ON public.player_round_answers (game_room_id, round_number);
+
+CREATE INDEX IF NOT EXISTS room_participants_game_room_id_idx
+    ON public.room_participants (game_room_id);
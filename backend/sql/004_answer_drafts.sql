@@ -0,0 +1,12 @@
+-- Borradores de respuestas autoguardados (ver backend/drafts.py).
+-- Solo el último borrador por participante y ronda; se escribe en lotes con upsert.
+CREATE TABLE IF NOT EXISTS public.answer_drafts (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    room_participant_id uuid NOT NULL REFERENCES public.room_participants(id) ON DELETE CASCADE,
+    game_room_id uuid NOT NULL REFERENCES public.game_rooms(id) ON DELETE CASCADE,
+    round_number integer NOT NULL,
+    answers jsonb NOT NULL DEFAULT '{}'::jsonb,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    created_at timestamptz NOT NULL DEFAULT now(),
+    UNIQUE (room_participant_id, round_number)
+);
@@ -0,0 +1,13 @@
+-- Un seed por inscripción: dos inscripciones simultáneas no pueden tomar el mismo
+-- (ver join_tournament, que reintenta con el siguiente seed al chocar).
+-- Antes, renumerar los seeds repetidos que dejó el conteo previo, en orden de inscripción.
+UPDATE public.tournament_entries AS entry
+SET seed = ranked.new_seed
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY tournament_id ORDER BY seed, created_at) AS new_seed
+    FROM public.tournament_entries
+) AS ranked
+WHERE entry.id = ranked.id AND entry.seed <> ranked.new_seed;
+
+ALTER TABLE public.tournament_entries
+    ADD CONSTRAINT tournament_entries_tournament_id_seed_key UNIQUE (tournament_id, seed);
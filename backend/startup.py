@@ -0,0 +1,114 @@
+# backend/startup.py
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from .audit_log import audit_log
+from .auth_utils import get_jwt_secret
+from .catalog_cache import catalog_cache
+from .drafts import draft_buffer
+from .logging_config import shutdown_logging
+from .metrics import registry
+from .resilience import CircuitBreaker, resilience
+from .room_state import room_state
+from .supabase_client import init_supabase_client, supabase_init_error, supabase_ready
+from .tournaments import tournament_scheduler
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() not in ("0", "false", "no")
+
+BOOT_SECONDS = registry.gauge(
+    "basta_boot_seconds", "Worker boot time by phase (import, startup, warmup).", ("phase",)
+)
+
+
+class BootState:
+    """What /health/live and /health/ready report about this worker."""
+
+    def __init__(self):
+        self.process_started = time.monotonic()
+        self.accepting = False   # True tras el startup, False al empezar el shutdown
+        self.warmup_done = False
+        self.warmup_error: Optional[str] = None
+        self.phases: Dict[str, float] = {}
+
+    def record_phase(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = round(seconds, 4)
+        BOOT_SECONDS.set(seconds, phase)
+
+    def readiness(self) -> Dict[str, object]:
+        checks = {
+            "supabase": "ok" if supabase_ready() else (supabase_init_error() or "initializing"),
+            "auth": "ok" if get_jwt_secret() else "SUPABASE_JWT_SECRET is not set",
+            "accepting": "ok" if self.accepting else "not accepting traffic",
+        }
+        return {
+            "ready": all(value == "ok" for value in checks.values()),
+            "checks": checks,
+            # El warm-up no bloquea la readiness: sin él, el primer request carga el catálogo
+            "warmup": "done" if self.warmup_done else (self.warmup_error or "pending"),
+            # Informativo: con el circuito abierto los requests fallan rápido con 503, pero el worker sigue sano
+            "database_circuit": CircuitBreaker.state_name(resilience.breaker.state),
+            "boot_seconds": self.phases,
+        }
+
+
+boot_state = BootState()
+
+
+async def _warm_caches() -> None:
+    started = time.perf_counter()
+    try:
+        client = await asyncio.to_thread(init_supabase_client)
+        await asyncio.to_thread(catalog_cache.warm, client)
+        boot_state.warmup_done = True
+    except Exception as e:
+        boot_state.warmup_error = str(e)
+        logger.warning("Cache warm-up failed (caches will load on demand): %s", e)
+    boot_state.record_phase("warmup", time.perf_counter() - started)
+
+
+async def _init_supabase() -> None:
+    try:
+        await asyncio.to_thread(init_supabase_client)
+    except RuntimeError as e:
+        logger.error("Supabase client initialization failed: %s", e)
+
+
+async def _check_room_state() -> None:
+    try:
+        await room_state.get_room_state("__startup__")
+    except Exception as e:
+        logger.error("Room-state backend is not reachable: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    started = time.perf_counter()
+    # Los clientes se crean en paralelo y fuera del event loop; un fallo queda en /health/ready
+    await asyncio.gather(_init_supabase(), _check_room_state())
+    if not get_jwt_secret():
+        logger.error("SUPABASE_JWT_SECRET is not set; authenticated endpoints will return 503.")
+    boot_state.record_phase("startup", time.perf_counter() - started)
+
+    warmup_task = asyncio.create_task(_warm_caches()) if WARMUP_ENABLED else None
+    boot_state.accepting = True
+    logger.info("Worker ready in %.3fs (imports %.3fs).", boot_state.phases["startup"], boot_state.phases.get("import", 0.0))
+    try:
+        yield
+    finally:
+        boot_state.accepting = False
+        if warmup_task is not None and not warmup_task.done():
+            warmup_task.cancel()
+        # Los torneos retoman su calendario desde phase_started_at en el siguiente GET
+        await tournament_scheduler.stop()
+        await draft_buffer.stop()
+        # Escribir a disco los eventos de auditoría pendientes al apagar el worker
+        audit_log.flush_all()
+        await room_state.close()
+        resilience.shutdown()
+        shutdown_logging()
@@ -1,28 +1,77 @@
+import logging
 import os
-from supabase import create_client, Client
+import threading
+from typing import Optional
+
 from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from supabase import Client
+
+from .db import TrackedClient
+from .resilience import DB_READ_DEADLINE_SECONDS, DB_WRITE_DEADLINE_SECONDS
 
 # Cargar variables de entorno desde un archivo .env
 # Esto es útil para no tener que hardcodear las credenciales en el código.
 load_dotenv()
 
-SUPABASE_URL: str = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY: str = os.environ.get("SUPABASE_SERVICE_KEY") # Usaremos la service_role key en el backend
+logger = logging.getLogger(__name__)
+
+_client: Optional[TrackedClient] = None
+_init_error: Optional[str] = None
+_init_lock = threading.Lock()
+
+
+def init_supabase_client() -> TrackedClient:
+    """Creates the Supabase client once (thread-safe). Called from the app lifespan, or lazily on first use.
+
+    Un error de configuración se guarda en `supabase_init_error()` (lo reporta
+    /health/ready) en lugar de dejar el cliente en None sin explicación.
+    """
+    global _client, _init_error
+    with _init_lock:
+        if _client is not None:
+            return _client
+
+        supabase_url = os.environ.get("SUPABASE_URL")
+        supabase_key = os.environ.get("SUPABASE_SERVICE_KEY") # Usaremos la service_role key en el backend
+        if not supabase_url or not supabase_key:
+            _init_error = "SUPABASE_URL and SUPABASE_SERVICE_KEY must be set."
+            raise RuntimeError(_init_error)
+
+        try:
+            from supabase import ClientOptions, create_client
+            # Timeout de transporte: acota también los intentos que resilience abandona por plazo
+            options = ClientOptions(postgrest_client_timeout=max(DB_READ_DEADLINE_SECONDS, DB_WRITE_DEADLINE_SECONDS) or 120)
+            raw_client = create_client(supabase_url, supabase_key, options=options)
+            # Réplicas de lectura opcionales (p. ej. los endpoints de read replica de Supabase), separadas por coma
+            replica_urls = [u.strip() for u in os.environ.get("SUPABASE_READ_REPLICA_URLS", "").split(",") if u.strip()]
+            replica_key = os.environ.get("SUPABASE_READ_REPLICA_KEY") or supabase_key
+            replicas = [create_client(url, replica_key, options=ClientOptions(postgrest_client_timeout=DB_READ_DEADLINE_SECONDS or 120))
+                        for url in replica_urls]
+        except Exception as e:
+            _init_error = f"Could not create Supabase client: {e}"
+            raise RuntimeError(_init_error) from e
+
+        # Todas las consultas pasan por TrackedClient para medir round trips y latencia (ver backend/db.py)
+        _client = TrackedClient(raw_client, replicas=replicas)
+        _init_error = None
+        logger.info("Supabase client initialized (%s read replicas).", len(replicas))
+        return _client
+
+
+def supabase_ready() -> bool:
+    return _client is not None
+
 
-# Validar que las variables de entorno estén configuradas
-if not SUPABASE_URL:
-    raise ValueError("La variable de entorno SUPABASE_URL no está configurada.")
-if not SUPABASE_KEY:
-    raise ValueError("La variable de entorno SUPABASE_SERVICE_KEY no está configurada.")
+def supabase_init_error() -> Optional[str]:
+    return _init_error
 
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("Conexión con Supabase establecida exitosamente.")
-except Exception as e:
-    print(f"Error al conectar con Supabase: {e}")
-    supabase: Client = None # Asegurarse de que supabase sea None si falla la conexión
 
 def get_supabase_client() -> Client:
-    if supabase is None:
-        raise Exception("El cliente de Supabase no está inicializado. Revisa la conexión y las credenciales.")
-    return supabase
\ No newline at end of file
+    if _client is not None:
+        return _client
+    try:
+        return init_supabase_client()
+    except RuntimeError as e:
+        logger.error("Supabase client unavailable: %s", e)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database client is not available.")
@@ -0,0 +1,98 @@
+# backend/tests/conftest.py
+import os
+import time
+import uuid
+
+# La app lee estas variables al importarse: mismos valores locales que la prueba de carga
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-service-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test-jwt-secret")
+os.environ.setdefault("AUDIT_LOG_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from ..db import TrackedClient
+from ..loadtest.fake_supabase import FakeSupabaseClient
+from ..main import app
+from ..supabase_client import get_supabase_client
+
+CATEGORY_NAMES = ["Jugador", "Equipo", "Estadio"]
+
+
+@pytest.fixture
+def fake():
+    return FakeSupabaseClient()
+
+
+@pytest.fixture
+def catalog(fake):
+    theme, categories = fake.seed_theme("Tests", CATEGORY_NAMES)
+    return theme, categories
+
+
+@pytest.fixture
+def tracked(fake):
+    return TrackedClient(fake)
+
+
+@pytest.fixture
+def client(tracked):
+    app.dependency_overrides[get_supabase_client] = lambda: tracked
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_supabase_client, None)
+
+
+@pytest.fixture
+def make_player():
+    def make() -> dict:
+        user_id = str(uuid.uuid4())
+        token = jwt.encode(
+            {"sub": user_id, "email": f"player-{user_id[:8]}@tests.local", "aud": "authenticated", "exp": int(time.time()) + 3600},
+            os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256"
+        )
+        return {"Authorization": f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture
+def start_room(client, catalog, make_player):
+    """Factory for two-player rooms in round 1, created with the given room fields."""
+    theme, _ = catalog
+
+    def start(**room_fields):
+        host, guest = make_player(), make_player()
+        room = client.post("/api/v1/rooms/", json={"theme_id": theme["id"], **room_fields}, headers=host).json()
+        client.post(f"/api/v1/rooms/{room['room_code']}/join/", json={}, headers=guest)
+        for headers in (host, guest):
+            client.patch(f"/api/v1/rooms/{room['id']}/participants/me/ready", json={"is_ready": True}, headers=headers)
+        room = client.post(f"/api/v1/rooms/{room['id']}/start", headers=host).json()
+        return room, host, guest
+
+    return start
+
+
+@pytest.fixture
+def started_room(start_room):
+    """A two-player room in round 1: (room, host headers, guest headers)."""
+    return start_room()
+
+
+@pytest.fixture
+def results_room(client, started_room, catalog, tracked):
+    """Room in round_over_results after both players submitted: (room, host, guest, answer text by player)."""
+    room, host, guest = started_room
+    _, categories = catalog
+    letter = room["current_letter"]
+    texts = {"host": f"{letter}ala", "guest": "Zzz" if letter != "Z" else "Aaa"}
+    for headers, text in ((host, texts["host"]), (guest, texts["guest"])):
+        response = client.post(f"/api/v1/rooms/{room['id']}/rounds/basta", json={"answers": {categories[0]["id"]: text}}, headers=headers)
+        assert response.status_code == 200
+    status = tracked.table("game_rooms").select("status").eq("id", room["id"]).single().execute().data["status"]
+    assert status == "round_over_results"
+    return room, host, guest, texts
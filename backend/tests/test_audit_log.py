@@ -0,0 +1,18 @@
+# backend/tests/test_audit_log.py
+import os
+import time
+
+from .. import audit_log as audit_log_module
+from ..audit_log import AuditLog, read_events
+
+
+def test_idle_rooms_are_flushed_and_forgotten(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_log_module, "_IDLE_SWEEP_INTERVAL_SECONDS", 0.0)
+    log = AuditLog(directory=str(tmp_path), enabled=True, idle_seconds=0.05)
+    log.record("abandoned", "room_created")
+    time.sleep(0.1)
+    log.record("active", "room_created")
+
+    assert [(e["seq"], e["event"]) for e in read_events(log.path_for("abandoned"))] == [(1, "room_created")]
+    assert not os.path.exists(log.path_for("active")) # Sigue en memoria hasta su próximo flush
+    assert log._sequence == {"active": 1}
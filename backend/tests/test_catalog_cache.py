@@ -0,0 +1,18 @@
+# backend/tests/test_catalog_cache.py
+from ..catalog_cache import CatalogCache
+
+
+def test_invalidate_during_a_read_returns_the_snapshot(tracked, catalog, monkeypatch):
+    theme, categories = catalog
+    cache = CatalogCache()
+    cache.warm(tracked)
+    fresh = cache._fresh
+
+    def invalidated_while_checking():
+        result = fresh()
+        cache.invalidate() # Otro hilo invalida justo después de la comprobación
+        return result
+
+    monkeypatch.setattr(cache, "_fresh", invalidated_while_checking)
+    assert [t["id"] for t in cache.themes(tracked)] == [theme["id"]]
+    assert [c["id"] for c in cache.categories_for_theme(tracked, theme["id"])] == [c["id"] for c in categories]
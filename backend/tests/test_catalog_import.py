@@ -0,0 +1,50 @@
+# backend/tests/test_catalog_import.py
+import asyncio
+import json
+
+from postgrest.exceptions import APIError
+
+from ..catalog_import import FORMAT_CSV, CatalogImporter
+from ..loadtest.fake_supabase import FakeQuery
+
+
+async def _lines(text: str):
+    for number, line in enumerate(text.split("\n"), start=1):
+        yield number, line
+
+
+def test_jsonl_upload_creates_themes_and_categories(client, tracked, make_player):
+    upload = "\n".join(json.dumps(row) for row in [
+        {"theme": "Liga MX", "category": "Jugador"},
+        {"theme": "liga mx", "category": "Estadio"},
+        {"theme": "Cine"},
+        {"theme": "Cine", "category": "X"},
+    ])
+    response = client.post("/api/v1/catalog/import", content=upload.encode(), headers={**make_player(), "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["rows_read"], result["themes_created"], result["categories_created"]) == (4, 2, 2)
+    assert [error["line"] for error in result["errors"]] == [4] # Nombre de categoría demasiado corto
+    names = {c["name"] for c in tracked.table("categories").select("name").execute().data}
+    assert names == {"Jugador", "Estadio"}
+
+
+def test_csv_quoted_newlines_and_a_failing_batch(tracked, monkeypatch):
+    insert = FakeQuery._execute_insert
+    batches = []
+
+    def second_category_batch_fails(query):
+        if query._table == "categories":
+            batches.append(len(query._payload))
+            if len(batches) == 2:
+                raise APIError({"code": "57014", "message": "canceling statement due to statement timeout", "details": None, "hint": None})
+        return insert(query)
+
+    monkeypatch.setattr(FakeQuery, "_execute_insert", second_category_batch_fails)
+    upload = 'theme,category,order\nFutbol,"Jugador, delantero",0\nFutbol,"Estadio\nprincipal",1\nFutbol,Equipo,2\nFutbol,Entrenador,3\n'
+    result = asyncio.run(CatalogImporter(tracked, batch_size=2).run(_lines(upload), FORMAT_CSV))
+
+    assert result.rows_read == 4 and result.rows_invalid == 0
+    assert [(b.first_line, b.last_line, b.inserted, b.error is not None) for b in result.batches] == [(2, 3, 3, False), (5, 6, 0, True)]
+    names = [c["name"] for c in tracked.table("categories").select("name").order("order").execute().data]
+    assert names == ["Jugador, delantero", "Estadio\nprincipal"]
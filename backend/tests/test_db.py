@@ -0,0 +1,36 @@
+# backend/tests/test_db.py
+from ..db import RequestQueryCache, TrackedClient, _request_cache
+from ..loadtest.fake_supabase import FakeSupabaseClient
+
+
+def test_maybe_single_miss_returns_none_inside_a_request(tracked, catalog):
+    token = _request_cache.set(RequestQueryCache())
+    try:
+        response = tracked.table("game_rooms").select("*").eq("id", "00000000-0000-0000-0000-000000000000").maybe_single().execute()
+        assert response is None
+        # La ausencia no se cachea: una fila insertada después en el mismo request se ve
+        theme, _ = catalog
+        room = tracked.table("game_rooms").insert({"room_code": "ABC123", "theme_id": theme["id"], "host_user_id": theme["id"], "max_players": 4}).execute().data[0]
+        found = tracked.table("game_rooms").select("*").eq("id", room["id"]).maybe_single().execute()
+        assert found.data["room_code"] == "ABC123"
+    finally:
+        _request_cache.reset(token)
+
+
+def test_maybe_single_miss_returns_none_outside_a_request(tracked):
+    assert tracked.table("tournaments").select("*").eq("id", "00000000-0000-0000-0000-000000000000").maybe_single().execute() is None
+
+
+def test_readonly_rpc_does_not_pin_reads_to_the_primary(fake):
+    replica = FakeSupabaseClient()
+    replica.seed_theme("Replica", [])
+    fake.seed_theme("Primary", [])
+    fake.rpc_handlers["bump_scores"] = lambda client: []
+    tracked = TrackedClient(fake, replicas=[replica])
+
+    tracked.rpc("get_distinct_submitters_for_round", {"p_room_id": "00000000-0000-0000-0000-000000000000", "p_round_number": 1}).execute()
+    assert [t["name"] for t in tracked.table("themes").select("name").execute().data] == ["Replica"]
+
+    # Cualquier otra RPC puede escribir: las lecturas siguientes van al primario
+    tracked.rpc("bump_scores").execute()
+    assert [t["name"] for t in tracked.table("themes").select("name").execute().data] == ["Primary"]
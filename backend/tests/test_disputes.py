@@ -0,0 +1,71 @@
+# backend/tests/test_disputes.py
+import asyncio
+import uuid
+
+from ..disputes import DisputeBoard
+from ..room_state import InMemoryRoomStateBackend
+
+
+def _answer_id(tracked, text):
+    return tracked.table("player_round_answers").select("id").eq("answer_text", text).execute().data[0]["id"]
+
+
+def test_non_participant_gets_403(client, results_room, tracked, make_player):
+    room, _, _, texts = results_room
+    response = client.post(f"/api/v1/rooms/{room['id']}/rounds/1/disputes", json={"answer_id": _answer_id(tracked, texts["guest"])}, headers=make_player())
+    assert response.status_code == 403
+
+
+def test_unknown_room_gets_404(client, make_player):
+    response = client.post(f"/api/v1/rooms/{uuid.uuid4()}/rounds/1/disputes", json={"answer_id": str(uuid.uuid4())}, headers=make_player())
+    assert response.status_code == 404
+
+
+def test_unknown_answer_gets_404(client, results_room):
+    room, host, _, _ = results_room
+    response = client.post(f"/api/v1/rooms/{room['id']}/rounds/1/disputes", json={"answer_id": str(uuid.uuid4())}, headers=host)
+    assert response.status_code == 404
+
+
+def test_vote_on_undisputed_answer_gets_404(client, results_room):
+    room, _, guest, _ = results_room
+    response = client.put(f"/api/v1/rooms/{room['id']}/rounds/1/disputes/{uuid.uuid4()}/vote", json={"valid": True}, headers=guest)
+    assert response.status_code == 404
+
+
+def test_overturned_answer_is_rescored_on_next_round(client, results_room, tracked):
+    room, host, guest, texts = results_room
+    answer_id = _answer_id(tracked, texts["guest"])
+    opened = client.post(f"/api/v1/rooms/{room['id']}/rounds/1/disputes", json={"answer_id": answer_id}, headers=host)
+    assert opened.status_code == 201
+    assert opened.json()["valid_votes"] == 1
+    voted = client.put(f"/api/v1/rooms/{room['id']}/rounds/1/disputes/{answer_id}/vote", json={"valid": True}, headers=guest)
+    assert voted.json()["overturned"] is True
+
+    next_round = client.post(f"/api/v1/rooms/{room['id']}/next-round", headers=host)
+    assert next_round.status_code == 200
+    row = tracked.table("player_round_answers").select("is_valid, score_awarded").eq("id", answer_id).single().execute().data
+    assert row["is_valid"] is True and row["score_awarded"] > 0
+
+
+def test_workers_sharing_a_backend_count_the_same_votes():
+    backend = InMemoryRoomStateBackend()
+    worker_a, worker_b = DisputeBoard(backend), DisputeBoard(backend)
+    answer = {"id": "a1", "room_participant_id": "p1", "category_id": "c1", "answer_text": "Mala", "is_valid": True}
+
+    async def scenario():
+        await worker_a.open("r1", 1, answer, "p2")
+        await worker_b.vote("r1", 1, "a1", "p3", False)
+        await worker_b.vote("r1", 1, "a1", "p1", True)
+        await worker_b.vote("r1", 1, "a1", "p1", False) # Cambiar el voto no lo cuenta dos veces
+        seen = (await worker_a.get("r1", 1, "a1")).summary("p3")
+        rooms = await worker_a.open_rooms()
+        taken = await worker_b.take("r1", 1)
+        return seen, rooms, taken, await worker_a.disputes("r1", 1), await worker_a.open_rooms(), await backend.get_fields(worker_a._open_rounds_key)
+
+    seen, rooms, taken, left, rooms_after, open_rounds = asyncio.run(scenario())
+    assert (seen["valid_votes"], seen["invalid_votes"], seen["my_vote"], seen["overturned"]) == (0, 3, False, True)
+    assert rooms == {"r1"}
+    assert [dispute.outcome() for dispute in taken] == [False]
+    assert left == [] and rooms_after == set()
+    assert open_rounds == {} # La ronda cerrada se borra del índice, no queda marcada como False
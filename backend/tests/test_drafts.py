@@ -0,0 +1,55 @@
+# backend/tests/test_drafts.py
+import asyncio
+import uuid
+
+from ..db import TrackedClient
+from ..drafts import DraftBuffer
+from ..loadtest.fake_supabase import FakeSupabaseClient
+
+
+def test_get_without_saved_draft_returns_none(tracked):
+    assert DraftBuffer().get(tracked, "00000000-0000-0000-0000-000000000000", 1) is None
+
+
+def test_get_draft_endpoint_returns_404_without_draft(client, started_room):
+    room, _, guest = started_room
+    response = client.get(f"/api/v1/rooms/{room['id']}/rounds/1/draft", headers=guest)
+    assert response.status_code == 404
+
+
+def test_saved_draft_is_returned(client, started_room, catalog):
+    room, _, guest = started_room
+    _, categories = catalog
+    answers = {categories[0]["id"]: "Messi"}
+    assert client.put(f"/api/v1/rooms/{room['id']}/rounds/1/draft", json={"answers": answers}, headers=guest).status_code == 202
+    response = client.get(f"/api/v1/rooms/{room['id']}/rounds/1/draft", headers=guest)
+    assert response.status_code == 200
+    assert response.json()["answers"] == answers
+
+
+def test_resume_mid_round_without_answers_or_draft(client, started_room):
+    room, host, _ = started_room
+    response = client.get(f"/api/v1/rooms/{room['id']}/resume", headers=host)
+    assert response.status_code == 200
+    assert response.json()["my_answers"] == {"round_number": 1, "source": "none", "answers": {}}
+
+
+def test_submitted_draft_is_deleted_even_if_a_flush_was_in_flight():
+    fake = FakeSupabaseClient(latency_ms=100)
+    tracked = TrackedClient(fake)
+    buffer = DraftBuffer(interval=3600)
+    room_id, participant_id = str(uuid.uuid4()), str(uuid.uuid4())
+
+    async def scenario():
+        buffer.save(tracked, room_id, participant_id, 1, {"c1": "Messi"})
+        flushing = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.05) # El upsert ya está en curso
+        buffer.discard(tracked, participant_id, 1)
+        await flushing
+        buffer.save(tracked, room_id, participant_id, 1, {"c1": "Messi 2"}) # Guardado tardío tras enviar
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert fake.rows("answer_drafts") == []
+    assert buffer.pending_count() == 0
+    assert buffer.get(tracked, participant_id, 1) is None
@@ -0,0 +1,43 @@
+# backend/tests/test_idempotency.py
+import pytest
+from fastapi.testclient import TestClient
+
+from ..idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+def _app_answering(status_code: int):
+    calls = []
+
+    async def app(scope, receive, send):
+        await receive()
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": status_code, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"n": %d}' % len(calls)})
+
+    return app, calls
+
+
+def _post_twice(status_code: int):
+    app, calls = _app_answering(status_code)
+    client = TestClient(IdempotencyMiddleware(app, store=IdempotencyStore()))
+    headers = {"Idempotency-Key": "retry-1", "Authorization": "Bearer a"}
+    first = client.post("/api/v1/rooms/x/submit", content=b"{}", headers=headers)
+    second = client.post("/api/v1/rooms/x/submit", content=b"{}", headers=headers)
+    return first, second, calls
+
+
+@pytest.mark.parametrize("status_code", [200, 201, 400, 404, 422])
+def test_deterministic_responses_are_replayed(status_code):
+    first, second, calls = _post_twice(status_code)
+    assert len(calls) == 1
+    assert second.status_code == first.status_code == status_code
+    assert second.headers["idempotent-replayed"] == "true"
+    assert second.json() == {"n": 1}
+
+
+@pytest.mark.parametrize("status_code", [409, 429, 500, 503])
+def test_conflicts_throttling_and_server_errors_run_again(status_code):
+    first, second, calls = _post_twice(status_code)
+    assert len(calls) == 2
+    assert "idempotent-replayed" not in second.headers
+    assert second.json() == {"n": 2}
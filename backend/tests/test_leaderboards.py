@@ -0,0 +1,53 @@
+# backend/tests/test_leaderboards.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from ..leaderboards import GLOBAL_SCOPE, WINDOW_DAILY, Leaderboards, RoundScoreEntry
+from ..room_state import InMemoryRoomStateBackend
+
+
+def test_workers_sharing_a_backend_serve_the_same_standings():
+    backend = InMemoryRoomStateBackend()
+    worker_a, worker_b = Leaderboards(backend), Leaderboards(backend)
+
+    async def scenario():
+        await worker_a.record_round("t1", [RoundScoreEntry("u1", "Ana", 100), RoundScoreEntry("u2", "Beto", 50)])
+        await worker_b.record_round("t1", [RoundScoreEntry("u2", "Beto", 75), RoundScoreEntry("u3", "Caro", 0)])
+        return (
+            await worker_b.top(GLOBAL_SCOPE),
+            await worker_a.rank_of("theme:t1", "u1"),
+            await worker_a.rank_of(GLOBAL_SCOPE, "u3"),
+            await worker_b.size(GLOBAL_SCOPE),
+        )
+
+    top, ana, caro, size = asyncio.run(scenario())
+    assert top == [
+        {"rank": 1, "user_id": "u2", "nickname": "Beto", "score": 125},
+        {"rank": 2, "user_id": "u1", "nickname": "Ana", "score": 100},
+    ]
+    assert ana == {"rank": 2, "user_id": "u1", "nickname": "Ana", "score": 100}
+    assert caro is None # Sin puntos no entra al ranking
+    assert size == 2
+
+
+def test_daily_window_starts_empty_each_day():
+    boards = Leaderboards(InMemoryRoomStateBackend())
+    today = datetime(2026, 3, 2, 12, tzinfo=timezone.utc)
+
+    async def scenario():
+        await boards.record_round(None, [RoundScoreEntry("u1", "Ana", 30)], at=today - timedelta(days=1))
+        await boards.record_round(None, [RoundScoreEntry("u1", "Ana", 10)], at=today)
+        return await boards.top(GLOBAL_SCOPE, WINDOW_DAILY, at=today), await boards.top(GLOBAL_SCOPE, at=today)
+
+    daily, all_time = asyncio.run(scenario())
+    assert [entry["score"] for entry in daily] == [10]
+    assert [entry["score"] for entry in all_time] == [40]
+
+
+def test_scored_round_shows_up_in_the_theme_leaderboard(client, results_room, catalog):
+    theme, _ = catalog
+    response = client.get("/api/v1/leaderboards/", params={"theme_id": theme["id"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_players"] >= 1
+    assert body["entries"][0]["score"] > 0
@@ -0,0 +1,56 @@
+# backend/tests/test_player_stats.py
+import asyncio
+
+from ..player_stats import PlayerRoundSummary, PlayerStatsStore
+from ..room_state import InMemoryRoomStateBackend
+
+
+def test_workers_sharing_a_backend_add_to_the_same_stats():
+    backend = InMemoryRoomStateBackend()
+    worker_a, worker_b = PlayerStatsStore(backend), PlayerStatsStore(backend)
+
+    async def scenario():
+        await worker_a.record_round([PlayerRoundSummary("u1", "Ana", 30, 3, 2, 1, ["c1", "c2"])])
+        await worker_b.record_round([PlayerRoundSummary("u1", "Ana", 10, 3, 1, 0, ["c1"])])
+        await worker_b.record_game_finished([{"user_id": "u1", "nickname": "Ana", "score": 40}, {"user_id": "u2", "score": 10}])
+        return await worker_a.get("u1"), await worker_a.get("u2"), await worker_a.get("u3")
+
+    ana, other, unknown = asyncio.run(scenario())
+    assert (ana.games_played, ana.wins, ana.rounds_played, ana.total_round_score) == (1, 1, 2, 40)
+    assert (ana.answers_submitted, ana.valid_answers, ana.unique_answers) == (6, 3, 1)
+    assert ana.favorite_categories() == [{"category_id": "c1", "valid_answers": 2}, {"category_id": "c2", "valid_answers": 1}]
+    assert ana.updated_at is not None
+    assert (other.games_played, other.wins) == (1, 0)
+    assert unknown is None
+
+
+def test_finishing_a_room_counts_the_game(client, start_room, catalog):
+    room, host, guest = start_room(max_rounds=1)
+    _, categories = catalog
+    letter = room["current_letter"]
+    for headers, text in ((host, f"{letter}ala"), (guest, "Zzz" if letter != "Z" else "Aaa")):
+        assert client.post(f"/api/v1/rooms/{room['id']}/rounds/basta", json={"answers": {categories[0]["id"]: text}}, headers=headers).status_code == 200
+    finished = client.post(f"/api/v1/rooms/{room['id']}/next-round", headers=host)
+    assert finished.status_code == 200
+    assert finished.json()["status"] == "finished"
+
+    host_stats = client.get("/api/v1/players/me/stats", headers=host).json()
+    guest_stats = client.get("/api/v1/players/me/stats", headers=guest).json()
+    assert (host_stats["games_played"], host_stats["wins"], host_stats["rounds_played"]) == (1, 1, 1)
+    assert (guest_stats["games_played"], guest_stats["wins"]) == (1, 0)
+
+
+def test_finishing_a_tournament_stage_counts_the_game(client, catalog, make_player):
+    theme, _ = catalog
+    organizer, players = make_player(), [make_player(), make_player()]
+    tournament = client.post("/api/v1/tournaments/", json={
+        "name": "Copa de prueba", "theme_id": theme["id"], "room_size": 2, "advance_per_room": 1,
+        "max_rounds": 1, "auto_advance": False,
+    }, headers=organizer).json()
+    for headers in players:
+        assert client.post(f"/api/v1/tournaments/{tournament['id']}/join", json={}, headers=headers).status_code == 200
+    for _ in range(3): # start, close_round, finish_stage
+        assert client.post(f"/api/v1/tournaments/{tournament['id']}/advance", headers=organizer).status_code == 200
+
+    games = [client.get("/api/v1/players/me/stats", headers=headers).json()["games_played"] for headers in players]
+    assert games == [1, 1]
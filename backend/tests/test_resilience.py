@@ -0,0 +1,74 @@
+# backend/tests/test_resilience.py
+import asyncio
+import threading
+
+import pytest
+
+from ..loadtest.fake_supabase import FakeQuery
+from ..resilience import CircuitBreaker, ResiliencePolicy
+
+
+def _flaky(failures: int):
+    calls = []
+
+    def run():
+        calls.append(threading.current_thread().name)
+        if len(calls) <= failures:
+            raise ConnectionError("connection reset")
+        return "ok"
+
+    return run, calls
+
+
+def _policy(**kwargs) -> ResiliencePolicy:
+    return ResiliencePolicy(read_retries=2, hedge_after=0.0, breaker=CircuitBreaker(failure_threshold=100), **kwargs)
+
+
+def test_reads_off_the_event_loop_are_retried():
+    run, calls = _flaky(failures=1)
+    assert _policy().execute("game_rooms", "select", True, run) == "ok"
+    assert len(calls) == 2
+
+
+def test_reads_from_a_handler_are_retried(client, started_room, monkeypatch):
+    room, host, _ = started_room
+    failed = []
+    select = FakeQuery._execute_select
+
+    def flaky_select(query):
+        if query._table == "game_rooms" and not failed:
+            failed.append(query._table)
+            raise ConnectionError("connection reset")
+        return select(query)
+
+    monkeypatch.setattr(FakeQuery, "_execute_select", flaky_select)
+    response = client.get(f"/api/v1/rooms/{room['id']}/", headers=host)
+    assert response.status_code == 200
+    assert failed == ["game_rooms"]
+
+
+def test_reads_sent_to_a_thread_from_the_loop_keep_retries():
+    run, calls = _flaky(failures=1)
+
+    async def handler():
+        return await asyncio.to_thread(_policy().execute, "game_rooms", "select", True, run)
+
+    assert asyncio.run(handler()) == "ok"
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("deadline", [0.0, 1.0])
+def test_interrupted_half_open_trial_frees_the_slot(deadline):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+    policy = ResiliencePolicy(read_deadline=deadline, read_retries=0, breaker=breaker)
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        policy.execute("game_rooms", "select", True, interrupted)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert policy.execute("game_rooms", "select", True, lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+    policy.shutdown()
@@ -0,0 +1,58 @@
+# backend/tests/test_resume.py
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from ..resume import ResumeSnapshotCache
+
+
+def test_resume_unknown_room_returns_404(client, make_player):
+    response = client.get(f"/api/v1/rooms/{uuid.uuid4()}/resume", headers=make_player())
+    assert response.status_code == 404
+
+
+def test_resume_non_participant_returns_403(client, started_room, make_player):
+    room, _, _ = started_room
+    assert client.get(f"/api/v1/rooms/{room['id']}/resume", headers=make_player()).status_code == 403
+
+
+def test_resume_deadline_is_timezone_aware(client, catalog, make_player):
+    theme, _ = catalog
+    host, guest = make_player(), make_player()
+    room = client.post("/api/v1/rooms/", json={"theme_id": theme["id"], "round_time_limit_seconds": 60}, headers=host).json()
+    client.post(f"/api/v1/rooms/{room['room_code']}/join/", json={}, headers=guest)
+    for headers in (host, guest):
+        client.patch(f"/api/v1/rooms/{room['id']}/participants/me/ready", json={"is_ready": True}, headers=headers)
+    client.post(f"/api/v1/rooms/{room['id']}/start", headers=host)
+
+    bundle = client.get(f"/api/v1/rooms/{room['id']}/resume", headers=guest).json()
+    started_at = datetime.fromisoformat(bundle["round_started_at"])
+    deadline = datetime.fromisoformat(bundle["round_deadline"])
+    server_time = datetime.fromisoformat(bundle["server_time"])
+    assert started_at.utcoffset() == timedelta(0)
+    assert deadline - started_at == timedelta(seconds=60)
+    assert abs(server_time - started_at) < timedelta(seconds=30)
+
+
+def test_new_version_does_not_share_an_older_inflight_load(monkeypatch):
+    cache = ResumeSnapshotCache()
+    loads = []
+
+    def slow_load(supabase_client, room_id):
+        loads.append(room_id)
+        time.sleep(0.05)
+        return {"room": {"id": room_id, "load": len(loads)}, "round_answers": None}
+
+    monkeypatch.setattr(cache, "_load", slow_load)
+
+    async def scenario():
+        return await asyncio.gather(
+            cache.snapshot(None, "r1", ("in_progress", 1, "t1")),
+            cache.snapshot(None, "r1", ("in_progress", 1, "t1")),
+            cache.snapshot(None, "r1", ("round_over_results", 1, "t1")),
+        )
+
+    first, shared, newer = asyncio.run(scenario())
+    assert len(loads) == 2
+    assert shared is first and newer is not first
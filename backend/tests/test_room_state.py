@@ -0,0 +1,21 @@
+# backend/tests/test_room_state.py
+import pytest
+
+from ..room_state import InMemoryRoomStateBackend, RoomStateBackend, RoomSubscription
+
+
+def test_backends_must_implement_every_primitive():
+    class NoLock(RoomStateBackend):
+        async def get(self, key): return None
+        async def set(self, key, value, ttl_seconds=None): pass
+        async def delete(self, key): pass
+        async def publish(self, channel, message): pass
+        async def subscribe(self, channel): return None
+
+    with pytest.raises(TypeError):
+        RoomStateBackend()
+    with pytest.raises(TypeError):
+        NoLock()
+    with pytest.raises(TypeError):
+        RoomSubscription()
+    InMemoryRoomStateBackend()
@@ -0,0 +1,34 @@
+# backend/tests/test_round_time_limit.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from ..room_state import room_state
+
+
+def _submit(client, room, headers, category_id, text):
+    return client.post(f"/api/v1/rooms/{room['id']}/rounds/basta", json={"answers": {category_id: text}}, headers=headers)
+
+
+def test_submission_within_the_limit_is_recorded(client, start_room, catalog, tracked):
+    room, host, _ = start_room(round_time_limit_seconds=60)
+    _, categories = catalog
+    response = _submit(client, room, host, categories[0]["id"], f"{room['current_letter']}ala")
+    assert response.status_code == 200
+    caller = tracked.table("game_rooms").select("current_round_basta_caller_id").eq("id", room["id"]).single().execute().data
+    assert caller["current_round_basta_caller_id"] is not None
+    assert len(tracked.table("player_round_answers").select("id").eq("game_room_id", room["id"]).execute().data) == 1
+
+
+def test_late_submission_is_dropped_and_closes_the_round(client, start_room, catalog, tracked):
+    room, host, guest = start_room(round_time_limit_seconds=15)
+    _, categories = catalog
+    assert _submit(client, room, host, categories[0]["id"], f"{room['current_letter']}ala").status_code == 200
+    started_long_ago = (datetime.now(timezone.utc) - timedelta(seconds=60)).isoformat()
+    asyncio.run(room_state.update_room_state(room["id"], round_started_at=started_long_ago))
+
+    response = _submit(client, room, guest, categories[0]["id"], "Zzz")
+    assert response.status_code == 200
+    assert response.json()["message"].startswith("Round time is over")
+    assert response.json()["room_state_after_your_action"]["status"] == "round_over_results"
+    rows = tracked.table("player_round_answers").select("answer_text").eq("game_room_id", room["id"]).execute().data
+    assert [row["answer_text"] for row in rows] == [f"{room['current_letter']}ala"]
@@ -0,0 +1,44 @@
+# backend/tests/test_submit_answers.py
+from postgrest.exceptions import APIError
+
+from ..loadtest.fake_supabase import FakeQuery
+from ..routers import rooms_router
+
+
+def _record_audit(monkeypatch):
+    events = []
+    monkeypatch.setattr(rooms_router.audit_log, "record", lambda room_id, event, **data: events.append(event))
+    return events
+
+
+def test_failed_insert_keeps_the_draft_and_is_not_audited(client, started_room, catalog, monkeypatch):
+    room, host, _ = started_room
+    _, categories = catalog
+    answers = {categories[0]["id"]: f"{room['current_letter']}ala"}
+    assert client.put(f"/api/v1/rooms/{room['id']}/rounds/1/draft", json={"answers": answers}, headers=host).status_code == 202
+
+    insert = FakeQuery._execute_insert
+
+    def failing_insert(query):
+        if query._table == "player_round_answers":
+            raise APIError({"code": "23503", "message": "insert violates foreign key constraint", "details": None, "hint": None})
+        return insert(query)
+
+    monkeypatch.setattr(FakeQuery, "_execute_insert", failing_insert)
+    events = _record_audit(monkeypatch)
+    response = client.post(f"/api/v1/rooms/{room['id']}/rounds/basta", json={"answers": answers}, headers=host)
+    assert response.status_code == 500
+    assert "answers_submitted" not in events
+    assert client.get(f"/api/v1/rooms/{room['id']}/rounds/1/draft", headers=host).json()["answers"] == answers
+
+
+def test_stored_answers_replace_the_draft_and_are_audited(client, started_room, catalog, monkeypatch):
+    room, host, _ = started_room
+    _, categories = catalog
+    answers = {categories[0]["id"]: f"{room['current_letter']}ala"}
+    assert client.put(f"/api/v1/rooms/{room['id']}/rounds/1/draft", json={"answers": answers}, headers=host).status_code == 202
+
+    events = _record_audit(monkeypatch)
+    assert client.post(f"/api/v1/rooms/{room['id']}/rounds/basta", json={"answers": answers}, headers=host).status_code == 200
+    assert events.count("answers_submitted") == 1
+    assert client.get(f"/api/v1/rooms/{room['id']}/rounds/1/draft", headers=host).status_code == 404
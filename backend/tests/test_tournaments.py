@@ -0,0 +1,95 @@
+# backend/tests/test_tournaments.py
+import asyncio
+import uuid
+
+import pytest
+
+from .. import tournaments
+from ..db import RequestQueryCache, _request_cache
+from ..loadtest.fake_supabase import FakeQuery
+from ..tournaments import TournamentOrchestrator, tournament_scheduler
+
+
+def test_load_unknown_tournament_inside_a_request(tracked):
+    token = _request_cache.set(RequestQueryCache())
+    try:
+        assert TournamentOrchestrator(tracked).load(uuid.uuid4()) is None
+    finally:
+        _request_cache.reset(token)
+
+
+def test_unknown_tournament_is_404(client, make_player):
+    tournament_id = uuid.uuid4()
+    assert client.get(f"/api/v1/tournaments/{tournament_id}").status_code == 404
+    headers = make_player()
+    for action in ("join", "start", "advance"):
+        kwargs = {"json": {}} if action == "join" else {}
+        assert client.post(f"/api/v1/tournaments/{tournament_id}/{action}", headers=headers, **kwargs).status_code == 404
+
+
+@pytest.mark.parametrize("host_closes_round", [False, True])
+def test_scheduler_runs_the_stage_with_fresh_reads(host_closes_round, client, tracked, catalog, make_player, monkeypatch):
+    theme, _ = catalog
+    organizer = make_player()
+    tournament = client.post("/api/v1/tournaments/", json={
+        "name": "Copa automática", "theme_id": theme["id"], "room_size": 2, "advance_per_room": 1,
+        "max_rounds": 1, "auto_advance": True,
+    }, headers=organizer).json()
+    for headers in (make_player(), make_player()):
+        assert client.post(f"/api/v1/tournaments/{tournament['id']}/join", json={}, headers=headers).status_code == 200
+    # Calendario corto para la prueba (la API exige al menos 15 s y 5 s)
+    tracked.table("tournaments").update({"round_seconds": 1, "results_seconds": 0}).eq("id", tournament["id"]).execute()
+
+    steps = []
+    for step in ("close_round", "finish_stage"):
+        original = getattr(TournamentOrchestrator, step)
+
+        async def counted(self, tournament, *args, _step=step, _original=original):
+            steps.append(_step)
+            return await _original(self, tournament, *args)
+
+        monkeypatch.setattr(TournamentOrchestrator, step, counted)
+
+    async def scenario():
+        # POST /advance arranca el torneo y el scheduler dentro de un request
+        token = _request_cache.set(RequestQueryCache())
+        try:
+            started = await TournamentOrchestrator(tracked).advance(tournament["id"])
+            tournament_scheduler.ensure_scheduled(started, tracked)
+            task = tournament_scheduler._tasks[str(tournament["id"])]
+        finally:
+            _request_cache.reset(token)
+        if host_closes_round:
+            await asyncio.sleep(0.2) # El scheduler ya leyó la ronda en curso y espera su fin
+            # El host cierra la ronda a mano en otro request; el scheduler debe ver ese cambio y no repetir el paso
+            token = _request_cache.set(RequestQueryCache())
+            try:
+                await TournamentOrchestrator(tracked).advance(tournament["id"])
+            finally:
+                _request_cache.reset(token)
+        await asyncio.wait_for(task, timeout=10)
+
+    asyncio.run(scenario())
+    assert steps == ["close_round", "finish_stage"]
+    assert TournamentOrchestrator(tracked).load(tournament["id"])["status"] == tournaments.FINISHED
+
+
+def test_concurrent_joins_get_distinct_seeds(client, tracked, catalog, make_player, monkeypatch):
+    theme, _ = catalog
+    tournament = client.post("/api/v1/tournaments/", json={"name": "Copa de seeds", "theme_id": theme["id"], "room_size": 2, "advance_per_room": 1}, headers=make_player()).json()
+    insert = FakeQuery._execute_insert
+    raced = []
+
+    def racing_insert(query):
+        # Otra inscripción toma el mismo seed entre la lectura y el insert de este request
+        if query._table == "tournament_entries" and not raced:
+            raced.append(True)
+            insert(FakeQuery(query._client, "tournament_entries").insert({**query._payload, "user_id": str(uuid.uuid4()), "nickname": "rival"}))
+        return insert(query)
+
+    monkeypatch.setattr(FakeQuery, "_execute_insert", racing_insert)
+    headers = make_player()
+    assert client.post(f"/api/v1/tournaments/{tournament['id']}/join", json={}, headers=headers).status_code == 200
+    assert client.post(f"/api/v1/tournaments/{tournament['id']}/join", json={}, headers=headers).status_code == 409
+    seeds = [entry["seed"] for entry in TournamentOrchestrator(tracked).entries(tournament["id"])]
+    assert sorted(seeds) == [1, 2]
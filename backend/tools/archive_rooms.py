@@ -0,0 +1,49 @@
+# backend/tools/archive_rooms.py
+"""Moves finished rooms out of the hot tables into archive segments, or shows an archived game.
+
+Uso:
+    python -m backend.tools.archive_rooms run [--older-than-days 30] [--batch-rooms 200] [--max-batches N] [--dry-run]
+    python -m backend.tools.archive_rooms show <room_id>
+
+Los segmentos quedan en ARCHIVE_DIR (uno por lote, agrupados por mes de creación
+de las salas) con un índice room_id -> segmento en ARCHIVE_DIR/index.jsonl.gz.
+"""
+import argparse
+import json
+import sys
+
+from ..archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_ROOMS, ARCHIVE_DIR, ArchiveReader, RoomArchiver
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="Archive directory (default: ARCHIVE_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Archive finished rooms older than the threshold")
+    run.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    run.add_argument("--batch-rooms", type=int, default=ARCHIVE_BATCH_ROOMS)
+    run.add_argument("--max-batches", type=int, default=None)
+    run.add_argument("--dry-run", action="store_true", help="Only count what would be archived")
+
+    show = commands.add_parser("show", help="Print an archived game")
+    show.add_argument("room_id")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        game = ArchiveReader(args.dir).load_game(args.room_id)
+        if game is None:
+            print(f"Room {args.room_id} is not in the archive at {args.dir}", file=sys.stderr)
+            return 2
+        print(json.dumps(game, indent=2, ensure_ascii=False, default=str))
+        return 0
+
+    from ..supabase_client import init_supabase_client # Solo `run` necesita credenciales
+    archiver = RoomArchiver(init_supabase_client(), directory=args.dir, batch_rooms=args.batch_rooms, dry_run=args.dry_run)
+    summary = archiver.run(older_than_days=args.older_than_days, max_batches=args.max_batches)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# backend/tools/replay_room.py
+"""Re-runs the scoring of a room from its audit log and compares it with what was stored.
+
+Uso:
+    python -m backend.tools.replay_room <room_id | ruta/al/log.jsonl.gz> [--dir audit_logs] [--round N] [--profile classic]
+
+Si la sala ya fue archivada (backend/tools/archive_rooms.py) y su log no está en
+el directorio de auditoría, los eventos se leen del segmento de archivo.
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+
+from ..archive import ArchiveReader
+from ..audit_log import find_room_log, read_events
+from ..scoring_rules import build_scoring_rules, compile_scoring_rules, rules_from_room, score_round_answers
+
+
+def replay_round(event: dict, profile_override: str = None) -> dict:
+    data = event["data"]
+    if profile_override:
+        rules = build_scoring_rules(profile_override)
+    else:
+        rules = rules_from_room(data.get("scoring_rules"))
+    processed_answers, totals = score_round_answers(data["answers"], data["letter"], compile_scoring_rules(rules), data.get("validity_overrides"))
+
+    logged_results = {str(r["answer_db_id"]): r for r in data.get("results", [])}
+    mismatches = []
+    for answer in processed_answers:
+        logged = logged_results.get(str(answer["answer_db_id"]))
+        replayed = {"score": answer["score"], "is_valid": answer["is_valid"], "notes": answer["notes"]}
+        if logged is None or any(logged[key] != value for key, value in replayed.items()):
+            mismatches.append({"answer_db_id": answer["answer_db_id"], "logged": logged, "replayed": replayed})
+
+    logged_totals = Counter({str(k): v for k, v in data.get("totals", {}).items()})
+    return {
+        "round_number": data["round_number"],
+        "letter": data["letter"],
+        "profile": rules.profile,
+        "answers": len(processed_answers),
+        "mismatches": mismatches,
+        "totals_match": logged_totals == totals,
+        "totals": dict(totals),
+    }
+
+
+def submissions_by_round(events: list) -> dict:
+    """round_number -> {participant_id: answers} tal como los enviaron los clientes."""
+    submissions = {}
+    for event in events:
+        if event["event"] == "answers_submitted":
+            data = event["data"]
+            submissions.setdefault(data["round_number"], {})[str(data["participant_id"])] = data["answers"]
+    return submissions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("room", help="Room ID or path to a .jsonl.gz audit log")
+    parser.add_argument("--dir", default=None, help="Audit log directory (default: AUDIT_LOG_DIR)")
+    parser.add_argument("--round", type=int, default=None, help="Only replay this round")
+    parser.add_argument("--profile", default=None, help="Re-score with another scoring profile instead of the logged rules")
+    parser.add_argument("--archive-dir", default=None, help="Archive directory to fall back to (default: ARCHIVE_DIR)")
+    args = parser.parse_args(argv)
+
+    path = args.room if os.path.exists(args.room) else find_room_log(args.room, args.dir)
+    if os.path.exists(path):
+        events = list(read_events(path))
+    else:
+        archived = ArchiveReader(args.archive_dir) if args.archive_dir else ArchiveReader()
+        game = archived.load_game(args.room)
+        if game is None or not game["events"]:
+            print(f"Audit log not found: {path}", file=sys.stderr)
+            return 2
+        path = f"archive:{archived.segment_for(args.room)}"
+        events = game["events"]
+    submissions = submissions_by_round(events)
+    print(f"{path}: {len(events)} events")
+    for event in events:
+        if event["event"] in ("round_started", "basta_called", "game_finished"):
+            print(f"  #{event['seq']} {event['ts']} {event['event']} {event['data']}")
+
+    exit_code = 0
+    for event in events:
+        if event["event"] not in ("round_scored", "round_rescored"):
+            continue
+        if args.round is not None and event["data"]["round_number"] != args.round:
+            continue
+
+        result = replay_round(event, args.profile)
+        submitted = submissions.get(result["round_number"], {})
+        print(
+            f"Round {result['round_number']}{' re-scored after disputes' if event['event'] == 'round_rescored' else ''} "
+            f"(letter {result['letter']}, profile {result['profile']}): "
+            f"{result['answers']} answers from {len(submitted)} logged submissions, totals {result['totals']}"
+        )
+        if args.profile:
+            continue # Con otro perfil las diferencias son esperadas: solo se muestran los totales
+        if result["mismatches"] or not result["totals_match"]:
+            exit_code = 1
+            print(f"  MISMATCH: totals_match={result['totals_match']}")
+            for mismatch in result["mismatches"]:
+                print(f"    answer {mismatch['answer_db_id']}: logged={mismatch['logged']} replayed={mismatch['replayed']}")
+        else:
+            print("  OK: replay matches the logged scoring")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
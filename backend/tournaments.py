@@ -0,0 +1,429 @@
+# backend/tournaments.py
+import asyncio
+import contextvars
+import logging
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+from .audit_log import audit_log
+from .disputes import close_round_disputes, dispute_board
+from .metrics import registry
+from .room_state import room_state
+from .scoring_rules import rules_from_room
+from .utils import calculate_round_scores, generate_room_code, record_game_finished
+
+logger = logging.getLogger(__name__)
+
+REGISTERING = "registering"
+ROUND_IN_PROGRESS = "round_in_progress"
+ROUND_RESULTS = "round_results"
+FINISHED = "finished"
+
+ROUND_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ACTIVE_ROUND_STATUSES = ["in_progress", "basta_countdown"]
+ROOM_CODE_ATTEMPTS = 3
+# Un paso puede puntuar decenas de salas: el lock del torneo dura más que el de una sala
+TOURNAMENT_LOCK_TTL_SECONDS = 120.0
+SCHEDULER_RETRY_SECONDS = 2.0
+
+TOURNAMENT_STEPS = registry.histogram(
+    "basta_tournament_step_seconds", "Duration of a tournament schedule step across all of its rooms.", ("step",),
+    (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+TOURNAMENT_ROOMS = registry.counter(
+    "basta_tournament_rooms_total", "Rooms touched by tournament steps (created, started, scored, finished).", ("step",)
+)
+
+ROOM_COLUMNS = "id, room_code, status, current_round_number, current_letter, theme_id, scoring_rules, room_participants(id, user_id, nickname, score)"
+
+
+class TournamentStateError(ValueError):
+    """The requested step does not apply to the tournament's current status."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def snake_seed(entries: List[dict], room_count: int) -> List[List[dict]]:
+    """Distributes seeded entries 1..N across rooms in snake order (1-2-3-3-2-1...) so rooms are balanced."""
+    rooms: List[List[dict]] = [[] for _ in range(room_count)]
+    for position, entry in enumerate(entries):
+        lap, offset = divmod(position, room_count)
+        rooms[offset if lap % 2 == 0 else room_count - 1 - offset].append(entry)
+    return rooms
+
+
+def next_step_at(tournament: dict) -> Optional[datetime]:
+    """When the shared schedule runs the next step; None if it waits for the host or is over."""
+    started = _parse_ts(tournament.get("phase_started_at"))
+    if not tournament.get("auto_advance") or started is None:
+        return None
+    if tournament["status"] == ROUND_IN_PROGRESS:
+        return started + timedelta(seconds=tournament["round_seconds"])
+    if tournament["status"] == ROUND_RESULTS:
+        return started + timedelta(seconds=tournament["results_seconds"])
+    return None
+
+
+def rank_entries(entries: List[dict]) -> List[dict]:
+    """Standings order: players still in first, then furthest stage, total score, stage score and seed."""
+    return sorted(entries, key=lambda e: (
+        bool(e.get("eliminated")), -(e.get("stage") or 0), -((e.get("carried_score") or 0) + (e.get("stage_score") or 0)),
+        -(e.get("stage_score") or 0), e.get("seed") or 0
+    ))
+
+
+class TournamentOrchestrator:
+    """Runs tournament steps over all rooms of the current stage with batched queries.
+
+    Cada paso toca todas las salas de la fase con un número fijo de consultas
+    (un insert de salas, un insert de participantes, un update condicional por
+    transición de estado, un upsert de posiciones), sin importar cuántas salas
+    haya. Solo la puntuación de una ronda sigue siendo por sala, y únicamente
+    para las salas que no cerraron solas con el último BASTA.
+    """
+
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+
+    # --- Lecturas ---
+    def load(self, tournament_id) -> Optional[dict]:
+        response = self.supabase.table("tournaments").select("*").eq("id", str(tournament_id)).maybe_single().execute()
+        return response.data if response is not None else None
+
+    def entries(self, tournament_id) -> List[dict]:
+        return self.supabase.table("tournament_entries").select("*").eq("tournament_id", str(tournament_id)).execute().data or []
+
+    def stage_rooms(self, tournament: dict, columns: str = ROOM_COLUMNS) -> List[dict]:
+        return self.supabase.table("game_rooms").select(columns) \
+            .eq("tournament_id", str(tournament["id"])) \
+            .eq("tournament_stage", tournament["current_stage"]) \
+            .execute().data or []
+
+    def _update_tournament(self, tournament: dict, **fields) -> dict:
+        response = self.supabase.table("tournaments").update(fields).eq("id", str(tournament["id"])).execute()
+        return response.data[0] if response.data else {**tournament, **fields}
+
+    # --- Pasos ---
+    async def advance(self, tournament_id, expected: Optional[Tuple[str, int, int]] = None) -> dict:
+        """Runs the next step of the schedule; `expected` (status, stage, round) skips it if someone got there first."""
+        async with room_state.room_lock(f"tournament-{tournament_id}", ttl_seconds=TOURNAMENT_LOCK_TTL_SECONDS):
+            tournament = await asyncio.to_thread(self.load, tournament_id)
+            if tournament is None:
+                raise LookupError(str(tournament_id))
+            if expected is not None and (tournament["status"], tournament["current_stage"], tournament["current_round_number"]) != expected:
+                return tournament
+
+            status = tournament["status"]
+            max_rounds = rules_from_room(tournament.get("scoring_rules")).max_rounds
+            if status == REGISTERING:
+                step = "start"
+            elif status == ROUND_IN_PROGRESS:
+                step = "close_round"
+            elif status == ROUND_RESULTS:
+                step = "next_round" if tournament["current_round_number"] < max_rounds else "finish_stage"
+            else:
+                raise TournamentStateError("Tournament is already finished.")
+
+            started = time.perf_counter()
+            if step == "start":
+                tournament = await self.start(tournament)
+            elif step == "close_round":
+                tournament = await self.close_round(tournament)
+            elif step == "next_round":
+                if await self.close_disputes(tournament):
+                    await asyncio.to_thread(self.refresh_standings, tournament)
+                rooms = await asyncio.to_thread(self.stage_rooms, tournament, "id")
+                tournament = await self.start_round(tournament, rooms, tournament["current_round_number"] + 1)
+            else:
+                await self.close_disputes(tournament) # finish_stage vuelve a leer los puntajes
+                tournament = await self.finish_stage(tournament)
+            TOURNAMENT_STEPS.observe(time.perf_counter() - started, step)
+            logger.info("Tournament %s step '%s' done: status=%s stage=%s round=%s", tournament["id"], step, tournament["status"], tournament["current_stage"], tournament["current_round_number"])
+            return tournament
+
+    async def start(self, tournament: dict) -> dict:
+        entries = sorted(await asyncio.to_thread(self.entries, tournament["id"]), key=lambda e: e["seed"])
+        if len(entries) < 2:
+            raise TournamentStateError("At least 2 registered players are required to start the tournament.")
+        rooms = await self.create_stage(tournament, 1, entries)
+        tournament = {**tournament, "current_stage": 1}
+        return await self.start_round(tournament, rooms, 1)
+
+    async def create_stage(self, tournament: dict, stage: int, entries: List[dict]) -> List[dict]:
+        """Creates every room of a stage with one insert for rooms and one for participants."""
+        groups = snake_seed(entries, math.ceil(len(entries) / tournament["room_size"]))
+        host_user_id = str(tournament["host_user_id"])
+
+        created_rooms = None
+        for attempt in range(ROOM_CODE_ATTEMPTS):
+            room_payloads = [{
+                "room_code": generate_room_code(),
+                "theme_id": str(tournament["theme_id"]),
+                "host_user_id": host_user_id, # Las salas las maneja el torneo, no un jugador
+                "max_players": max(tournament["room_size"], len(group)),
+                "scoring_rules": tournament.get("scoring_rules"),
+                "status": "waiting",
+                "tournament_id": str(tournament["id"]),
+                "tournament_stage": stage,
+            } for group in groups]
+            try:
+                created_rooms = (await asyncio.to_thread(self.supabase.table("game_rooms").insert(room_payloads).execute)).data
+                break
+            except APIError as e:
+                if e.code != "23505" or attempt == ROOM_CODE_ATTEMPTS - 1:
+                    raise
+                logger.warning("Room code collision creating stage %s of tournament %s; retrying with new codes.", stage, tournament["id"])
+
+        participant_payloads = [
+            {"game_room_id": str(room["id"]), "user_id": str(entry["user_id"]), "nickname": entry["nickname"], "is_ready": True}
+            for room, group in zip(created_rooms, groups) for entry in group
+        ]
+        participants = (await asyncio.to_thread(self.supabase.table("room_participants").insert(participant_payloads).execute)).data or []
+
+        room_by_user = {str(p["user_id"]): str(p["game_room_id"]) for p in participants}
+        await asyncio.to_thread(self.supabase.table("tournament_entries").upsert([
+            {**entry, "stage": stage, "game_room_id": room_by_user.get(str(entry["user_id"])), "stage_score": 0}
+            for entry in entries
+        ], on_conflict="id").execute)
+
+        participants_by_room: Dict[str, List[dict]] = {}
+        for participant in participants:
+            participants_by_room.setdefault(str(participant["game_room_id"]), []).append(participant)
+        for room in created_rooms:
+            room["room_participants"] = participants_by_room.get(str(room["id"]), [])
+            audit_log.record(room["id"], "room_created", room_code=room["room_code"], host_user_id=host_user_id, theme_id=room["theme_id"],
+                             scoring_rules=room.get("scoring_rules"), tournament_id=tournament["id"], tournament_stage=stage)
+        await asyncio.gather(*(
+            room_state.set_room_state(room["id"], {"status": "waiting", "room_code": room["room_code"], "host_user_id": host_user_id, "tournament_id": str(tournament["id"])})
+            for room in created_rooms
+        ))
+        TOURNAMENT_ROOMS.inc("create", amount=len(created_rooms))
+        return created_rooms
+
+    async def start_round(self, tournament: dict, rooms: List[dict], round_number: int) -> dict:
+        """Starts the same round, with the same letter, in every room of the stage with one update."""
+        letter = random.choice(ROUND_ALPHABET)
+        started_at = _now().isoformat()
+        previous_status = "waiting" if round_number == 1 else "round_over_results"
+        started = (await asyncio.to_thread(self.supabase.table("game_rooms").update({
+            "status": "in_progress",
+            "current_letter": letter,
+            "current_round_number": round_number,
+            "current_round_basta_caller_id": None,
+            "current_round_basta_called_at": None,
+        }).eq("tournament_id", str(tournament["id"])) \
+            .eq("tournament_stage", tournament["current_stage"]) \
+            .eq("status", previous_status) \
+            .execute)).data or []
+        if len(started) != len(rooms):
+            logger.warning("Tournament %s round %s started in %s of %s rooms.", tournament["id"], round_number, len(started), len(rooms))
+
+        for room in started:
+            audit_log.record(room["id"], "round_started", round_number=round_number, letter=letter, started_by=f"tournament:{tournament['id']}")
+        await asyncio.gather(*(self._room_round_started(room["id"], round_number, letter, started_at) for room in started))
+        TOURNAMENT_ROOMS.inc("start_round", amount=len(started))
+        return await asyncio.to_thread(
+            self._update_tournament, tournament, status=ROUND_IN_PROGRESS, current_stage=tournament["current_stage"],
+            current_round_number=round_number, phase_started_at=started_at
+        )
+
+    @staticmethod
+    async def _room_round_started(room_id, round_number: int, letter: str, started_at: str) -> None:
+        await room_state.update_room_state(room_id, status="in_progress", current_round_number=round_number, current_letter=letter, round_started_at=started_at)
+        await room_state.publish_room_event(room_id, "round_started", round_number=round_number, letter=letter)
+
+    async def close_round(self, tournament: dict) -> dict:
+        """Ends the round everywhere: rooms still playing are claimed with one conditional update and scored."""
+        round_number = tournament["current_round_number"]
+        # Mismo update condicional que player_says_basta: si el último BASTA de una sala llega a la vez, solo uno puntúa
+        claimed = (await asyncio.to_thread(self.supabase.table("game_rooms").update({"status": "scoring"}) \
+            .eq("tournament_id", str(tournament["id"])) \
+            .eq("tournament_stage", tournament["current_stage"]) \
+            .in_("status", ACTIVE_ROUND_STATUSES) \
+            .execute)).data or []
+
+        for room in claimed:
+            try:
+                await calculate_round_scores(
+                    room_id=room["id"], round_number=round_number, supabase_client=self.supabase,
+                    current_letter=room["current_letter"], theme_id=room.get("theme_id"), scoring_rules=room.get("scoring_rules")
+                )
+            except Exception as e:
+                # Una sala con error no bloquea el torneo: queda con los puntos que tenía
+                logger.error("Scoring room %s for tournament %s R%s failed: %s", room["id"], tournament["id"], round_number, e, exc_info=True)
+                await asyncio.to_thread(self.supabase.table("game_rooms").update({"status": "round_over_results"}).eq("id", str(room["id"])).execute)
+        await asyncio.gather(*(self._room_round_scored(room["id"], round_number) for room in claimed))
+        TOURNAMENT_ROOMS.inc("score", amount=len(claimed))
+
+        await asyncio.to_thread(self.refresh_standings, tournament)
+        return await asyncio.to_thread(self._update_tournament, tournament, status=ROUND_RESULTS, phase_started_at=_now().isoformat())
+
+    async def close_disputes(self, tournament: dict) -> bool:
+        """Applies the dispute votes of the stage's rooms as the results phase ends; True if any score changed."""
+        open_rooms = await dispute_board.open_rooms()
+        if not open_rooms:
+            return False # Sin disputas abiertas no hace falta leer las salas
+        changed = False
+        for room in await asyncio.to_thread(self.stage_rooms, tournament, "id, current_letter, theme_id, scoring_rules"):
+            if str(room["id"]) not in open_rooms:
+                continue
+            try:
+                changed |= await close_round_disputes(self.supabase, room, tournament["current_round_number"]) is not None
+            except Exception as e:
+                logger.error("Closing disputes of room %s for tournament %s failed: %s", room["id"], tournament["id"], e, exc_info=True)
+        return changed
+
+    @staticmethod
+    async def _room_round_scored(room_id, round_number: int) -> None:
+        await room_state.update_room_state(room_id, status="round_over_results")
+        await room_state.publish_room_event(room_id, "round_scored", round_number=round_number)
+
+    def refresh_standings(self, tournament: dict, rooms: Optional[List[dict]] = None) -> List[dict]:
+        """Copies every stage room's scores into tournament_entries: one read and one upsert for all rooms."""
+        rooms = rooms if rooms is not None else self.stage_rooms(tournament)
+        scores = {
+            str(p["user_id"]): p.get("score") or 0
+            for room in rooms for p in room.get("room_participants") or []
+        }
+        entries = self.entries(tournament["id"])
+        changed = []
+        for entry in entries:
+            if entry["stage"] == tournament["current_stage"] and str(entry["user_id"]) in scores:
+                score = scores[str(entry["user_id"])]
+                if score != entry.get("stage_score"):
+                    entry["stage_score"] = score
+                    changed.append(entry)
+        if changed:
+            self.supabase.table("tournament_entries").upsert(changed, on_conflict="id").execute()
+        return rank_entries(entries)
+
+    async def finish_stage(self, tournament: dict) -> dict:
+        """Closes every room of the stage and promotes the top `advance_per_room` of each to the next bracket."""
+        rooms = await asyncio.to_thread(self.stage_rooms, tournament)
+        entries = await asyncio.to_thread(self.refresh_standings, tournament, rooms)
+        finished = (await asyncio.to_thread(self.supabase.table("game_rooms").update({"status": "finished"}) \
+            .eq("tournament_id", str(tournament["id"])) \
+            .eq("tournament_stage", tournament["current_stage"]) \
+            .execute)).data or []
+        for room in rooms:
+            await record_game_finished(room["id"], tournament["current_round_number"], room.get("room_participants") or [])
+        await asyncio.gather(*(self._room_finished(room["id"], tournament["current_round_number"]) for room in finished))
+        TOURNAMENT_ROOMS.inc("finish", amount=len(finished))
+
+        stage_entries = [e for e in entries if e["stage"] == tournament["current_stage"] and not e.get("eliminated")]
+        by_room: Dict[str, List[dict]] = {}
+        for entry in stage_entries:
+            by_room.setdefault(str(entry.get("game_room_id")), []).append(entry)
+        advancing = []
+        for room_entries in by_room.values():
+            room_entries.sort(key=lambda e: (-(e.get("stage_score") or 0), e["seed"]))
+            advancing.extend(room_entries[:tournament["advance_per_room"]])
+        if len(by_room) > 1 and len(advancing) >= len(stage_entries):
+            # Salas casi vacías: sin este recorte la fase siguiente tendría los mismos jugadores
+            advancing = rank_entries(advancing)[:max(1, len(stage_entries) // 2)]
+        final_stage = len(by_room) <= 1
+        if final_stage:
+            advancing = rank_entries(stage_entries)[:1]
+
+        advancing_ids = {str(e["id"]) for e in advancing}
+        updated_entries = [
+            {**entry, "carried_score": (entry.get("carried_score") or 0) + (entry.get("stage_score") or 0),
+             "stage_score": 0, "eliminated": str(entry["id"]) not in advancing_ids}
+            for entry in stage_entries
+        ]
+        if updated_entries:
+            await asyncio.to_thread(self.supabase.table("tournament_entries").upsert(updated_entries, on_conflict="id").execute)
+
+        if final_stage:
+            winner = advancing[0] if advancing else None
+            logger.info("Tournament %s finished. Winner: %s", tournament["id"], winner and winner["user_id"])
+            return await asyncio.to_thread(
+                self._update_tournament, tournament, status=FINISHED, phase_started_at=_now().isoformat(),
+                winner_user_id=str(winner["user_id"]) if winner else None
+            )
+
+        # Siembra de la fase siguiente según el rendimiento en esta (mejor puntaje = seed más alto)
+        next_entries = [e for e in rank_entries(updated_entries) if str(e["id"]) in advancing_ids]
+        next_stage = tournament["current_stage"] + 1
+        rooms = await self.create_stage(tournament, next_stage, next_entries)
+        tournament = {**tournament, "current_stage": next_stage}
+        return await self.start_round(tournament, rooms, 1)
+
+    @staticmethod
+    async def _room_finished(room_id, rounds_played: int) -> None:
+        await room_state.update_room_state(room_id, status="finished")
+        await room_state.publish_room_event(room_id, "game_finished", rounds_played=rounds_played)
+
+
+class TournamentScheduler:
+    """Drives `auto_advance` tournaments on their shared schedule, one task per tournament.
+
+    El momento de cada paso sale de `phase_started_at` en la base, así que un
+    avance manual del host o un reinicio del proceso no desincronizan el
+    calendario; `advance(expected=...)` evita ejecutar dos veces el mismo paso.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def is_running(self, tournament_id) -> bool:
+        task = self._tasks.get(str(tournament_id))
+        return task is not None and not task.done()
+
+    def ensure_scheduled(self, tournament: dict, supabase_client) -> None:
+        key = str(tournament["id"])
+        if not tournament.get("auto_advance") or tournament["status"] in (REGISTERING, FINISHED) or self.is_running(key):
+            return
+        # Contexto vacío: la tarea vive más que el request que la arranca y no debe heredar
+        # su caché de consultas (_request_cache) ni su contexto de logging
+        self._tasks[key] = asyncio.create_task(self._run(key, supabase_client), context=contextvars.Context())
+
+    async def _run(self, tournament_id: str, supabase_client) -> None:
+        orchestrator = TournamentOrchestrator(supabase_client)
+        try:
+            while True:
+                tournament = await asyncio.to_thread(orchestrator.load, tournament_id)
+                due = next_step_at(tournament) if tournament else None
+                if due is None:
+                    return
+                delay = (due - _now()).total_seconds()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                expected = (tournament["status"], tournament["current_stage"], tournament["current_round_number"])
+                try:
+                    await orchestrator.advance(tournament_id, expected=expected)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("Scheduled step for tournament %s failed: %s", tournament_id, e, exc_info=True)
+                    await asyncio.sleep(SCHEDULER_RETRY_SECONDS)
+        finally:
+            if self._tasks.get(tournament_id) is asyncio.current_task():
+                del self._tasks[tournament_id]
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+tournament_scheduler = TournamentScheduler()
@@ -1,11 +1,18 @@
 from postgrest.exceptions import APIError
+import asyncio
 import random
 import string
 from collections import Counter
+from typing import Optional
 from uuid import UUID
 from supabase import Client
 import logging
 
+from .audit_log import audit_log
+from .leaderboards import RoundScoreEntry, leaderboards
+from .player_stats import PlayerRoundSummary, player_stats
+from .scoring_rules import compile_scoring_rules, rules_from_room, score_round_answers
+
 logger = logging.getLogger(__name__)
 
 def generate_room_code(length: int = 6) -> str:
@@ -15,110 +22,136 @@ def generate_room_code(length: int = 6) -> str:
     return "".join(random.choice(characters) for _ in range(length))
 
 
-async def calculate_round_scores(room_id: UUID, round_number: int, supabase_client: Client, current_letter: str):
+async def record_round_aggregates(theme_id: Optional[UUID], processed_answers: list, round_scores: Counter, participant_rows: dict):
+    """Feeds a scored round into the leaderboards and the per-user statistics."""
+    summaries = {}
+    for p_id_str, row in participant_rows.items():
+        summaries[p_id_str] = PlayerRoundSummary(
+            user_id=str(row["user_id"]),
+            nickname=row.get("nickname") or "",
+            round_score=round_scores.get(p_id_str, 0),
+            answers_submitted=0, valid_answers=0, unique_answers=0
+        )
+
+    for ans_detail in processed_answers:
+        summary = summaries.get(ans_detail["participant_id"])
+        if summary is None:
+            continue
+        summary.answers_submitted += 1
+        if ans_detail["is_valid"]:
+            summary.valid_answers += 1
+            summary.category_ids.append(ans_detail["category_id"])
+        if ans_detail["is_unique"]:
+            summary.unique_answers += 1
+
+    await leaderboards.record_round(
+        str(theme_id) if theme_id else None,
+        [RoundScoreEntry(user_id=s.user_id, nickname=s.nickname, round_score=s.round_score) for s in summaries.values()]
+    )
+    await player_stats.record_round(summaries.values())
+
+
+async def record_game_finished(room_id: str, rounds_played: int, participants: list) -> None:
+    """Audit entry and per-user statistics for a finished game; every path that finishes a room goes through here."""
+    audit_log.record(room_id, "game_finished", rounds_played=rounds_played, final_scores={
+        str(p["id"]): p.get("score", 0) for p in participants
+    })
+    try:
+        await player_stats.record_game_finished(participants)
+    except Exception as e:
+        logger.error("Failed to record finished game stats for room %s: %s", room_id, e, exc_info=True)
+
+
+async def calculate_round_scores(room_id: UUID, round_number: int, supabase_client: Client, current_letter: str, theme_id: Optional[UUID] = None, scoring_rules: Optional[dict] = None):
     room_id_str = str(room_id)
-    logger.info(f"Calculating scores for room {room_id_str}, round {round_number}, letter '{current_letter}'.")
+    logger.info("Calculating scores for room %s, round %s, letter '%s'.", room_id_str, round_number, current_letter)
 
     try:
-        answers_resp = supabase_client.table("player_round_answers") \
-            .select("id, room_participant_id, category_id, answer_text") \
+        answers_resp = await asyncio.to_thread(supabase_client.table("player_round_answers") \
+            .select("id, game_room_id, room_participant_id, round_number, category_id, answer_text") \
             .eq("game_room_id", room_id_str) \
             .eq("round_number", round_number) \
-            .execute()
+            .execute)
 
         if not answers_resp.data:
-            logger.warning(f"No answers for room {room_id_str}, R{round_number}. Marking round_over_results.")
-            supabase_client.table("game_rooms").update({"status": "round_over_results"}).eq("id", room_id_str).execute()
-            return
-
-        all_answers_for_round = answers_resp.data
-        processed_answers = []
-        answers_grouped_by_category = {}
-
-        for ans_row in all_answers_for_round:
-            text_original = ans_row["answer_text"] or ""
-            detail = {
-                "answer_db_id": ans_row["id"],
-                "participant_id": str(ans_row["room_participant_id"]),
-                "category_id": str(ans_row["category_id"]),
-                "text_original": text_original,
-                "text_normalized": text_original.strip().lower(),
-                "score": 0, "is_valid": False, "notes": ""
-            }
-            processed_answers.append(detail)
-
-            if not detail["text_normalized"]:
-                detail["notes"] = "Vacía"
-            elif not detail["text_normalized"].startswith(current_letter.lower()):
-                detail["notes"] = "Letra incorrecta"
-            else:
-                detail["is_valid"] = True
-                cat_answers = answers_grouped_by_category.setdefault(detail["category_id"], {})
-                cat_answers.setdefault(detail["text_normalized"], []).append(detail["participant_id"])
-        
-        player_total_round_scores = Counter()
-
-        for ans_detail in processed_answers:
-            if ans_detail["is_valid"]:
-                cat_id = ans_detail["category_id"]
-                norm_text = ans_detail["text_normalized"]
-                repetition_count = len(answers_grouped_by_category.get(cat_id, {}).get(norm_text, []))
-                
-                if repetition_count == 1:
-                    ans_detail["score"] = 100
-                    ans_detail["notes"] = "Única (100 pts)"
-                elif repetition_count > 1:
-                    points_per_player = int(100 / repetition_count)
-                    ans_detail["score"] = points_per_player
-                    ans_detail["notes"] = f"Repetida ({repetition_count} veces, {points_per_player} pts c/u)"
-                else:
-                    ans_detail["notes"] = "Error en conteo" 
-            player_total_round_scores[ans_detail["participant_id"]] += ans_detail["score"]
+            logger.warning("No answers for room %s, R%s. Marking round_over_results.", room_id_str, round_number)
+            status_resp = await asyncio.to_thread(supabase_client.table("game_rooms").update({"status": "round_over_results"}).eq("id", room_id_str).execute)
+            audit_log.record(room_id_str, "round_scored", round_number=round_number, letter=current_letter, answers=[], results=[], totals={})
+            return status_resp.data[0] if status_resp.data else None
+
+        rules = rules_from_room(scoring_rules)
+        scorer = compile_scoring_rules(rules)
+        processed_answers, player_total_round_scores = score_round_answers(answers_resp.data, current_letter, scorer)
         
         if processed_answers:
-            logger.info(f"Updating scores for {len(processed_answers)} individual answers in player_round_answers.")
-            for ans_detail in processed_answers:
-                supabase_client.table("player_round_answers") \
-                    .update({
-                        "score_awarded": ans_detail["score"],
-                        "is_valid": ans_detail["is_valid"],
-                        "validation_notes": ans_detail["notes"]
-                    }) \
-                    .eq("id", ans_detail["answer_db_id"]) \
-                    .execute()
+            # Un solo upsert para todas las respuestas (antes era un UPDATE por respuesta)
+            logger.info("Updating scores for %s individual answers in player_round_answers.", len(processed_answers))
+            answer_rows_by_id = {str(row["id"]): row for row in answers_resp.data}
+            await asyncio.to_thread(supabase_client.table("player_round_answers").upsert([
+                {
+                    **answer_rows_by_id[str(ans_detail["answer_db_id"])],
+                    "score_awarded": ans_detail["score"],
+                    "is_valid": ans_detail["is_valid"],
+                    "validation_notes": ans_detail["notes"]
+                }
+                for ans_detail in processed_answers
+            ], on_conflict="id").execute)
 
+        participant_rows = {} # participant_id -> {user_id, nickname} para leaderboards y estadísticas
         if player_total_round_scores:
-            logger.info(f"Updating total scores for {len(player_total_round_scores)} participants.")
+            logger.info("Updating total scores for %s participants.", len(player_total_round_scores))
+            # Leer los scores actuales de todos los participantes en una sola consulta `in_`
+            participant_rows = await asyncio.to_thread(
+                supabase_client.load_many, "room_participants", player_total_round_scores.keys(), "id, game_room_id, user_id, nickname, score"
+            )
+
+            score_updates = []
             for p_id_str, round_score_for_player in player_total_round_scores.items():
-                # Leer el score actual del participante específico para sumarle el de la ronda
-                current_participant_score_resp = supabase_client.table("room_participants") \
-                    .select("score") \
-                    .eq("id", p_id_str) \
-                    .single() \
-                    .execute()
-                
-                current_db_score = 0
-                if current_participant_score_resp.data:
-                    current_db_score = current_participant_score_resp.data.get("score", 0)
-                else:
-                    logger.warning(f"Could not fetch current score for participant {p_id_str} to update. Assuming 0.")
-
-                new_total_score = current_db_score + round_score_for_player
-                
-                # --- Realizar UPDATE individual para room_participants ---
-                supabase_client.table("room_participants") \
-                    .update({"score": new_total_score}) \
-                    .eq("id", p_id_str) \
-                    .execute()
-                # -------------------------------------------------------
+                participant = participant_rows.get(p_id_str)
+                if participant is None:
+                    logger.warning("Could not fetch current score for participant %s to update. Skipping.", p_id_str)
+                    continue
+                score_updates.append({
+                    "id": p_id_str,
+                    "game_room_id": participant["game_room_id"],
+                    "user_id": participant["user_id"],
+                    "nickname": participant["nickname"],
+                    "score": (participant.get("score") or 0) + round_score_for_player
+                })
+
+            if score_updates:
+                await asyncio.to_thread(supabase_client.table("room_participants").upsert(score_updates, on_conflict="id").execute)
         
-        logger.info(f"Finished scoring for room {room_id_str}, R{round_number}. Setting status to 'round_over_results'.")
-        supabase_client.table("game_rooms").update({"status": "round_over_results"}).eq("id", room_id_str).execute()
-        logger.info(f"Scores calculated, room status updated for room {room_id_str}.")
+        logger.info("Finished scoring for room %s, R%s. Setting status to 'round_over_results'.", room_id_str, round_number)
+        status_resp = await asyncio.to_thread(supabase_client.table("game_rooms").update({"status": "round_over_results"}).eq("id", room_id_str).execute)
+        logger.info("Scores calculated, room status updated for room %s.", room_id_str)
+
+        # Entrada y salida completas del cálculo, para poder re-ejecutarlo offline (backend/tools/replay_room.py)
+        audit_log.record(
+            room_id_str, "round_scored",
+            round_number=round_number,
+            letter=current_letter,
+            scoring_rules=rules.model_dump(),
+            answers=answers_resp.data,
+            results=[
+                {"answer_db_id": a["answer_db_id"], "score": a["score"], "is_valid": a["is_valid"], "notes": a["notes"]}
+                for a in processed_answers
+            ],
+            totals=dict(player_total_round_scores)
+        )
+
+        # Los leaderboards y estadísticas solo se actualizan una vez que la ronda quedó guardada
+        try:
+            await record_round_aggregates(theme_id, processed_answers, player_total_round_scores, participant_rows)
+        except Exception as e:
+            logger.error("Failed to update leaderboards/player stats for room %s, R%s: %s", room_id_str, round_number, str(e), exc_info=True)
+
+        # La fila actualizada de la sala evita que el llamador la vuelva a leer
+        return status_resp.data[0] if status_resp.data else None
 
     except APIError as e:
-        logger.error(f"Supabase APIError in calculate_round_scores for room {room_id_str}: {e.message}", exc_info=False)
+        logger.error("Supabase APIError in calculate_round_scores for room %s: %s", room_id_str, e.message, exc_info=False)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in calculate_round_scores for room {room_id_str}: {str(e)}", exc_info=True)
+        logger.error("Unexpected error in calculate_round_scores for room %s: %s", room_id_str, str(e), exc_info=True)
         raise
\ No newline at end of file